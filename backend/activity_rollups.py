@@ -0,0 +1,170 @@
+# backend/activity_rollups.py
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, func, tuple_
+from sqlalchemy.orm import Session
+
+from extensions import db
+from database import table_ready
+from model import Score, UserDailyActivity, JobWatermark
+
+WATERMARK_NAME = 'daily_activity'
+# Queued submissions commit a little after their timestamp; days seen in this
+# window are recounted again, which is idempotent.
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+# (user, day) pairs recounted per query
+RECOUNT_BATCH_SIZE = 500
+FETCH_CHUNK_SIZE = 10000
+
+# session.info entry holding (user_id, day) pairs that lost scores in the current flush
+PENDING_DAYS = 'deleted_score_days'
+
+
+def _day_bounds(days):
+    start = min(days)
+    return datetime.combine(start, datetime.min.time()), datetime.combine(max(days) + timedelta(days=1), datetime.min.time())
+
+
+def daily_scores_query(user_ids, window_start, window_end):
+    """(user_id, score, attempt_timestamp) of `user_ids` in [window_start, window_end)."""
+    return (
+        select(Score.user_id, Score.score, Score.attempt_timestamp)
+        .where(Score.user_id.in_(user_ids))
+        .where(Score.attempt_timestamp >= window_start, Score.attempt_timestamp < window_end)
+    )
+
+
+def new_score_days_query(since):
+    """(user_id, attempt_timestamp) of every score after `since`."""
+    return select(Score.user_id, Score.attempt_timestamp).where(Score.attempt_timestamp > since)
+
+
+def window_activity_query(start_day):
+    # Ordered by day alone so the day index serves both the range and the order
+    return (
+        select(UserDailyActivity.user_id, UserDailyActivity.day, UserDailyActivity.attempts, UserDailyActivity.score_sum)
+        .where(UserDailyActivity.day >= start_day)
+        .order_by(UserDailyActivity.day)
+    )
+
+
+def recount_daily_activity(connection, pairs):
+    """Recount the UserDailyActivity rows of the given (user_id, day) pairs from the scores table."""
+    table = UserDailyActivity.__table__
+    pairs = sorted(pairs)
+    now = datetime.utcnow()
+    for start in range(0, len(pairs), RECOUNT_BATCH_SIZE):
+        batch = set(pairs[start:start + RECOUNT_BATCH_SIZE])
+        window_start, window_end = _day_bounds({day for _, day in batch})
+        totals = defaultdict(lambda: [0, 0])
+        for user_id, score, attempted_at in connection.execute(
+            daily_scores_query({user_id for user_id, _ in batch}, window_start, window_end)
+        ):
+            key = (user_id, attempted_at.date())
+            if key in batch:
+                totals[key][0] += 1
+                totals[key][1] += score
+
+        connection.execute(table.delete().where(tuple_(table.c.user_id, table.c.day).in_(list(batch))))
+        rows = [{
+            'user_id': user_id,
+            'day': day,
+            'attempts': attempts,
+            'score_sum': score_sum,
+            'updated_at': now
+        } for (user_id, day), (attempts, score_sum) in totals.items()]
+        if rows:
+            connection.execute(table.insert(), rows)
+
+
+def rebuild_daily_activity(connection):
+    """Recreate every rollup in one pass over the scores table. Returns the number of rows."""
+    totals = defaultdict(lambda: [0, 0])
+    result = connection.execute(
+        select(Score.user_id, Score.score, Score.attempt_timestamp)
+        .where(Score.attempt_timestamp.is_not(None))
+        .execution_options(yield_per=FETCH_CHUNK_SIZE)
+    )
+    for user_id, score, attempted_at in result:
+        entry = totals[(user_id, attempted_at.date())]
+        entry[0] += 1
+        entry[1] += score
+
+    now = datetime.utcnow()
+    table = UserDailyActivity.__table__
+    connection.execute(table.delete())
+    rows = [{
+        'user_id': user_id,
+        'day': day,
+        'attempts': attempts,
+        'score_sum': score_sum,
+        'updated_at': now
+    } for (user_id, day), (attempts, score_sum) in totals.items()]
+    if rows:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def refresh_daily_activity(full=False):
+    """
+    Bring the rollups up to date with scores newer than the stored watermark
+    (rebuild them all with `full`). Returns a summary dict.
+    """
+    watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+    if watermark is None:
+        watermark = JobWatermark(name=WATERMARK_NAME)
+        db.session.add(watermark)
+    high_water = db.session.query(func.max(Score.attempt_timestamp)).scalar()
+
+    if full or watermark.watermark is None:
+        days = rebuild_daily_activity(db.session.connection())
+    else:
+        pairs = {
+            (user_id, attempted_at.date())
+            for user_id, attempted_at in db.session.execute(new_score_days_query(watermark.watermark - WATERMARK_OVERLAP))
+        }
+        recount_daily_activity(db.session.connection(), pairs)
+        days = len(pairs)
+
+    if high_water is not None and (watermark.watermark is None or high_water > watermark.watermark):
+        watermark.watermark = high_water
+    watermark.updated_at = datetime.utcnow()
+    db.session.commit()
+    return {'days': days, 'full': bool(full), 'watermark': watermark.watermark.isoformat() if watermark.watermark else None}
+
+
+def window_activity(start_day):
+    """{user_id: [(day, attempts, score_sum), ...]} for every rollup from `start_day` on, days ascending."""
+    activity = defaultdict(list)
+    for user_id, day, attempts, score_sum in db.session.execute(window_activity_query(start_day)):
+        activity[user_id].append((day, attempts, score_sum))
+    return activity
+
+
+@event.listens_for(Session, 'before_flush')
+def collect_deleted_score_days(session, flush_context, instances):
+    # Read while the rows still exist, so expired attributes can be loaded
+    pairs = {
+        (obj.user_id, obj.attempt_timestamp.date())
+        for obj in session.deleted
+        if isinstance(obj, Score) and obj.attempt_timestamp is not None
+    }
+    if pairs:
+        session.info.setdefault(PENDING_DAYS, set()).update(pairs)
+
+
+@event.listens_for(Session, 'after_flush')
+def recount_deleted_score_days(session, flush_context):
+    # The watermark only sees new rows, so days that lost scores are recounted
+    # here, on the flush's connection, once the DELETEs have gone out.
+    pairs = session.info.pop(PENDING_DAYS, None)
+    if pairs and table_ready(session.connection(), UserDailyActivity.__table__):
+        recount_daily_activity(session.connection(), pairs)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def forget_deleted_score_days(session, previous_transaction):
+    session.info.pop(PENDING_DAYS, None)
@@ -0,0 +1,147 @@
+# backend/answer_buffer.py
+
+import os
+import logging
+from datetime import datetime, timedelta
+
+from redis.exceptions import RedisError
+from sqlalchemy import func
+
+from extensions import db
+from model import Quiz, Score, UserAnswer
+from bulk_ops import upsert_user_answers
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# One hash per attempt in progress: question_id -> "<option>:<unix time>"
+AUTOSAVE_KEY = 'autosave:{user_id}:{quiz_id}'
+# "<user_id>:<quiz_id>" of every hash holding answers not yet written to user_answers
+DIRTY_SET = 'autosave:dirty'
+
+# Buffers outlive the quiz timer by this much, for slow submits and reconnects
+AUTOSAVE_GRACE_SECONDS = int(os.environ.get('AUTOSAVE_GRACE_SECONDS', 900))
+# Largest batch one autosave request may carry
+MAX_AUTOSAVE_BATCH = 500
+# Attempts drained per SPOP while flushing, and the most rounds one flush runs
+FLUSH_BATCH_SIZE = 200
+FLUSH_MAX_ROUNDS = 50
+
+
+def autosave_ttl(time_duration):
+    # The quiz UI treats time_duration as minutes; reading it that way can only
+    # keep a buffer longer than needed, never drop it early.
+    return time_duration * 60 + AUTOSAVE_GRACE_SECONDS
+
+
+def _rows(user_id, quiz_id, fields):
+    rows = []
+    for question_id, value in fields.items():
+        option, saved_at = value.split(':', 1)
+        rows.append({
+            'user_id': user_id,
+            'quiz_id': quiz_id,
+            'question_id': int(question_id),
+            'selected_option': int(option),
+            'attempt_timestamp': datetime.utcfromtimestamp(float(saved_at))
+        })
+    return rows
+
+
+def buffer_answers(user_id, quiz_id, answers, ttl):
+    """
+    Hold {question_id: selected_option} for an attempt in Redis until the flush
+    task or the final submission writes it. If Redis is unreachable the answers
+    are written to the database directly. Returns True if they were buffered.
+    """
+    now = datetime.utcnow()
+    saved_at = f'{(now - datetime(1970, 1, 1)).total_seconds():.3f}'
+    key = AUTOSAVE_KEY.format(user_id=user_id, quiz_id=quiz_id)
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.hset(key, mapping={str(qid): f'{option}:{saved_at}' for qid, option in answers.items()})
+        pipe.expire(key, ttl)
+        pipe.sadd(DIRTY_SET, f'{user_id}:{quiz_id}')
+        pipe.execute()
+        return True
+    except RedisError as e:
+        logger.error(f"ERROR: Autosave buffer unavailable, writing answers directly: {e}")
+
+    upsert_user_answers([{
+        'user_id': user_id,
+        'quiz_id': quiz_id,
+        'question_id': qid,
+        'selected_option': option,
+        'attempt_timestamp': now
+    } for qid, option in answers.items()], only_newer=True)
+    db.session.commit()
+    return False
+
+
+def drain_buffered_answers(user_id, quiz_id):
+    """
+    Remove and return the buffered {question_id: selected_option} of an attempt.
+    If Redis is unavailable, the attempt's answers already in user_answers are
+    returned instead: everything autosaved while Redis was down, plus what the
+    flush task wrote before. Rows from before the user's previous submission of
+    the quiz, or older than the buffer TTL, belong to an earlier attempt and
+    are left out.
+    """
+    key = AUTOSAVE_KEY.format(user_id=user_id, quiz_id=quiz_id)
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.hgetall(key)
+        pipe.delete(key)
+        pipe.srem(DIRTY_SET, f'{user_id}:{quiz_id}')
+        fields = pipe.execute()[0]
+    except RedisError as e:
+        logger.error(f"ERROR: Autosave buffer unavailable, reading flushed answers for user {user_id}, quiz {quiz_id}: {e}")
+        time_duration = db.session.query(Quiz.time_duration).filter_by(id=quiz_id).scalar()
+        since = datetime.utcnow() - timedelta(seconds=autosave_ttl(time_duration or 0))
+        query = db.session.query(UserAnswer.question_id, UserAnswer.selected_option).filter(
+            UserAnswer.user_id == user_id,
+            UserAnswer.quiz_id == quiz_id,
+            UserAnswer.attempt_timestamp >= since
+        )
+        # A submission stamps its answers with its own time, so anything up to
+        # the last one was submitted (or autosaved) by an attempt already graded
+        previous_submission = db.session.query(func.max(Score.attempt_timestamp)).filter(
+            Score.user_id == user_id,
+            Score.quiz_id == quiz_id
+        ).scalar()
+        if previous_submission is not None:
+            query = query.filter(UserAnswer.attempt_timestamp > previous_submission)
+        return dict(query.all())
+    return {row['question_id']: row['selected_option'] for row in _rows(user_id, quiz_id, fields)}
+
+
+def flush_buffered_answers():
+    """
+    Write every dirty autosave buffer to user_answers, one upsert and commit per
+    batch of attempts. Buffers stay in Redis (until submitted or expired) so a
+    later write only marks them dirty again. Returns the number of answers written.
+    """
+    redis_client = get_redis()
+    written = 0
+    for _ in range(FLUSH_MAX_ROUNDS):
+        members = redis_client.spop(DIRTY_SET, FLUSH_BATCH_SIZE)
+        if not members:
+            break
+        pipe = redis_client.pipeline(transaction=False)
+        for member in members:
+            user_id, quiz_id = member.split(':')
+            pipe.hgetall(AUTOSAVE_KEY.format(user_id=user_id, quiz_id=quiz_id))
+        rows = []
+        for member, fields in zip(members, pipe.execute()):
+            user_id, quiz_id = map(int, member.split(':'))
+            rows.extend(_rows(user_id, quiz_id, fields))
+        try:
+            # A submission may have landed since these were read; don't roll it back
+            upsert_user_answers(rows, only_newer=True)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            redis_client.sadd(DIRTY_SET, *members)
+            raise
+        written += len(rows)
+    return written
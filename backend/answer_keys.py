@@ -0,0 +1,151 @@
+# backend/answer_keys.py
+
+import sys
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import cache
+
+logger = logging.getLogger(__name__)
+
+# Redis holds a small per-quiz pointer to the current key token, and the packed
+# key itself under an immutable token-addressed entry.
+POINTER_KEY = 'answer_key_version:{quiz_id}'
+PAYLOAD_KEY = 'answer_key:{quiz_id}:{token}'
+# Bounds how long a pointer set from a read racing an edit can stay stale
+POINTER_TTL = 300
+PAYLOAD_TTL = 3600
+LRU_SIZE = 256
+
+# session.info entry listing quizzes recompiled in the current transaction
+RECOMPILED_QUIZZES = 'recompiled_quiz_ids'
+
+
+def pack_answer_key(pairs):
+    """Pack (question_id, correct_option) pairs as uint32 ids followed by one byte per option."""
+    pairs = sorted(pairs)
+    ids = array('I', (qid for qid, _ in pairs))
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return ids.tobytes() + bytes(option for _, option in pairs)
+
+
+class AnswerKey:
+    """Decoded answer key of one quiz. `token` is '<snapshot version>.<content digest>'."""
+    __slots__ = ('token', 'correct')
+
+    def __init__(self, token, packed):
+        count = len(packed) // (array('I').itemsize + 1)
+        ids = array('I')
+        ids.frombytes(packed[:count * ids.itemsize])
+        if sys.byteorder == 'big':
+            ids.byteswap()
+        self.token = token
+        self.correct = dict(zip(ids, packed[count * ids.itemsize:]))
+
+    def __len__(self):
+        return len(self.correct)
+
+    def __contains__(self, question_id):
+        return question_id in self.correct
+
+    def grade(self, submitted):
+        """Number of correct answers in a {question_id: selected_option} mapping."""
+        correct = self.correct
+        return sum(1 for qid, option in submitted.items() if correct.get(qid) == option)
+
+
+def answer_key_token(version, packed):
+    return f'{version}.{hashlib.sha1(packed).hexdigest()[:16]}'
+
+
+class _LRU:
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+_local_keys = _LRU(LRU_SIZE)
+
+
+def get_answer_key(quiz_id):
+    """
+    The AnswerKey for grading `quiz_id`, or None if the quiz doesn't exist.
+    Normally one Redis GET of the version pointer validates the in-process copy;
+    the quiz_snapshots table is only read when Redis has nothing current.
+    """
+    # Imported here as quiz_snapshots imports this module for packing
+    from quiz_snapshots import load_answer_key
+
+    token = None
+    try:
+        token = cache.get(POINTER_KEY.format(quiz_id=quiz_id))
+        if token is not None:
+            entry = _local_keys.get(quiz_id)
+            if entry is not None and entry.token == token:
+                return entry
+            packed = cache.get(PAYLOAD_KEY.format(quiz_id=quiz_id, token=token))
+            if packed is not None:
+                entry = AnswerKey(token, packed)
+                _local_keys.put(quiz_id, entry)
+                return entry
+    except Exception as e:
+        logger.error(f"ERROR: Answer key cache lookup failed for quiz {quiz_id}: {e}")
+
+    loaded = load_answer_key(quiz_id)
+    if loaded is None:
+        return None
+    version, packed = loaded
+    entry = AnswerKey(answer_key_token(version, packed), packed)
+    _local_keys.put(quiz_id, entry)
+    try:
+        cache.set(PAYLOAD_KEY.format(quiz_id=quiz_id, token=entry.token), packed, timeout=PAYLOAD_TTL)
+        cache.set(POINTER_KEY.format(quiz_id=quiz_id), entry.token, timeout=POINTER_TTL)
+    except Exception as e:
+        logger.error(f"ERROR: Failed to cache answer key for quiz {quiz_id}: {e}")
+    return entry
+
+
+def invalidate_answer_keys(quiz_ids):
+    """Drop the cached key pointers of `quiz_ids`, so the next grade reloads their keys."""
+    if not quiz_ids:
+        return
+    try:
+        # One delete per key: the generic delete_many of the non-Redis backends
+        # stops at the first key that isn't set, skipping the rest
+        for quiz_id in quiz_ids:
+            cache.delete(POINTER_KEY.format(quiz_id=quiz_id))
+    except Exception as e:
+        logger.error(f"ERROR: Failed to invalidate answer keys for quizzes {sorted(quiz_ids)}: {e}")
+
+
+@event.listens_for(Session, 'after_commit')
+def drop_answer_key_pointers(session):
+    # Only once the new keys are committed, so a reload can't pick up the old ones
+    invalidate_answer_keys(session.info.pop(RECOMPILED_QUIZZES, None))
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def forget_recompiled_quizzes(session, previous_transaction):
+    session.info.pop(RECOMPILED_QUIZZES, None)
@@ -1,20 +1,43 @@
 import os
+import click
 from datetime import datetime, timedelta, date
-from flask import Flask, request, jsonify, make_response, send_file
+from flask import Flask, request, jsonify, make_response, send_file, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity,verify_jwt_in_request
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.exceptions import HTTPException
 from flask_restful import Api, Resource
 from functools import wraps
 from flask_cors import cross_origin,CORS
 import json
-from io import BytesIO
-
-from extensions import db
+from io import BytesIO, TextIOWrapper
+from redis.exceptions import RedisError
+
+from extensions import db, cache
+from passwords import hash_password, verify_password, needs_rehash, HashingOverloaded
+from database import configure_database
+from cache_tags import cached_with_tags, invalidate_tags
+from bulk_import import import_users, import_questions, export_questions, question_values, detect_format, ImportFormatError, ImportAborted
+from pagination import paginate, page_response
+from queries import (
+    login_candidates_query, score_history_query, chapters_by_subject_query, quizzes_by_chapter_query,
+    questions_by_quiz_query, user_answer_query, SCORE_HISTORY_SORTS, CHAPTER_SORTS, QUIZ_SORTS
+)
+from search import search, filter_by_search, rebuild_search_index, SEARCHABLE, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from indexes import upgrade_indexes, check_query_plans
+from upgrade import upgrade_database
+from quiz_snapshots import serve_quiz_snapshot, compile_all_quiz_snapshots
+from answer_keys import get_answer_key, invalidate_answer_keys
+from question_analytics import quiz_analytics, refresh_question_analytics
+from leaderboards import get_leaderboards, rebuild_leaderboards, DEFAULT_LEADERBOARD_LIMIT, MAX_LEADERBOARD_LIMIT
+from submissions import record_submissions, enqueue_submission, should_kick_ingest, submission_status, new_submission_key, valid_submission_key, SUBMISSION_MODE
+from answer_buffer import buffer_answers, drain_buffered_answers, flush_buffered_answers, autosave_ttl, MAX_AUTOSAVE_BATCH
+from activity_rollups import refresh_daily_activity
+from report_artifacts import get_artifact_store
+from score_distributions import quiz_score_sketch, subject_score_sketch, rebuild_score_distributions
+from stats import get_global_stats, rebuild_global_stats, get_user_stats, rebuild_user_stats
 from model import User, Quiz, Admin, Chapter, Subject, Question, Score, UserAnswer
-from celery_worker import celery, export_users_csv, generate_monthly_report
-from flask_caching import Cache
+from celery_worker import celery, export_users_csv, generate_monthly_report, export_analytics_columnar, ingest_submissions
 
 def create_admin_user():
     admin_username = "Tripti Jha"
@@ -24,7 +47,7 @@ def create_admin_user():
     with db.session.no_autoflush:
         admin = Admin.query.filter_by(email=admin_email).first()
         if not admin:
-            hashed_password = generate_password_hash(admin_password)
+            hashed_password = hash_password(admin_password)
             new_admin = Admin(
                 username=admin_username,
                 password=hashed_password,
@@ -36,14 +59,11 @@ def create_admin_user():
         else:
             print("Admin user already exists.")
 
-cache = Cache()
-
 def create_app():
     app = Flask(__name__)
     api = Api(app)
     app.config['CORS_HEADERS'] = 'Content-Type, Authorization'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_database(app)
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
     app.config["JWT_SECRET_KEY"] = os.environ.get("FLASK_JWT_SECRET", "MY_PROJECT_SECRET_KEY_XYZ")
     print(f"DEBUG: Active JWT_SECRET_KEY: {app.config['JWT_SECRET_KEY']}")
@@ -83,7 +103,7 @@ print(f"DEBUG: Active JWT_SECRET_KEY: {app.config['JWT_SECRET_KEY']}")
 
 @app.cli.command("create-db")
 def create_db_command():
-    """Create database tables and seed initial admin user."""
+    """Create database tables and seed initial admin user. Drops existing data; use upgrade-db on a live database."""
     with app.app_context():
         print("Creating database tables...")
         db.drop_all()
@@ -91,6 +111,179 @@ def create_db_command():
         print("Database tables created.")
         create_admin_user()
         print("Admin user setup complete.")
+        rebuild_global_stats()
+        print("Global stats initialised.")
+        rebuild_search_index()
+        print("Search index initialised.")
+
+@app.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Bring an existing database up to date and backfill derived tables. Run on every deploy."""
+    with app.app_context():
+        summary = upgrade_database()
+        if summary['columns']:
+            print(f"Added columns: {', '.join(summary['columns'])}")
+        print(f"Created indexes: {', '.join(summary['indexes'])}" if summary['indexes'] else "All indexes already exist.")
+        print(f"User stats rebuilt for {summary['user_stats']} users.")
+        print(f"Score distributions rebuilt for {summary['score_distributions']} quizzes.")
+        print(f"Compiled snapshots for {summary['quiz_snapshots']} quizzes.")
+        print(f"Daily activity rebuilt ({summary['daily_activity']} user-days).")
+        if summary['leaderboards'] is None:
+            print("Leaderboards not rebuilt (see the log); they seed themselves once Redis is reachable.")
+        else:
+            print(f"Rebuilt {summary['leaderboards']} leaderboards.")
+        print("Database upgraded.")
+
+@app.cli.command("reconcile-stats")
+def reconcile_stats_command():
+    """Rebuild the global dashboard counters from the source tables."""
+    with app.app_context():
+        stats = rebuild_global_stats()
+        print(f"Global stats rebuilt: {stats.as_dict()}")
+
+@app.cli.command("rebuild-user-stats")
+def rebuild_user_stats_command():
+    """Recompute every user's rolling score aggregates from the scores table."""
+    with app.app_context():
+        db.create_all()
+        rebuilt = rebuild_user_stats(db.session.connection())
+        db.session.commit()
+        print(f"User stats rebuilt for {rebuilt} users.")
+
+@app.cli.command("upgrade-indexes")
+def upgrade_indexes_command():
+    """Add indexes declared in model.py that are missing from an existing database."""
+    with app.app_context():
+        created = upgrade_indexes()
+        print(f"Created indexes: {', '.join(created)}" if created else "All indexes already exist.")
+
+@app.cli.command("check-query-plans")
+@click.option('--verbose', is_flag=True, help='Print the plan of every query.')
+@click.option('--live', is_flag=True, help='Check the configured database instead of the model schema.')
+def check_query_plans_command(verbose, live):
+    """Fail if any hot query's plan falls back to a full table scan."""
+    with app.app_context():
+        failures = check_query_plans(verbose=verbose, live=live)
+        for label, plan in failures:
+            print(f"SCAN in {label}:")
+            for line in plan:
+                print(f"    {line}")
+        if failures:
+            raise SystemExit(1)
+        print("All hot queries use indexes.")
+
+@app.cli.command("import-users")
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+def import_users_command(path, fmt):
+    """Create user accounts in bulk from a CSV or NDJSON file."""
+    with app.app_context():
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            summary = import_users(f, detect_format(fmt, path))
+        for error in summary['errors']:
+            print(f"Row {error['row']}: {error['message']}" + (f" ({error['email']})" if error.get('email') else ''))
+        print(f"Created {summary['created']} users, {summary['failed']} rows failed.")
+        if summary['created']:
+            invalidate_tags('users')
+
+def question_scope(quiz_id, chapter_id):
+    if (quiz_id is None) == (chapter_id is None):
+        raise click.UsageError('Pass exactly one of --quiz or --chapter.')
+    if quiz_id is not None and not db.session.get(Quiz, quiz_id):
+        raise click.UsageError(f'Quiz {quiz_id} not found.')
+    if chapter_id is not None and not db.session.get(Chapter, chapter_id):
+        raise click.UsageError(f'Chapter {chapter_id} not found.')
+
+@app.cli.command("import-questions")
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--quiz', 'quiz_id', type=int, help='Import every row into this quiz.')
+@click.option('--chapter', 'chapter_id', type=int, help='Import into this chapter; rows carry quiz_id.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+def import_questions_command(path, quiz_id, chapter_id, fmt):
+    """Load a question bank from a CSV or JSON Lines file."""
+    with app.app_context():
+        question_scope(quiz_id, chapter_id)
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as f:
+                summary = import_questions(f, detect_format(fmt, path), quiz_id=quiz_id, chapter_id=chapter_id)
+        except ImportAborted as e:
+            print(f"Import stopped: {e.cause}")
+            print(f"Created {e.summary['created']} questions before the failure, {e.summary['failed']} rows failed.")
+            raise SystemExit(1)
+        for error in summary['errors']:
+            print(f"Row {error['row']}: {error['message']}")
+        print(f"Created {summary['created']} questions, {summary['failed']} rows failed.")
+
+@app.cli.command("export-questions")
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--quiz', 'quiz_id', type=int, help='Export this quiz.')
+@click.option('--chapter', 'chapter_id', type=int, help='Export every quiz in this chapter.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+def export_questions_command(path, quiz_id, chapter_id, fmt):
+    """Write a question bank to a CSV or JSON Lines file that import-questions accepts."""
+    with app.app_context():
+        question_scope(quiz_id, chapter_id)
+        quiz_ids = [quiz_id] if quiz_id is not None else [qid for (qid,) in db.session.query(Quiz.id).filter_by(chapter_id=chapter_id)]
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for chunk in export_questions(quiz_ids, detect_format(fmt, path)):
+                f.write(chunk)
+        print(f"Questions exported to {path}")
+
+@app.cli.command("compile-quiz-snapshots")
+def compile_quiz_snapshots_command():
+    """Rebuild the precompiled question payload and answer key of every quiz."""
+    with app.app_context():
+        with db.engine.begin() as connection:
+            quiz_ids = compile_all_quiz_snapshots(connection)
+        invalidate_answer_keys(quiz_ids)
+        print(f"Compiled snapshots for {len(quiz_ids)} quizzes.")
+
+@app.cli.command("flush-autosaved-answers")
+def flush_autosaved_answers_command():
+    """Write buffered autosave answers to user_answers now instead of waiting for the worker."""
+    with app.app_context():
+        written = flush_buffered_answers()
+        print(f"Flushed {written} autosaved answers.")
+
+@app.cli.command("rebuild-leaderboards")
+def rebuild_leaderboards_command():
+    """Repopulate every quiz and subject leaderboard from the scores table."""
+    with app.app_context():
+        count = rebuild_leaderboards()
+        print(f"Rebuilt {count} leaderboards.")
+
+@app.cli.command("rebuild-score-distributions")
+def rebuild_score_distributions_command():
+    """Recreate every quiz's score distribution from the scores table."""
+    with app.app_context():
+        db.create_all()
+        count = rebuild_score_distributions(db.session.connection())
+        db.session.commit()
+        print(f"Score distributions rebuilt for {count} quizzes.")
+
+@app.cli.command("refresh-daily-activity")
+@click.option('--full', is_flag=True, help='Rebuild every rollup instead of folding in new scores.')
+def refresh_daily_activity_command(full):
+    """Update the per-user daily rollups the monthly report is assembled from."""
+    with app.app_context():
+        db.create_all()
+        summary = refresh_daily_activity(full=full)
+        print(f"Daily activity refreshed ({summary['days']} user-days), watermark {summary['watermark']}.")
+
+@app.cli.command("refresh-question-analytics")
+@click.option('--full', is_flag=True, help='Recompute every quiz instead of those with new answers.')
+def refresh_question_analytics_command(full):
+    """Recompute per-question difficulty, discrimination and option counts."""
+    with app.app_context():
+        summary = refresh_question_analytics(full=full)
+        print(f"Analytics refreshed for {summary['quizzes']} quizzes ({summary['questions']} questions).")
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Create the full-text search index if missing and reindex all content."""
+    with app.app_context():
+        backend = rebuild_search_index()
+        print(f"Search index rebuilt using the {backend.name} backend.")
 
 def admin_required():
     def wrapper(fn):
@@ -109,6 +302,8 @@ def admin_required():
                     return {'message': 'Admin access required (role mismatch)'}, 403
                 
                 return fn(*args, **kwargs)
+            except HTTPException:
+                raise # Deliberate aborts (e.g. bad pagination params) keep their own status
             except Exception as e:
                 import traceback
                 traceback.print_exc()
@@ -116,13 +311,31 @@ def admin_required():
         return decorator
     return wrapper
 
+def quiz_tags_for_removal(quiz_ids):
+    """Cache tags that go stale when the given quizzes (and their cascaded rows) are deleted."""
+    if not quiz_ids:
+        return []
+    tags = ['quizzes']
+    for quiz_id in quiz_ids:
+        tags += [f'quiz:{quiz_id}', f'quiz:{quiz_id}:questions']
+    tags += [f'question:{qid}' for (qid,) in db.session.query(Question.id).filter(Question.quiz_id.in_(quiz_ids))]
+    affected_users = db.session.query(Score.user_id).filter(Score.quiz_id.in_(quiz_ids)).union(
+        db.session.query(UserAnswer.user_id).filter(UserAnswer.quiz_id.in_(quiz_ids))
+    )
+    for (user_id,) in affected_users:
+        tags += [f'user:{user_id}:scores', f'user:{user_id}:answers']
+    return tags
+
 class HelloWorld(Resource):
     def get(self):
         return {'hello': 'world'}
 
+# Returned when the password hashing pool is saturated
+LOGIN_BUSY_RESPONSE = ({'message': 'Server is busy, please try again shortly'}, 503, {'Retry-After': '2'})
+
+
 class Register(Resource):
     def post(self):
-        cache.clear() # Registration affects overall user count, so clear cache
         data = request.get_json()
         if not data:
             return {'message': 'No input data provided'}, 400
@@ -144,7 +357,10 @@ class Register(Resource):
         except ValueError:
             return {'message': 'Invalid date format for DOB. Use YYYY-MM-DD.'}, 400
 
-        hashed_password = generate_password_hash(password)
+        try:
+            hashed_password = hash_password(password)
+        except HashingOverloaded:
+            return LOGIN_BUSY_RESPONSE
         new_user = User(
             email=email,
             password=hashed_password,
@@ -155,9 +371,14 @@ class Register(Resource):
         )
         db.session.add(new_user)
         db.session.commit()
+        invalidate_tags('users')
         return {'message': 'User registered successfully'}, 201
 
 
+def login_candidates(identifier):
+    return db.session.execute(login_candidates_query(identifier)).all()
+
+
 class Login(Resource):
     def post(self):
         data = request.get_json()
@@ -166,39 +387,41 @@ class Login(Resource):
 
         if not email or not password:
             return {'message': 'Email and password required'}, 400
-       
-        user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password, password):
-            access_token = create_access_token(identity={'id': user.id, 'role': user.role})
-            return {'access_token': access_token, 'role': user.role, 'message': 'Login successful'}, 200
-
-        admin = Admin.query.filter((Admin.email == email) | (Admin.username == email)).first()
-        if admin and check_password_hash(admin.password, password):
-            access_token = create_access_token(identity={'id': admin.id, 'role': 'admin'})
-            return {'access_token': access_token, 'role': 'admin', 'message': 'Admin login successful'}, 200
+
+        try:
+            for candidate in login_candidates(email):
+                if not verify_password(candidate.password, password):
+                    continue
+                if needs_rehash(candidate.password):
+                    model = User if candidate.table == 'users' else Admin
+                    db.session.execute(
+                        db.update(model).where(model.id == candidate.id).values(password=hash_password(password))
+                    )
+                    db.session.commit()
+                access_token = create_access_token(identity={'id': candidate.id, 'role': candidate.role})
+                message = 'Login successful' if candidate.table == 'users' else 'Admin login successful'
+                return {'access_token': access_token, 'role': candidate.role, 'message': message}, 200
+        except HashingOverloaded:
+            return LOGIN_BUSY_RESPONSE
         return {'message': 'Invalid credentials'}, 401
 
 
 class Subjects(Resource):
     @admin_required()
-    @cache.cached(timeout=60, query_string=True)
+    @cached_with_tags(['subjects'], timeout=60, query_string=True)
     def get(self):
         search_query = request.args.get('query', type=str, default='').strip()
         
+        query = Subject.query
         if search_query:
-            subjects = Subject.query.filter(
-                (Subject.name.ilike(f'%{search_query}%')) |
-                (Subject.description.ilike(f'%{search_query}%'))
-            ).all()
-        else:
-            subjects = Subject.query.all()
+            query = filter_by_search(query, 'subject', search_query)
 
-        return [{'id': s.id, 'name': s.name, 'description': s.description} for s in subjects], 200
+        subjects, next_cursor, limit = paginate(query, Subject.id, {'name': Subject.name})
+        return page_response([{'id': s.id, 'name': s.name, 'description': s.description} for s in subjects], next_cursor, limit), 200
 
 
     @admin_required()
     def post(self):
-        cache.clear() # Clears ALL cache in the configured DB (DB 1 for Flask-Caching)
         data = request.get_json()
         name = data.get('name')
         description = data.get('description', '')
@@ -210,11 +433,12 @@ class Subjects(Resource):
         subject = Subject(name=name, description=description)
         db.session.add(subject)
         db.session.commit()
+        invalidate_tags('subjects')
         return {'id': subject.id, 'name': subject.name, 'description': subject.description}, 201
 
 class SubjectResource(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['subject:{subject_id}'], timeout=60)
     def get(self, subject_id):
         subject = db.session.get(Subject, subject_id)
         if not subject:
@@ -223,7 +447,6 @@ class SubjectResource(Resource):
 
     @admin_required()
     def put(self, subject_id):
-        cache.clear() # Clears ALL cache after modification
         subject = db.session.get(Subject, subject_id)
         if not subject:
             return {'message': 'Subject not found'}, 404
@@ -240,23 +463,28 @@ class SubjectResource(Resource):
         subject.name = name
         subject.description = description
         db.session.commit()
+        invalidate_tags('subjects', f'subject:{subject_id}')
         return {'id': subject.id, 'name': subject.name, 'description': subject.description}, 200
 
     @admin_required()
     def delete(self, subject_id):
-        cache.clear() # Clears ALL cache after deletion
         subject = db.session.get(Subject, subject_id)
         if not subject:
             return {'message': 'Subject not found'}, 404
         
+        quiz_ids = [q.id for c in subject.chapters for q in c.quizzes]
+        stale_tags = ['subjects', f'subject:{subject_id}', f'subject:{subject_id}:chapters'] + \
+            [tag for c in subject.chapters for tag in (f'chapter:{c.id}', f'chapter:{c.id}:quizzes')] + \
+            quiz_tags_for_removal(quiz_ids)
         db.session.delete(subject)
         db.session.commit()
+        invalidate_tags(*stale_tags)
         return {'message': 'Subject deleted successfully'}, 204
 
 
 class ChaptersBySubject(Resource):
     @admin_required()
-    @cache.cached(timeout=60, query_string=True)
+    @cached_with_tags(['subject:{subject_id}', 'subject:{subject_id}:chapters'], timeout=60, query_string=True)
     def get(self, subject_id):
         subject = db.session.get(Subject, subject_id)
         if not subject:
@@ -264,20 +492,15 @@ class ChaptersBySubject(Resource):
 
         search_query = request.args.get('query', type=str, default='').strip()
         
+        query = chapters_by_subject_query(subject_id)
         if search_query:
-            chapters = Chapter.query.filter(
-                Chapter.subject_id == subject_id,
-                (Chapter.name.ilike(f'%{search_query}%')) |
-                (Chapter.description.ilike(f'%{search_query}%'))
-            ).all()
-        else:
-            chapters = Chapter.query.filter_by(subject_id=subject_id).all()
+            query = filter_by_search(query, 'chapter', search_query)
 
-        return [{'id': c.id, 'subject_id': c.subject_id, 'name': c.name, 'description': c.description} for c in chapters], 200
+        chapters, next_cursor, limit = paginate(query, Chapter.id, CHAPTER_SORTS)
+        return page_response([{'id': c.id, 'subject_id': c.subject_id, 'name': c.name, 'description': c.description} for c in chapters], next_cursor, limit), 200
 
     @admin_required()
     def post(self, subject_id):
-        cache.clear() # Clears ALL cache after modification
         data = request.get_json()
         name = data.get('name')
         description = data.get('description', '')
@@ -295,6 +518,7 @@ class ChaptersBySubject(Resource):
         )
         db.session.add(new_chapter)
         db.session.commit()
+        invalidate_tags(f'subject:{subject_id}:chapters')
         return {
             'id': new_chapter.id,
             'subject_id': new_chapter.subject_id,
@@ -304,7 +528,7 @@ class ChaptersBySubject(Resource):
 
 class ChapterResource(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['chapter:{chapter_id}'], timeout=60)
     def get(self, chapter_id):
         chapter = db.session.get(Chapter, chapter_id)
         if not chapter:
@@ -318,7 +542,6 @@ class ChapterResource(Resource):
 
     @admin_required()
     def put(self, chapter_id):
-        cache.clear() # Clears ALL cache after modification
         chapter = db.session.get(Chapter, chapter_id)
         if not chapter:
             return {'message': 'Chapter not found'}, 404
@@ -334,10 +557,12 @@ class ChapterResource(Resource):
            Chapter.query.filter_by(subject_id=subject_id, name=name).first():
             return {'message': f'Chapter with name "{name}" already exists under the selected subject'}, 409
 
+        old_subject_id = chapter.subject_id
         chapter.name = name
         chapter.description = description
         chapter.subject_id = subject_id
         db.session.commit()
+        invalidate_tags(f'chapter:{chapter_id}', f'subject:{old_subject_id}:chapters', f'subject:{subject_id}:chapters', 'chapters')
         return {
             'id': chapter.id,
             'subject_id': chapter.subject_id,
@@ -347,19 +572,21 @@ class ChapterResource(Resource):
 
     @admin_required()
     def delete(self, chapter_id):
-        cache.clear() # Clears ALL cache after deletion
         chapter = db.session.get(Chapter, chapter_id)
         if not chapter:
             return {'message': 'Chapter not found'}, 404
 
+        stale_tags = [f'chapter:{chapter_id}', f'chapter:{chapter_id}:quizzes', f'subject:{chapter.subject_id}:chapters', 'chapters'] + \
+            quiz_tags_for_removal([q.id for q in chapter.quizzes])
         db.session.delete(chapter)
         db.session.commit()
+        invalidate_tags(*stale_tags)
         return {'message': 'Chapter deleted successfully'}, 204
 
 
 class QuizzesByChapter(Resource):
     @admin_required()
-    @cache.cached(timeout=60, query_string=True)
+    @cached_with_tags(['chapter:{chapter_id}', 'chapter:{chapter_id}:quizzes'], timeout=60, query_string=True)
     def get(self, chapter_id):
         chapter = db.session.get(Chapter, chapter_id)
         if not chapter:
@@ -367,20 +594,15 @@ class QuizzesByChapter(Resource):
 
         search_query = request.args.get('query', type=str, default='').strip()
         
+        query = quizzes_by_chapter_query(chapter_id)
         if search_query:
-            quizzes = Quiz.query.filter(
-                Quiz.chapter_id == chapter_id,
-                (Quiz.title.ilike(f'%{search_query}%')) |
-                (Quiz.description.ilike(f'%{search_query}%'))
-            ).all()
-        else:
-            quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
+            query = filter_by_search(query, 'quiz', search_query)
 
-        return [{'id': q.id, 'chapter_id': q.chapter_id, 'title': q.title, 'description': q.description, 'time_duration': q.time_duration, 'date_of_quiz': q.date_of_quiz.isoformat()} for q in quizzes], 200
+        quizzes, next_cursor, limit = paginate(query, Quiz.id, QUIZ_SORTS)
+        return page_response([{'id': q.id, 'chapter_id': q.chapter_id, 'title': q.title, 'description': q.description, 'time_duration': q.time_duration, 'date_of_quiz': q.date_of_quiz.isoformat()} for q in quizzes], next_cursor, limit), 200
 
     @admin_required()
     def post(self, chapter_id):
-        cache.clear()
         data = request.get_json()
         title = data.get('title')
         description = data.get('description', '')
@@ -407,6 +629,7 @@ class QuizzesByChapter(Resource):
         )
         db.session.add(new_quiz)
         db.session.commit()
+        invalidate_tags(f'chapter:{chapter_id}:quizzes', 'quizzes')
         return {
             'id': new_quiz.id,
             'chapter_id': new_quiz.chapter_id,
@@ -418,7 +641,7 @@ class QuizzesByChapter(Resource):
 
 class QuizResource(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['quiz:{quiz_id}'], timeout=60)
     def get(self, quiz_id):
         quiz = db.session.get(Quiz, quiz_id)
         if not quiz:
@@ -434,7 +657,6 @@ class QuizResource(Resource):
 
     @admin_required()
     def put(self, quiz_id):
-        cache.clear()
         quiz = db.session.get(Quiz, quiz_id)
         if not quiz:
             return {'message': 'Quiz not found'}, 404
@@ -457,64 +679,51 @@ class QuizResource(Resource):
            Quiz.query.filter_by(chapter_id=chapter_id, title=title).first():
             return {'message': f'Quiz with title "{title}" already exists under the selected chapter'}, 409
 
+        old_chapter_id = quiz.chapter_id
         quiz.title = title
         quiz.description = description
         quiz.time_duration = time_duration
         quiz.date_of_quiz = date_of_quiz
         quiz.chapter_id = chapter_id
         db.session.commit()
+        invalidate_tags(f'quiz:{quiz_id}', f'chapter:{old_chapter_id}:quizzes', f'chapter:{chapter_id}:quizzes', 'quizzes')
         return {'id': quiz.id, 'chapter_id': quiz.chapter_id, 'title': quiz.title, 'description': quiz.description, 'time_duration': quiz.time_duration, 'date_of_quiz': quiz.date_of_quiz.isoformat()}, 200
 
     @admin_required()
     def delete(self, quiz_id):
-        cache.clear()
         quiz = db.session.get(Quiz, quiz_id)
         if not quiz:
             return {'message': 'Quiz not found'}, 404
         
+        stale_tags = [f'chapter:{quiz.chapter_id}:quizzes'] + quiz_tags_for_removal([quiz_id])
         db.session.delete(quiz)
         db.session.commit()
+        invalidate_tags(*stale_tags)
         return {'message': 'Quiz deleted successfully'}, 204
 
 class QuestionsByQuiz(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['quiz:{quiz_id}', 'quiz:{quiz_id}:questions'], timeout=60, query_string=True)
     def get(self, quiz_id):
         quiz = db.session.get(Quiz, quiz_id)
         if not quiz:
             return {'message': 'Quiz not found'}, 404
 
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        return [{'id': q.id, 'quiz_id': q.quiz_id, 'question_text': q.question_text, 'option1': q.option1, 'option2': q.option2, 'option3': q.option3, 'option4': q.option4, 'correct_option': q.correct_option} for q in questions], 200
+        questions, next_cursor, limit = paginate(questions_by_quiz_query(quiz_id), Question.id)
+        return page_response([{'id': q.id, 'quiz_id': q.quiz_id, 'question_text': q.question_text, 'option1': q.option1, 'option2': q.option2, 'option3': q.option3, 'option4': q.option4, 'correct_option': q.correct_option} for q in questions], next_cursor, limit), 200
 
     @admin_required()
     def post(self, quiz_id):
-        cache.clear()
         data = request.get_json()
-        question_text = data.get('question_text')
-        option1 = data.get('option1')
-        option2 = data.get('option2')
-        option3 = data.get('option3')
-        option4 = data.get('option4')
-        correct_option = data.get('correct_option')
-
-        if not all([question_text, option1, option2, correct_option is not None]):
-            return {'message': 'Question text, option1, option2, and correct option are required'}, 400
-        
-        if correct_option not in [1, 2, 3, 4]:
-            return {'message': 'Correct option must be 1, 2, 3, or 4'}, 400
+        try:
+            values = question_values(data)
+        except ValueError as e:
+            return {'message': str(e)}, 400
 
-        new_question = Question(
-            quiz_id=quiz_id,
-            question_text=question_text,
-            option1=option1,
-            option2=option2,
-            option3=option3,
-            option4=option4,
-            correct_option=correct_option
-        )
+        new_question = Question(quiz_id=quiz_id, **values)
         db.session.add(new_question)
         db.session.commit()
+        invalidate_tags(f'quiz:{quiz_id}:questions')
         return {
             'id': new_question.id,
             'quiz_id': new_question.quiz_id,
@@ -526,9 +735,67 @@ class QuestionsByQuiz(Resource):
             'correct_option': new_question.correct_option
         }, 201
 
+def question_export_response(quiz_ids, name):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('csv', 'ndjson'):
+        return {'message': 'format must be csv or ndjson'}, 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(export_questions(quiz_ids, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{name}.{fmt}"'}
+    )
+
+
+class QuizQuestionsImport(Resource):
+    @admin_required()
+    def post(self, quiz_id):
+        if not db.session.get(Quiz, quiz_id):
+            return {'message': 'Quiz not found'}, 404
+        # import_questions invalidates the caches of the quizzes it wrote to
+        return run_import(lambda lines, fmt: import_questions(lines, fmt, quiz_id=quiz_id), 'question')
+
+    def options(self, quiz_id):
+        return {'Allow': 'POST, OPTIONS'}, 200
+
+
+class ChapterQuestionsImport(Resource):
+    @admin_required()
+    def post(self, chapter_id):
+        if not db.session.get(Chapter, chapter_id):
+            return {'message': 'Chapter not found'}, 404
+        return run_import(lambda lines, fmt: import_questions(lines, fmt, chapter_id=chapter_id), 'question')
+
+    def options(self, chapter_id):
+        return {'Allow': 'POST, OPTIONS'}, 200
+
+
+class QuizQuestionsExport(Resource):
+    @admin_required()
+    def get(self, quiz_id):
+        if not db.session.get(Quiz, quiz_id):
+            return {'message': 'Quiz not found'}, 404
+        return question_export_response([quiz_id], f'quiz_{quiz_id}_questions')
+
+    def options(self, quiz_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
+class ChapterQuestionsExport(Resource):
+    @admin_required()
+    def get(self, chapter_id):
+        if not db.session.get(Chapter, chapter_id):
+            return {'message': 'Chapter not found'}, 404
+        quiz_ids = [qid for (qid,) in db.session.query(Quiz.id).filter_by(chapter_id=chapter_id)]
+        return question_export_response(quiz_ids, f'chapter_{chapter_id}_questions')
+
+    def options(self, chapter_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
 class QuestionResource(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['question:{question_id}'], timeout=60)
     def get(self, question_id):
         question = db.session.get(Question, question_id)
         if not question:
@@ -546,7 +813,6 @@ class QuestionResource(Resource):
 
     @admin_required()
     def put(self, question_id):
-        cache.clear()
         question = db.session.get(Question, question_id)
         if not question:
             return {'message': 'Question not found'}, 404
@@ -570,66 +836,134 @@ class QuestionResource(Resource):
         question.option2 = option2
         question.option3 = option3
         question.option4 = option4
+        old_quiz_id = question.quiz_id
         question.correct_option = correct_option
         question.quiz_id = quiz_id
         db.session.commit()
+        invalidate_tags(f'question:{question_id}', f'quiz:{old_quiz_id}:questions', f'quiz:{quiz_id}:questions')
         return {'id': question.id, 'quiz_id': question.quiz_id, 'question_text': question.question_text, 'option1': question.option1, 'option2': question.option2, 'option3': question.option3, 'option4': question.option4, 'correct_option': question.correct_option}, 200
 
     @admin_required()
     def delete(self, question_id):
-        cache.clear()
         question = db.session.get(Question, question_id)
         if not question:
             return {'message': 'Question not found'}, 404
         
+        quiz_id = question.quiz_id
         db.session.delete(question)
         db.session.commit()
+        invalidate_tags(f'question:{question_id}', f'quiz:{quiz_id}:questions')
         return {'message': 'Question deleted successfully'}, 204
 
 class AdminUsers(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['users'], timeout=60, query_string=True)
     def get(self):
-        users = User.query.all()
-        return [{'id': u.id,'email': u.email,'full_name': u.full_name,'qualification': u.qualification,'dob': u.dob.isoformat() if u.dob else None,'role': getattr(u, 'role', 'N/A')
-            } for u in users], 200
+        search_query = request.args.get('query', type=str, default='').strip()
+
+        query = User.query
+        if search_query:
+            query = query.filter(
+                (User.email.ilike(f'%{search_query}%')) |
+                (User.full_name.ilike(f'%{search_query}%'))
+            )
+
+        users, next_cursor, limit = paginate(query, User.id, {'email': User.email, 'full_name': User.full_name})
+        return page_response([{'id': u.id,'email': u.email,'full_name': u.full_name,'qualification': u.qualification,'dob': u.dob.isoformat() if u.dob else None,'role': getattr(u, 'role', 'N/A')
+            } for u in users], next_cursor, limit), 200
     def options(self):
         return {'Allow': 'GET, POST, PUT, DELETE, OPTIONS'}, 200
 
+def open_import_upload():
+    """
+    Return (lines, format) for a multipart 'file' upload or a raw request body.
+    `lines` is a text stream read line by line, so large files aren't loaded whole.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream, filename, mimetype = request.stream, None, request.mimetype
+    fmt = detect_format(request.args.get('format'), filename, mimetype)
+    return TextIOWrapper(stream, encoding='utf-8-sig', newline=''), fmt
+
+
+def run_import(importer, label):
+    """Run an import over the uploaded file and map its failure modes to responses."""
+    try:
+        lines, fmt = open_import_upload()
+        summary = importer(lines, fmt)
+    except ImportFormatError as e:
+        return {'message': str(e)}, 400
+    except ImportAborted as e:
+        # Batches committed before the failure stay; report them with the error
+        db.session.rollback()
+        if isinstance(e.cause, UnicodeDecodeError):
+            return dict(e.summary, message='Import file must be UTF-8 encoded'), 400
+        print(f"Error importing {label}: {e.cause}")
+        return dict(e.summary, message=f'{label.capitalize()} import failed partway'), 500
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return {'message': 'Import file must be UTF-8 encoded'}, 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error importing {label}: {e}")
+        return {'message': f'{label.capitalize()} import failed'}, 500
+    if not summary['created'] and not summary['failed']:
+        return {'message': 'No import data provided'}, 400
+    return summary, 200
+
+
+class AdminUserImport(Resource):
+    @admin_required()
+    def post(self):
+        response, status = run_import(import_users, 'user')
+        if status == 200 and response['created']:
+            invalidate_tags('users')
+        return response, status
+
+    def options(self):
+        return {'Allow': 'POST, OPTIONS'}, 200
+
 class AdminUserResource(Resource):
     @admin_required()
     def delete(self, user_id):
-        cache.clear()
         user = db.session.get(User, user_id)
         if not user:
             return {'message': 'User not found'}, 404
         
         db.session.delete(user)
         db.session.commit()
+        invalidate_tags('users', f'user:{user_id}:scores', f'user:{user_id}:answers')
         return {'message': f'User with ID {user_id} deleted successfully'}, 204
 
 
+class AdminQuizAnalytics(Resource):
+    @admin_required()
+    def get(self, quiz_id):
+        if db.session.get(Quiz, quiz_id) is None:
+            return {'message': 'Quiz not found'}, 404
+        # Precomputed by the question analytics job
+        return quiz_analytics(quiz_id), 200
+
+    def options(self, quiz_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
 class AdminDashboardStats(Resource):
     @admin_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
     def get(self):
-        total_users = User.query.count()
-        total_subjects = Subject.query.count()
-        total_chapters = Chapter.query.count()
-        total_quizzes = Quiz.query.count()
-        total_questions = Question.query.count()
-        total_scores = Score.query.count()
-
-        all_scores = [s.score for s in Score.query.all()]
-        average_score = sum(all_scores) / len(all_scores) if all_scores else 0
+        # Single-row read; the counters are kept current by the stats flush hook
+        stats = get_global_stats()
+        average_score = stats.score_sum / stats.total_scores if stats.total_scores else 0
 
         return {
-            'total_users': total_users,
-            'total_subjects': total_subjects,
-            'total_chapters': total_chapters,
-            'total_quizzes': total_quizzes,
-            'total_questions': total_questions,
-            'total_scores': total_scores,
+            'total_users': stats.total_users,
+            'total_subjects': stats.total_subjects,
+            'total_chapters': stats.total_chapters,
+            'total_quizzes': stats.total_quizzes,
+            'total_questions': stats.total_questions,
+            'total_scores': stats.total_scores,
             'average_score': round(average_score, 2)
         }, 200
 
@@ -637,35 +971,49 @@ class AdminDashboardStats(Resource):
         return {'Allow': 'GET, OPTIONS'}, 200
 
 
+REPORT_JOB_STATES = {
+    'PENDING': 'queued',
+    'RECEIVED': 'queued',
+    'STARTED': 'running',
+    'PROGRESS': 'running',
+    'RETRY': 'running',
+    'SUCCESS': 'finished',
+    'FAILURE': 'failed',
+    'REVOKED': 'failed',
+}
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+def start_report_job(task, description, **kwargs):
+    try:
+        result = task.apply_async(kwargs=kwargs)
+    except Exception as e:
+        print(f"ERROR: Failed to queue {description}: {e}")
+        import traceback
+        traceback.print_exc()
+        return {'message': f'Failed to initiate {description}'}, 500
+    return {
+        'message': f'{description.capitalize()} started',
+        'job_id': result.id,
+        'status_url': f'/api/admin/reports/jobs/{result.id}',
+    }, 202
+
+
 class AdminReportExport(Resource):
     @admin_required()
     def post(self):
-        cache.clear()
-        try:
-            result = export_users_csv.apply_async()
-            csv_content = result.get(timeout=60)
+        return start_report_job(export_users_csv, 'CSV export')
 
-            if isinstance(csv_content, dict) and csv_content.get('status') == 'error':
-                return {'message': csv_content.get('message', 'Failed to generate CSV report')}, 500
+    def options(self):
+        return {'Allow': 'POST, OPTIONS'}, 200
 
-            buffer = BytesIO(csv_content.encode('utf-8'))
-            buffer.seek(0)
 
-            return send_file(
-                buffer,
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name='users_report.csv'
-            )
-
-        except TimeoutError:
-            print("ERROR: Celery task timed out.")
-            return {'message': 'CSV export task timed out. Please try again later.'}, 504
-        except Exception as e:
-            print(f"ERROR: Failed to initiate CSV export: {e}")
-            import traceback
-            traceback.print_exc()
-            return {'message': 'Failed to initiate CSV export or process result'}, 500
+class AdminColumnarExport(Resource):
+    @admin_required()
+    def post(self):
+        # ?incremental=1 exports only scores and answers newer than the previous export
+        incremental = request.args.get('incremental', '0').lower() in ('1', 'true', 'yes')
+        return start_report_job(export_analytics_columnar, 'analytics export', incremental=incremental)
 
     def options(self):
         return {'Allow': 'POST, OPTIONS'}, 200
@@ -674,39 +1022,96 @@ class AdminReportExport(Resource):
 class AdminMonthlyReportTrigger(Resource):
     @admin_required()
     def post(self):
-        cache.clear()
-        try:
-            result = generate_monthly_report.apply_async()
-            report_html_content = result.get(timeout=60)
+        return start_report_job(generate_monthly_report, 'monthly report')
 
-            if isinstance(report_html_content, dict) and report_html_content.get('status') == 'error':
-                return {'message': report_html_content.get('message', 'Failed to generate monthly report')}, 500
+    def options(self):
+        return {'Allow': 'POST, OPTIONS'}, 200
+
+
+class AdminReportJobStatus(Resource):
+    @admin_required()
+    def get(self, job_id):
+        result = celery.AsyncResult(job_id)
+        state = REPORT_JOB_STATES.get(result.state, 'running')
+        response = {'job_id': job_id, 'status': state}
+
+        if result.state == 'PROGRESS' and isinstance(result.info, dict):
+            response['progress'] = {'current': result.info.get('current'), 'total': result.info.get('total')}
+        elif state == 'finished':
+            payload = result.result
+            if not isinstance(payload, dict) or payload.get('status') != 'success':
+                response['status'] = 'failed'
+                response['message'] = payload.get('message', 'Report generation failed') if isinstance(payload, dict) else 'Report generation failed'
+            else:
+                response['filename'] = payload.get('filename')
+                response['download_url'] = f'/api/admin/reports/jobs/{job_id}/download'
+        elif state == 'failed':
+            response['message'] = str(result.info) if result.info else 'Report generation failed'
+
+        return response, 200
+
+    def options(self, job_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
+class AdminReportJobDownload(Resource):
+    @admin_required()
+    def get(self, job_id):
+        result = celery.AsyncResult(job_id)
+        if result.state != 'SUCCESS':
+            return {'message': 'Report is not ready yet', 'status': REPORT_JOB_STATES.get(result.state, 'running')}, 409
+
+        payload = result.result
+        if not isinstance(payload, dict) or payload.get('status') != 'success':
+            return {'message': payload.get('message', 'Report generation failed') if isinstance(payload, dict) else 'Report generation failed'}, 500
 
-            buffer = BytesIO(report_html_content.encode('utf-8'))
-            buffer.seek(0)
+        if 'artifact' in payload:
+            try:
+                store = get_artifact_store(payload['artifact'].get('store'))
+                available = store.exists(payload['artifact'])
+            except (KeyError, ValueError) as e:
+                print(f"ERROR: Unusable report artifact reference for job {job_id}: {e}")
+                available = False
+            if not available:
+                return {'message': 'Report file is no longer available. Please generate it again.'}, 410
+            return store.send(
+                payload['artifact'],
+                mimetype=payload.get('mimetype', 'application/octet-stream'),
+                download_name=payload.get('filename', 'report')
+            )
 
+        # Results from before the artifact store: a plain file path or the content itself
+        if 'path' in payload:
+            if not os.path.exists(payload['path']):
+                return {'message': 'Report file is no longer available. Please generate it again.'}, 410
             return send_file(
-                buffer,
-                mimetype='text/html',
+                payload['path'],
+                mimetype=payload.get('mimetype', 'application/octet-stream'),
                 as_attachment=True,
-                download_name=f'monthly_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.html'
+                download_name=payload.get('filename', 'report')
             )
 
-        except TimeoutError:
-            print("ERROR: Celery task timed out.")
-            return {'message': 'Monthly report task timed out. Please try again later.'}, 504
-        except Exception as e:
-            print(f"ERROR: Failed to initiate monthly report: {e}")
-            import traceback
-            traceback.print_exc()
-            return {'message': 'Failed to initiate monthly report generation or process result'}, 500
+        content = payload['content'].encode('utf-8')
 
-    def options(self):
-        return {'Allow': 'POST, OPTIONS'}, 200
+        def generate():
+            for offset in range(0, len(content), DOWNLOAD_CHUNK_SIZE):
+                yield content[offset:offset + DOWNLOAD_CHUNK_SIZE]
+
+        return Response(
+            generate(),
+            mimetype=payload.get('mimetype', 'application/octet-stream'),
+            headers={
+                'Content-Disposition': f'attachment; filename="{payload.get("filename", "report")}"',
+                'Content-Length': str(len(content)),
+            }
+        )
+
+    def options(self, job_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
 
 class UserAccessibleSubjects(Resource):
         @jwt_required()
-        @cache.cached(timeout=60) # Cache for 60 seconds
+        @cached_with_tags(['subjects'], timeout=60)
         def get(self):
             subjects = Subject.query.all()
             return [{'id': s.id, 'name': s.name, 'description': s.description} for s in subjects], 200
@@ -728,7 +1133,10 @@ class UserProfileResource(Resource):
         if not user:
             return {'message': 'User not found'}, 404
         
-        return user.as_dict(), 200
+        data = user.as_dict()
+        user_stats = get_user_stats(user_id)
+        data['stats'] = user_stats.as_dict() if user_stats else None
+        return data, 200
 
     @jwt_required() # Protected, but not necessarily admin_required
     def put(self, user_id):
@@ -761,6 +1169,7 @@ class UserProfileResource(Resource):
         user.qualification = qualification
         user.dob = dob
         db.session.commit()
+        invalidate_tags('users')
         return user.as_dict(), 200
 
     # --- NEW: Add OPTIONS method for CORS preflight ---
@@ -771,51 +1180,53 @@ class UserProfileResource(Resource):
 
 class UserAccessibleChaptersBySubject(Resource):
     @jwt_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['subject:{subject_id}', 'subject:{subject_id}:chapters'], timeout=60, query_string=True)
     def get(self, subject_id):
         subject = db.session.get(Subject, subject_id)
         if not subject:
             return {'message': 'Subject not found'}, 404
 
-        chapters = Chapter.query.filter_by(subject_id=subject_id).all()
-        return [{'id': c.id, 'subject_id': c.subject_id, 'name': c.name, 'description': c.description} for c in chapters], 200
+        chapters, next_cursor, limit = paginate(chapters_by_subject_query(subject_id), Chapter.id, CHAPTER_SORTS)
+        return page_response([{'id': c.id, 'subject_id': c.subject_id, 'name': c.name, 'description': c.description} for c in chapters], next_cursor, limit), 200
 
     def options(self, subject_id):
         return {'Allow': 'GET, OPTIONS'}, 200
 
 class UserAccessibleQuizzesByChapter(Resource):
     @jwt_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['chapter:{chapter_id}', 'chapter:{chapter_id}:quizzes'], timeout=60, query_string=True)
     def get(self, chapter_id):
         chapter = db.session.get(Chapter, chapter_id)
         if not chapter:
             return {'message': 'Chapter not found'}, 404
 
-        quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
-        return [{'id': q.id, 'chapter_id': q.chapter_id, 'title': q.title, 'description': q.description, 'time_duration': q.time_duration, 'date_of_quiz': q.date_of_quiz.isoformat()} for q in quizzes], 200
+        quizzes, next_cursor, limit = paginate(quizzes_by_chapter_query(chapter_id), Quiz.id, QUIZ_SORTS)
+        return page_response([{'id': q.id, 'chapter_id': q.chapter_id, 'title': q.title, 'description': q.description, 'time_duration': q.time_duration, 'date_of_quiz': q.date_of_quiz.isoformat()} for q in quizzes], next_cursor, limit), 200
 
     def options(self, chapter_id):
         return {'Allow': 'GET, OPTIONS'}, 200
 
 class UserAccessibleQuestionsByQuiz(Resource):
     @jwt_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
     def get(self, quiz_id):
-        quiz = db.session.get(Quiz, quiz_id)
-        if not quiz:
+        # Precompiled bytes kept current by the quiz snapshot flush hook
+        response = serve_quiz_snapshot(quiz_id)
+        if response is None:
             return {'message': 'Quiz not found'}, 404
-
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        return [{'id': q.id, 'quiz_id': q.quiz_id, 'question_text': q.question_text, 'option1': q.option1, 'option2': q.option2, 'option3': q.option3, 'option4': q.option4, 'correct_option': q.correct_option} for q in questions], 200
+        return response
 
     def options(self, quiz_id):
         return {'Allow': 'GET, OPTIONS'}, 200
 
 
+# HTTP status for each submission state; polling a queued one keeps answering 202
+SUBMISSION_STATUS_CODES = {'queued': 202, 'graded': 200, 'failed': 404}
+# Lets the first submits of a burst share one worker batch
+INGEST_KICK_DELAY = 0.5
+
 class QuizAttemptSubmit(Resource):
     @jwt_required()
     def post(self):
-        cache.clear() # Clears ALL cache after modification
         try:
             raw_identity = get_jwt_identity()
             current_user_identity = json.loads(raw_identity)
@@ -827,64 +1238,66 @@ class QuizAttemptSubmit(Resource):
 
             if not all([quiz_id, answers]):
                 return {'message': 'Quiz ID and answers are required'}, 400
-
-            quiz = db.session.get(Quiz, quiz_id)
-            if not quiz:
+            if not isinstance(answers, list) or not all(isinstance(answer_data, dict) for answer_data in answers):
+                return {'message': 'answers must be a list of objects'}, 400
+
+            # Retries of a submit carry the same Idempotency-Key and get the first result back
+            submission_key = request.headers.get('Idempotency-Key') or data.get('submission_id') or new_submission_key()
+            if not valid_submission_key(submission_key):
+                return {'message': 'Idempotency-Key must be 8-64 letters, digits, "-" or "_"'}, 400
+            previous = submission_status(user_id, submission_key)
+            if previous is not None:
+                return previous, SUBMISSION_STATUS_CODES[previous['status']]
+
+            # Served from the in-process/Redis answer key cache; the questions table isn't read
+            answer_key = get_answer_key(quiz_id)
+            if answer_key is None:
                 return {'message': 'Quiz not found'}, 404
 
-            quiz_questions = Question.query.filter_by(quiz_id=quiz_id).all()
-            correct_answers_map = {q.id: q.correct_option for q in quiz_questions}
-
-            calculated_score = 0
-            correct_answers_count = 0
-            
+            # Checked here, before anything is queued, as the ingest task can't report it back.
+            # The quiz page sends 0 for a question left unanswered.
+            sent = {}
             for answer_data in answers:
                 question_id = answer_data.get('question_id')
                 selected_option = answer_data.get('selected_option')
-
-                if question_id not in correct_answers_map:
+                if not isinstance(question_id, int) or question_id not in answer_key or selected_option in (None, 0):
                     continue
-
-                existing_user_answer = UserAnswer.query.filter_by(
-                    user_id=user_id,
-                    quiz_id=quiz_id,
-                    question_id=question_id
-                ).first()
-
-                if existing_user_answer:
-                    existing_user_answer.selected_option = selected_option
-                    existing_user_answer.attempt_timestamp = datetime.utcnow()
-                else:
-                    new_user_answer = UserAnswer(
-                        user_id=user_id,
-                        quiz_id=quiz_id,
-                        question_id=question_id,
-                        selected_option=selected_option,
-                        attempt_timestamp=datetime.utcnow()
-                    )
-                    db.session.add(new_user_answer)
-                
-                if selected_option == correct_answers_map[question_id]:
-                    calculated_score += 1
-                    correct_answers_count += 1
-            
-            db.session.commit()
-            new_score_entry = Score(
-                user_id=user_id,
-                quiz_id=quiz_id,
-                score=calculated_score,
-                attempt_timestamp=datetime.utcnow()
-            )
-            db.session.add(new_score_entry)
-            db.session.commit()
-
-            return {
-                'message': 'Quiz submitted successfully!',
-                'final_score': calculated_score,
-                'correct_answers_count': correct_answers_count,
-                'total_questions': len(quiz_questions)
-            }, 200
+                if selected_option not in [1, 2, 3, 4] or isinstance(selected_option, bool):
+                    return {'message': 'Selected option must be 1, 2, 3, or 4'}, 400
+                sent[question_id] = selected_option
+
+            # Autosaved answers first, so anything sent with the submission overrides them.
+            # Last answer per question wins, mirroring what the upsert keeps.
+            submitted = {question_id: option for question_id, option in drain_buffered_answers(user_id, quiz_id).items() if question_id in answer_key}
+            submitted.update(sent)
+
+            if SUBMISSION_MODE == 'queued':
+                try:
+                    previous = enqueue_submission(user_id, quiz_id, submission_key, submitted)
+                    if previous is not None:
+                        return previous, SUBMISSION_STATUS_CODES[previous['status']]
+                    if should_kick_ingest():
+                        ingest_submissions.apply_async(countdown=INGEST_KICK_DELAY)
+                    return {
+                        'message': 'Quiz submission received',
+                        'status': 'queued',
+                        'submission_id': submission_key,
+                        'status_url': f'/api/submissions/{submission_key}'
+                    }, 202
+                except RedisError as e:
+                    print(f"ERROR: Submission queue unavailable, grading inline: {e}")
+
+            result = record_submissions([{
+                'user_id': user_id,
+                'quiz_id': quiz_id,
+                'submission_key': submission_key,
+                'answers': list(submitted.items()),
+                'submitted_at': datetime.utcnow()
+            }])[(user_id, submission_key)]
+            invalidate_tags(f'user:{user_id}:scores', f'user:{user_id}:answers')
+            return result, SUBMISSION_STATUS_CODES[result['status']]
         except Exception as e:
+            db.session.rollback()
             print(f"ERROR: Quiz submission failed: {e}")
             import traceback
             traceback.print_exc()
@@ -894,25 +1307,54 @@ class QuizAttemptSubmit(Resource):
         return {'Allow': 'POST, OPTIONS'}, 200
 
 
+class SubmissionStatus(Resource):
+    @jwt_required()
+    def get(self, submission_id):
+        raw_identity = get_jwt_identity()
+        current_user_identity = json.loads(raw_identity)
+        user_id = current_user_identity['id']
+
+        status = submission_status(user_id, submission_id)
+        if status is None:
+            return {'message': 'Submission not found'}, 404
+        return status, SUBMISSION_STATUS_CODES[status['status']]
+
+    def options(self, submission_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
 class UserScores(Resource):
     @jwt_required()
+    @cached_with_tags(['user:{user_id}:scores', 'quizzes', 'chapters', 'subjects'], timeout=60, query_string=True)
     def get(self):
         raw_identity = get_jwt_identity()
         current_user_identity = json.loads(raw_identity)
         user_id = current_user_identity['id']
-        
-        scores = Score.query.filter_by(user_id=user_id).all()
-        all_quizzes = Quiz.query.all()
-        quiz_titles = {q.id: q.title for q in all_quizzes}
 
-        return [{
+        try:
+            date_from = request.args.get('from', type=str, default='').strip()
+            date_to = request.args.get('to', type=str, default='').strip()
+            date_from = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+            date_to = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1) if date_to else None
+        except ValueError:
+            return {'message': 'Invalid date format for from/to. Use YYYY-MM-DD.'}, 400
+
+        scores, next_cursor, limit = paginate(
+            score_history_query(user_id, date_from, date_to), Score.id, SCORE_HISTORY_SORTS, default_sort='-id'
+        )
+
+        return page_response([{
             'id': s.id,
             'user_id': s.user_id,
             'quiz_id': s.quiz_id,
             'score': s.score,
             'attempt_timestamp': s.attempt_timestamp.isoformat(),
-            'quiz_title': quiz_titles.get(s.quiz_id, 'Unknown Quiz')
-        } for s in scores], 200
+            'quiz_title': s.quiz_title or 'Unknown Quiz',
+            'chapter_id': s.chapter_id,
+            'chapter_name': s.chapter_name,
+            'subject_id': s.subject_id,
+            'subject_name': s.subject_name
+        } for s in scores], next_cursor, limit), 200
 
     @jwt_required()
     def post(self):
@@ -931,6 +1373,12 @@ class UserScores(Resource):
         if not quiz:
             return {'message': 'Quiz not found'}, 404
 
+        # Checked before the Score is added, as the stats and distribution hooks sum it
+        answer_key = get_answer_key(quiz_id)
+        question_count = len(answer_key) if answer_key is not None else 0
+        if not isinstance(score_value, int) or isinstance(score_value, bool) or not 0 <= score_value <= question_count:
+            return {'message': f'Score must be a whole number from 0 to {question_count}'}, 400
+
         new_score = Score(
             user_id=user_id,
             quiz_id=quiz_id,
@@ -939,22 +1387,19 @@ class UserScores(Resource):
         )
         db.session.add(new_score)
         db.session.commit()
+        invalidate_tags(f'user:{user_id}:scores')
         return {'message': 'Score saved successfully', 'score_id': new_score.id}, 201
 
 
 class UserAnswers(Resource):
     @jwt_required()
-    @cache.cached(timeout=60, key_prefix='user_answers', make_cache_key=lambda *args, **kwargs: str(json.loads(get_jwt_identity())['id']) + str(kwargs['quiz_id']) + str(kwargs['question_id']))
+    @cached_with_tags(['user:{user_id}:answers'], timeout=60)
     def get(self, quiz_id, question_id): # This GET method is not used in frontend, but good for completeness
         raw_identity = get_jwt_identity()
         current_user_identity = json.loads(raw_identity)
         user_id = current_user_identity['id']
 
-        user_answer = UserAnswer.query.filter_by(
-            user_id=user_id,
-            quiz_id=quiz_id,
-            question_id=question_id
-        ).first()
+        user_answer = user_answer_query(user_id, quiz_id, question_id).first()
 
         if not user_answer:
             return {'message': 'Answer not found'}, 404
@@ -962,7 +1407,6 @@ class UserAnswers(Resource):
 
     @jwt_required()
     def post(self):
-        cache.clear() # Clears ALL cache after modification
         raw_identity = get_jwt_identity()
         current_user_identity = json.loads(raw_identity)
         user_id = current_user_identity['id']
@@ -974,67 +1418,218 @@ class UserAnswers(Resource):
 
         if not all([quiz_id, question_id, selected_option is not None]):
             return {'message': 'Quiz ID, Question ID, and selected option are required'}, 400
-        
-        quiz = db.session.get(Quiz, quiz_id)
-        question = db.session.get(Question, question_id)
-        if not quiz or not question:
-            return {'message': 'Quiz or Question not found'}, 404
 
-        existing_answer = UserAnswer.query.filter_by(
-            user_id=user_id,
-            quiz_id=quiz_id,
-            question_id=question_id
-        ).first()
-
-        if existing_answer:
-            existing_answer.selected_option = selected_option
-            existing_answer.attempt_timestamp = datetime.utcnow()
-        else:
-            new_answer = UserAnswer(
-                user_id=user_id,
-                quiz_id=quiz_id,
-                question_id=question_id,
-                selected_option=selected_option,
-                attempt_timestamp=datetime.utcnow()
-            )
-            db.session.add(new_answer)
-        
-        db.session.commit()
-        return {'message': 'User answer saved successfully', 'answer_id': new_answer.id}, 201
+        # A single-answer autosave; goes through the same buffer as batches
+        return autosave_answers(user_id, quiz_id, [{'question_id': question_id, 'selected_option': selected_option}])
 
     def options(self):
         return {'Allow': 'POST, OPTIONS'}, 200
 
+
+def autosave_answers(user_id, quiz_id, answers):
+    """Validate a batch of in-progress answers and hand it to the autosave buffer."""
+    if not isinstance(answers, list) or not answers:
+        return {'message': 'answers must be a non-empty list'}, 400
+    if len(answers) > MAX_AUTOSAVE_BATCH:
+        return {'message': f'At most {MAX_AUTOSAVE_BATCH} answers per request'}, 400
+
+    answer_key = get_answer_key(quiz_id)
+    if answer_key is None:
+        return {'message': 'Quiz not found'}, 404
+
+    # Later entries for the same question win
+    batch = {}
+    for answer_data in answers:
+        question_id = answer_data.get('question_id') if isinstance(answer_data, dict) else None
+        selected_option = answer_data.get('selected_option') if isinstance(answer_data, dict) else None
+        if question_id not in answer_key:
+            return {'message': f'Question {question_id} is not part of this quiz'}, 400
+        if selected_option not in [1, 2, 3, 4] or isinstance(selected_option, bool):
+            return {'message': 'Selected option must be 1, 2, 3, or 4'}, 400
+        batch[question_id] = selected_option
+
+    time_duration = db.session.query(Quiz.time_duration).filter_by(id=quiz_id).scalar()
+    try:
+        buffered = buffer_answers(user_id, quiz_id, batch, autosave_ttl(time_duration or 0))
+    except Exception as e:
+        db.session.rollback()
+        print(f"ERROR: Autosave failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return {'message': 'Autosave failed internally'}, 500
+    if not buffered:
+        invalidate_tags(f'user:{user_id}:answers')
+    return {'message': 'Answers saved', 'saved': len(batch)}, 202
+
+
+class AutosaveAnswers(Resource):
+    @jwt_required()
+    def post(self, quiz_id):
+        raw_identity = get_jwt_identity()
+        current_user_identity = json.loads(raw_identity)
+        user_id = current_user_identity['id']
+
+        data = request.get_json(silent=True) or {}
+        return autosave_answers(user_id, quiz_id, data.get('answers'))
+
+    def options(self, quiz_id):
+        return {'Allow': 'POST, OPTIONS'}, 200
+
 class UserAccessibleAllQuizzes(Resource):
     @jwt_required()
-    @cache.cached(timeout=60) # Cache for 60 seconds
+    @cached_with_tags(['quizzes'], timeout=60, query_string=True)
     def get(self):
-        quizzes = Quiz.query.all()
-        return [{'id': q.id, 'chapter_id': q.chapter_id, 'title': q.title, 'description': q.description, 'time_duration': q.time_duration, 'date_of_quiz': q.date_of_quiz.isoformat()} for q in quizzes], 200
+        quizzes, next_cursor, limit = paginate(Quiz.query, Quiz.id, QUIZ_SORTS)
+        return page_response([{'id': q.id, 'chapter_id': q.chapter_id, 'title': q.title, 'description': q.description, 'time_duration': q.time_duration, 'date_of_quiz': q.date_of_quiz.isoformat()} for q in quizzes], next_cursor, limit), 200
 
     def options(self):
         return {'Allow': 'GET, OPTIONS'}, 200
 
 class UserDashboardStats(Resource):
     @jwt_required()
-    @cache.cached(timeout=60, key_prefix='user_dashboard_stats', make_cache_key=lambda *args, **kwargs: str(json.loads(get_jwt_identity())['id']))
     def get(self):
         raw_identity = get_jwt_identity()
         current_user_identity = json.loads(raw_identity)
         user_id = current_user_identity['id']
 
-        total_quizzes_attempted = Score.query.filter_by(user_id=user_id).count()
-        user_scores = Score.query.filter_by(user_id=user_id).all()
-        average_user_score = sum(s.score for s in user_scores) / len(user_scores) if user_scores else 0
+        # One primary-key read of the rolling aggregate kept by the stats flush hook
+        user_stats = get_user_stats(user_id)
+        summary = user_stats.as_dict() if user_stats else {'attempts': 0, 'average_score': 0, 'best_score': None, 'last_attempt_at': None, 'subjects': []}
 
         return {
-            'total_quizzes_attempted': total_quizzes_attempted,
-            'average_user_score': round(average_user_score, 2)
+            'total_quizzes_attempted': summary['attempts'],
+            'average_user_score': summary['average_score'],
+            'best_score': summary['best_score'],
+            'last_attempt_at': summary['last_attempt_at'],
+            'subjects': summary['subjects']
         }, 200
 
     def options(self):
         return {'Allow': 'GET, OPTIONS'}, 200
 
+class Search(Resource):
+    @jwt_required()
+    def get(self):
+        query_text = request.args.get('q', type=str, default='').strip()
+        if not query_text:
+            return {'message': 'Search query (q) is required'}, 400
+
+        kinds = [k.strip() for k in request.args.get('types', type=str, default='').split(',') if k.strip()]
+        unknown = [k for k in kinds if k not in SEARCHABLE]
+        if unknown:
+            return {'message': f'Unknown search types: {", ".join(unknown)}'}, 400
+
+        limit = request.args.get('limit', type=int, default=DEFAULT_SEARCH_LIMIT)
+        if limit is None or limit < 1:
+            return {'message': 'limit must be a positive integer'}, 400
+
+        hits = search(query_text, kinds or None, min(limit, MAX_SEARCH_LIMIT))
+        return {'query': query_text, 'results': hits}, 200
+
+    def options(self):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+def leaderboard_response(kind, board_id):
+    """Top entries of a quiz or subject board plus the caller's own rank."""
+    limit = request.args.get('limit', type=int, default=DEFAULT_LEADERBOARD_LIMIT)
+    if limit is None or limit < 1:
+        return {'message': 'limit must be a positive integer'}, 400
+    limit = min(limit, MAX_LEADERBOARD_LIMIT)
+
+    current_user_identity = json.loads(get_jwt_identity())
+    try:
+        leaderboards = get_leaderboards()
+        top = leaderboards.top(kind, board_id, limit)
+        total_entries = leaderboards.size(kind, board_id)
+        # Admin ids live in another table, so only users have a place on the board
+        mine = leaderboards.rank(kind, board_id, current_user_identity['id']) if current_user_identity.get('role') == 'user' else None
+    except RedisError as e:
+        print(f"ERROR: Leaderboard unavailable: {e}")
+        return {'message': 'Leaderboard is temporarily unavailable'}, 503
+
+    names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_([user_id for user_id, _ in top])).all())
+    return {
+        f'{kind}_id': board_id,
+        'entries': [
+            {'rank': rank, 'user_id': user_id, 'full_name': names.get(user_id), 'score': int(score)}
+            for rank, (user_id, score) in enumerate(top, start=1)
+        ],
+        'total_entries': total_entries,
+        'me': {'rank': mine[0], 'score': int(mine[1])} if mine else None
+    }, 200
+
+
+class QuizLeaderboard(Resource):
+    @jwt_required()
+    def get(self, quiz_id):
+        if db.session.get(Quiz, quiz_id) is None:
+            return {'message': 'Quiz not found'}, 404
+        return leaderboard_response('quiz', quiz_id)
+
+    def options(self, quiz_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
+class SubjectLeaderboard(Resource):
+    @jwt_required()
+    def get(self, subject_id):
+        if db.session.get(Subject, subject_id) is None:
+            return {'message': 'Subject not found'}, 404
+        return leaderboard_response('subject', subject_id)
+
+    def options(self, subject_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+class QuizScorePercentile(Resource):
+    @jwt_required()
+    def get(self, quiz_id):
+        if db.session.get(Quiz, quiz_id) is None:
+            return {'message': 'Quiz not found'}, 404
+        score = request.args.get('score', type=int)
+        if score is None:
+            # Defaults to the caller's latest attempt
+            current_user_identity = json.loads(get_jwt_identity())
+            if current_user_identity.get('role') == 'user':
+                score = db.session.query(Score.score) \
+                    .filter(Score.user_id == current_user_identity['id'], Score.quiz_id == quiz_id) \
+                    .order_by(Score.id.desc()).limit(1).scalar()
+            if score is None:
+                return {'message': 'score is required when you have no attempt on this quiz'}, 400
+
+        # Answered from the quiz's stored sketch; the scores table isn't scanned
+        sketch = quiz_score_sketch(quiz_id)
+        return {
+            'quiz_id': quiz_id,
+            'score': score,
+            'percentile': sketch.percentile_rank(score),
+            'attempts': sketch.total
+        }, 200
+
+    def options(self, quiz_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
+class AdminQuizScoreDistribution(Resource):
+    @admin_required()
+    def get(self, quiz_id):
+        if db.session.get(Quiz, quiz_id) is None:
+            return {'message': 'Quiz not found'}, 404
+        return dict(quiz_id=quiz_id, **quiz_score_sketch(quiz_id).summary()), 200
+
+    def options(self, quiz_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
+
+class AdminSubjectScoreDistribution(Resource):
+    @admin_required()
+    def get(self, subject_id):
+        if db.session.get(Subject, subject_id) is None:
+            return {'message': 'Subject not found'}, 404
+        return dict(subject_id=subject_id, **subject_score_sketch(subject_id).summary()), 200
+
+    def options(self, subject_id):
+        return {'Allow': 'GET, OPTIONS'}, 200
+
 # Register the resource with the API
 api.add_resource(HelloWorld, '/')
 api.add_resource(Login, '/login')
@@ -1046,22 +1641,39 @@ api.add_resource(ChapterResource, '/api/chapters/<int:chapter_id>')
 api.add_resource(QuizzesByChapter, '/api/chapters/<int:chapter_id>/quizzes')
 api.add_resource(QuizResource, '/api/quizzes/<int:quiz_id>')
 api.add_resource(QuestionsByQuiz, '/api/quizzes/<int:quiz_id>/questions')
+api.add_resource(QuizQuestionsImport, '/api/quizzes/<int:quiz_id>/questions/import')
+api.add_resource(QuizQuestionsExport, '/api/quizzes/<int:quiz_id>/questions/export')
+api.add_resource(ChapterQuestionsImport, '/api/chapters/<int:chapter_id>/questions/import')
+api.add_resource(ChapterQuestionsExport, '/api/chapters/<int:chapter_id>/questions/export')
 api.add_resource(QuestionResource, '/api/questions/<int:question_id>')
 api.add_resource(UserAccessibleSubjects, '/api/user/subjects')
 api.add_resource(UserAccessibleChaptersBySubject, '/api/user/subjects/<int:subject_id>/chapters')
 api.add_resource(UserAccessibleQuizzesByChapter, '/api/user/chapters/<int:chapter_id>/quizzes')
 api.add_resource(UserAccessibleQuestionsByQuiz, '/api/user/quizzes/<int:quiz_id>/questions')
 api.add_resource(QuizAttemptSubmit, '/api/quiz_attempt_submit')
+api.add_resource(SubmissionStatus, '/api/submissions/<string:submission_id>')
 api.add_resource(AdminUsers, '/api/admin/users')
+api.add_resource(AdminUserImport, '/api/admin/users/import')
 api.add_resource(AdminUserResource, '/api/admin/users/<int:user_id>')
 api.add_resource(UserProfileResource, '/api/users/<int:user_id>')
 api.add_resource(UserScores, '/api/scores')
 api.add_resource(UserAnswers, '/api/user_answers')
+api.add_resource(AutosaveAnswers, '/api/user/quizzes/<int:quiz_id>/autosave')
 api.add_resource(UserAccessibleAllQuizzes, '/api/quizzes/all')
 api.add_resource(AdminDashboardStats, '/api/admin/dashboard/stats')
+api.add_resource(AdminQuizAnalytics, '/api/admin/quizzes/<int:quiz_id>/analytics')
 api.add_resource(UserDashboardStats, '/api/user/dashboard/stats')
 api.add_resource(AdminReportExport, '/api/admin/reports/export-csv')
+api.add_resource(AdminColumnarExport, '/api/admin/reports/export-columnar')
 api.add_resource(AdminMonthlyReportTrigger, '/api/admin/reports/generate-monthly')
+api.add_resource(AdminReportJobStatus, '/api/admin/reports/jobs/<string:job_id>')
+api.add_resource(AdminReportJobDownload, '/api/admin/reports/jobs/<string:job_id>/download')
+api.add_resource(Search, '/api/search')
+api.add_resource(QuizLeaderboard, '/api/quizzes/<int:quiz_id>/leaderboard')
+api.add_resource(SubjectLeaderboard, '/api/subjects/<int:subject_id>/leaderboard')
+api.add_resource(QuizScorePercentile, '/api/quizzes/<int:quiz_id>/percentile')
+api.add_resource(AdminQuizScoreDistribution, '/api/admin/quizzes/<int:quiz_id>/score-distribution')
+api.add_resource(AdminSubjectScoreDistribution, '/api/admin/subjects/<int:subject_id>/score-distribution')
 
 
 if __name__ == "__main__":
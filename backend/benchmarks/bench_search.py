@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_search.py
+#
+# Compares the old ilike('%q%') scans with the full-text search index on a
+# synthetic question bank. Run from the backend directory:
+#
+#     python benchmarks/bench_search.py --questions 1000000 --repeat 20
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from extensions import db
+from model import Subject, Chapter, Quiz, Question
+from search import search, filter_by_search, rebuild_search_index
+
+SEED_BATCH_SIZE = 20000
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def make_vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return sorted({''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)})
+
+
+def seed(num_questions, vocabulary, rng):
+    subject = Subject(name='Bench', description='')
+    chapter = Chapter(subject=subject, name='Bench', description='')
+    quiz = Quiz(chapter=chapter, title='Bench', description='', time_duration=600)
+    db.session.add_all([subject, chapter, quiz])
+    db.session.commit()
+
+    # Core executemany in batches; the index is built afterwards in one rebuild
+    for start in range(0, num_questions, SEED_BATCH_SIZE):
+        rows = [
+            {'quiz_id': quiz.id, 'question_text': ' '.join(rng.choices(vocabulary, k=12)) + '?',
+             'option1': 'a', 'option2': 'b', 'option3': 'c', 'option4': 'd', 'correct_option': 1}
+            for _ in range(min(SEED_BATCH_SIZE, num_questions - start))
+        ]
+        db.session.execute(Question.__table__.insert(), rows)
+        db.session.commit()
+
+
+def timed(fn, terms):
+    start = time.perf_counter()
+    for term in terms:
+        fn(term)
+    return (time.perf_counter() - start) / len(terms) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--questions', type=int, default=200000)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            vocabulary = make_vocabulary(args.vocabulary, rng)
+
+            start = time.perf_counter()
+            seed(args.questions, vocabulary, rng)
+            print(f"seeded {args.questions} questions in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            rebuild_search_index()
+            print(f"built search index in {time.perf_counter() - start:.1f}s")
+
+            terms = rng.sample(vocabulary, args.repeat)
+
+            # What Subjects/ChaptersBySubject/QuizzesByChapter did before, applied to questions
+            def like_page(term):
+                return Question.query.filter(Question.question_text.ilike(f'%{term}%')).order_by(Question.id).limit(50).all()
+
+            def like_count(term):
+                return Question.query.filter(Question.question_text.ilike(f'%{term}%')).count()
+
+            def index_page(term):
+                return filter_by_search(Question.query, 'question', term).order_by(Question.id).limit(50).all()
+
+            def index_count(term):
+                return filter_by_search(Question.query, 'question', term).count()
+
+            def ranked(term):
+                return search(term, ['question'], 20)
+
+            results = [
+                ('ilike first page', timed(like_page, terms)),
+                ('ilike count', timed(like_count, terms)),
+                ('index first page', timed(index_page, terms)),
+                ('index count', timed(index_count, terms)),
+                ('/api/search ranked', timed(ranked, terms)),
+            ]
+            for label, ms in results:
+                print(f"{label:<20} {ms:9.2f} ms/query")
+            print(f"count speedup: {results[1][1] / results[3][1]:.1f}x")
+
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
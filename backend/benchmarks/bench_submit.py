@@ -0,0 +1,134 @@
+# backend/benchmarks/bench_submit.py
+#
+# Compares the old per-answer grading loop with submissions.record_submissions,
+# the path QuizAttemptSubmit.post grades through: one call per submission as in
+# inline mode, and batches of INGEST_BATCH_SIZE as the queued ingestion does.
+# Run from the backend directory:
+#
+#     python benchmarks/bench_submit.py --questions 100 --submissions 200
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, date
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from extensions import db, cache
+from model import User, Subject, Chapter, Quiz, Question, Score, UserAnswer
+from stats import rebuild_global_stats
+from submissions import record_submissions, new_submission_key, INGEST_BATCH_SIZE
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Answer keys are cached in process and behind a pointer in the app cache
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    db.init_app(app)
+    cache.init_app(app)
+    return app
+
+
+def seed(num_questions, num_users):
+    subject = Subject(name='Bench', description='')
+    chapter = Chapter(subject=subject, name='Bench', description='')
+    quiz = Quiz(chapter=chapter, title='Bench', description='', time_duration=600)
+    db.session.add_all([subject, chapter, quiz])
+    db.session.flush()
+    db.session.add_all([
+        Question(quiz_id=quiz.id, question_text=f'Q{i}', option1='a', option2='b', option3='c', option4='d', correct_option=(i % 4) + 1)
+        for i in range(num_questions)
+    ])
+    db.session.add_all([
+        User(email=f'u{i}@bench', password='x', full_name=f'User {i}', qualification='x', dob=date(2000, 1, 1))
+        for i in range(num_users)
+    ])
+    db.session.commit()
+    return quiz.id, [u.id for u in User.query.all()]
+
+
+def submit_legacy(submissions):
+    for user_id, quiz_id, answers in submissions:
+        _submit_legacy(user_id, quiz_id, answers)
+
+
+def _submit_legacy(user_id, quiz_id, answers):
+    """QuizAttemptSubmit.post before the bulk path: one query and one row per answer."""
+    quiz_questions = Question.query.filter_by(quiz_id=quiz_id).all()
+    correct_answers_map = {q.id: q.correct_option for q in quiz_questions}
+    calculated_score = 0
+    for answer_data in answers:
+        question_id = answer_data['question_id']
+        selected_option = answer_data['selected_option']
+        existing = UserAnswer.query.filter_by(user_id=user_id, quiz_id=quiz_id, question_id=question_id).first()
+        if existing:
+            existing.selected_option = selected_option
+            existing.attempt_timestamp = datetime.utcnow()
+        else:
+            db.session.add(UserAnswer(user_id=user_id, quiz_id=quiz_id, question_id=question_id,
+                                      selected_option=selected_option, attempt_timestamp=datetime.utcnow()))
+        if selected_option == correct_answers_map[question_id]:
+            calculated_score += 1
+    db.session.commit()
+    db.session.add(Score(user_id=user_id, quiz_id=quiz_id, score=calculated_score, attempt_timestamp=datetime.utcnow()))
+    db.session.commit()
+
+
+def submit_recorded(submissions, batch_size=1):
+    items = [{
+        'user_id': user_id,
+        'quiz_id': quiz_id,
+        'submission_key': new_submission_key(),
+        'answers': [(a['question_id'], a['selected_option']) for a in answers],
+        'submitted_at': datetime.utcnow()
+    } for user_id, quiz_id, answers in submissions]
+    for start in range(0, len(items), batch_size):
+        results = record_submissions(items[start:start + batch_size])
+        assert all(result['status'] == 'graded' for result in results.values())
+
+
+def run(label, submit, num_questions, num_submissions):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            rebuild_global_stats()
+            quiz_id, user_ids = seed(num_questions, num_users=max(1, num_submissions // 2))
+            question_ids = [q.id for q in Question.query.filter_by(quiz_id=quiz_id)]
+            answers = [{'question_id': qid, 'selected_option': (i % 4) + 1} for i, qid in enumerate(question_ids)]
+
+            # every user submits twice, so half the submissions exercise the update path
+            submissions = [(user_ids[i % len(user_ids)], quiz_id, answers) for i in range(num_submissions)]
+            start = time.perf_counter()
+            submit(submissions)
+            elapsed = time.perf_counter() - start
+            db.session.remove()
+            db.engine.dispose()
+            cache.clear()
+
+    rate = num_submissions / elapsed
+    print(f"{label:<8} {num_submissions} submissions x {num_questions} questions: {elapsed:.2f}s ({rate:.1f} submissions/s)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--submissions', type=int, default=200)
+    args = parser.parse_args()
+
+    legacy = run('legacy', submit_legacy, args.questions, args.submissions)
+    inline = run('inline', submit_recorded, args.questions, args.submissions)
+    queued = run('queued', partial(submit_recorded, batch_size=INGEST_BATCH_SIZE), args.questions, args.submissions)
+    print(f"speedup: inline {inline / legacy:.1f}x, queued {queued / legacy:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+# backend/bulk_import.py
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from model import User, Quiz, Question
+from passwords import hash_passwords
+from stats import adjust_global_stats
+from quiz_snapshots import compile_quiz_snapshots
+from cache_tags import invalidate_tags
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+# Rows per executemany INSERT and per commit
+IMPORT_BATCH_SIZE = 500
+
+USER_FIELDS = ('email', 'password', 'full_name', 'qualification', 'dob')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+class ImportAborted(Exception):
+    """An import stopped partway. `summary` covers the batches committed before `cause` was raised."""
+
+    def __init__(self, summary, cause):
+        super().__init__(str(cause))
+        self.summary = summary
+        self.cause = cause
+
+
+def detect_format(explicit=None, filename=None, mimetype=None):
+    """Pick csv/ndjson from an explicit ?format=, the upload's extension or its content type."""
+    if explicit:
+        if explicit not in IMPORT_FORMATS:
+            raise ImportFormatError(f'Unsupported format "{explicit}". Use csv or ndjson.')
+        return explicit
+    name = (filename or '').lower()
+    if name.endswith('.csv') or mimetype == 'text/csv':
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    raise ImportFormatError('Could not tell the file format. Pass format=csv or format=ndjson.')
+
+
+def read_records(lines, fmt):
+    """
+    Yield (row_number, record, error) for each data row of `lines` (a string or any
+    iterable of text lines, e.g. a file). Rows are parsed one at a time so uploads
+    can be streamed. row_number is the line in the file; exactly one of
+    record/error is set.
+    """
+    if isinstance(lines, str):
+        lines = io.StringIO(lines)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {k.strip(): (v or '').strip() for k, v in record.items() if k}, None
+    else:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield number, None, 'Invalid JSON'
+                continue
+            if not isinstance(record, dict):
+                yield number, None, 'Each line must be a JSON object'
+                continue
+            yield number, record, None
+
+
+def _error(number, message, **extra):
+    return dict({'row': number, 'message': message}, **extra)
+
+
+def _validate_user(record):
+    values = {field: str(record.get(field) or '').strip() for field in USER_FIELDS}
+    missing = [field for field in USER_FIELDS if not values[field]]
+    if missing:
+        raise ValueError(f'Missing fields: {", ".join(missing)}')
+    try:
+        values['dob'] = datetime.strptime(values['dob'], '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('Invalid date format for DOB. Use YYYY-MM-DD.')
+    return values
+
+
+def _insert_user_batch(batch, errors):
+    """executemany one batch of (row_number, row); rows whose email was taken meanwhile are reported."""
+    if not batch:
+        return 0
+    try:
+        db.session.execute(User.__table__.insert(), [row for _, row in batch])
+        adjust_global_stats(total_users=len(batch))
+        db.session.commit()
+        return len(batch)
+    except IntegrityError:
+        # Someone registered one of these emails after the upfront check
+        db.session.rollback()
+        emails = [row['email'] for _, row in batch]
+        taken = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))}
+        if not taken:
+            raise
+        errors.extend(_error(number, 'Email already registered', email=row['email']) for number, row in batch if row['email'] in taken)
+        return _insert_user_batch([(number, row) for number, row in batch if row['email'] not in taken], errors)
+
+
+def import_users(lines, fmt):
+    """
+    Create user accounts from CSV (header row) or NDJSON with the Register fields.
+    Bad rows are reported and skipped; the rest are created. Returns a summary dict.
+    """
+    errors = []
+    pending = []
+    seen = set()
+    for number, record, error in read_records(lines, fmt):
+        if error:
+            errors.append(_error(number, error))
+            continue
+        try:
+            values = _validate_user(record)
+        except ValueError as e:
+            errors.append(_error(number, str(e), email=record.get('email')))
+            continue
+        if values['email'] in seen:
+            errors.append(_error(number, 'Duplicate email in import', email=values['email']))
+            continue
+        seen.add(values['email'])
+        pending.append((number, values))
+
+    # One IN query for every email in the file
+    existing = set()
+    if seen:
+        existing = {email for (email,) in db.session.query(User.email).filter(User.email.in_(seen))}
+    errors.extend(_error(number, 'Email already registered', email=values['email']) for number, values in pending if values['email'] in existing)
+    pending = [(number, values) for number, values in pending if values['email'] not in existing]
+
+    hashes = hash_passwords([values['password'] for _, values in pending])
+    rows = [
+        (number, {
+            'email': values['email'],
+            'password': hashed,
+            'full_name': values['full_name'],
+            'qualification': values['qualification'],
+            'dob': values['dob'],
+            'role': 'user'
+        })
+        for (number, values), hashed in zip(pending, hashes)
+    ]
+
+    created = 0
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        created += _insert_user_batch(rows[start:start + IMPORT_BATCH_SIZE], errors)
+
+    errors.sort(key=lambda e: e['row'])
+    return {'created': created, 'failed': len(errors), 'errors': errors}
+
+
+QUESTION_FIELDS = ('question_text', 'option1', 'option2', 'option3', 'option4', 'correct_option')
+QUESTION_TEXT_FIELDS = ('question_text', 'option1', 'option2', 'option3', 'option4')
+QUESTION_EXPORT_FIELDS = ('id', 'quiz_id') + QUESTION_FIELDS
+
+
+def question_values(data):
+    """
+    Validate question fields with the QuestionsByQuiz.post rules and return the
+    column values. option3/option4 are optional and stored as '' when absent.
+    Raises ValueError with the message to show.
+    """
+    for field in QUESTION_TEXT_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f'{field} must be a string')
+
+    question_text = data.get('question_text')
+    option1 = data.get('option1')
+    option2 = data.get('option2')
+    correct_option = data.get('correct_option')
+
+    if not all([question_text, option1, option2, correct_option not in (None, '')]):
+        raise ValueError('Question text, option1, option2, and correct option are required')
+    # CSV cells and hand-written JSON Lines may carry the option number as a string
+    if isinstance(correct_option, str) and correct_option.strip().isdigit():
+        correct_option = int(correct_option)
+    if correct_option not in [1, 2, 3, 4] or isinstance(correct_option, bool):
+        raise ValueError('Correct option must be 1, 2, 3, or 4')
+
+    return {
+        'question_text': question_text,
+        'option1': option1,
+        'option2': option2,
+        'option3': data.get('option3') or '',
+        'option4': data.get('option4') or '',
+        'correct_option': correct_option
+    }
+
+
+def _insert_question_batch(batch):
+    if not batch:
+        return 0
+    db.session.execute(Question.__table__.insert(), batch)
+    adjust_global_stats(total_questions=len(batch))
+    # Core inserts skip the flush hook, so refresh the snapshots here
+    compile_quiz_snapshots(db.session, {row['quiz_id'] for row in batch})
+    db.session.commit()
+    return len(batch)
+
+
+def import_questions(lines, fmt, quiz_id=None, chapter_id=None):
+    """
+    Stream questions into one quiz, or into the quizzes of a chapter (each row then
+    names its quiz_id). Rows are validated as they are read and inserted in
+    batches, one transaction per batch; the question caches of every quiz that
+    received a committed batch are invalidated, even if a later batch fails.
+    Returns a summary dict including those quiz ids. Raises ImportAborted with
+    the partial summary if reading or inserting fails partway.
+    """
+    if chapter_id is not None:
+        allowed_quiz_ids = {qid for (qid,) in db.session.query(Quiz.id).filter_by(chapter_id=chapter_id)}
+    else:
+        allowed_quiz_ids = {quiz_id}
+
+    errors = []
+    batch = []
+    created = 0
+    committed_quiz_ids = set()
+
+    def flush_batch():
+        nonlocal created
+        created += _insert_question_batch(batch)
+        committed_quiz_ids.update(row['quiz_id'] for row in batch)
+        batch.clear()
+
+    try:
+        for number, record, error in read_records(lines, fmt):
+            if error:
+                errors.append(_error(number, error))
+                continue
+            try:
+                values = question_values(record)
+                target_quiz_id = quiz_id
+                if chapter_id is not None:
+                    try:
+                        target_quiz_id = int(record.get('quiz_id'))
+                    except (TypeError, ValueError):
+                        raise ValueError('quiz_id is required when importing into a chapter')
+                    if target_quiz_id not in allowed_quiz_ids:
+                        raise ValueError(f'Quiz {target_quiz_id} is not in this chapter')
+            except ValueError as e:
+                errors.append(_error(number, str(e)))
+                continue
+
+            values['quiz_id'] = target_quiz_id
+            batch.append(values)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush_batch()
+        flush_batch()
+    except Exception as e:
+        db.session.rollback()
+        raise ImportAborted(
+            {'created': created, 'failed': len(errors), 'errors': errors, 'quiz_ids': sorted(committed_quiz_ids)}, e
+        ) from e
+    finally:
+        invalidate_tags(*[f'quiz:{qid}:questions' for qid in committed_quiz_ids])
+
+    return {'created': created, 'failed': len(errors), 'errors': errors, 'quiz_ids': sorted(committed_quiz_ids)}
+
+
+def export_questions(quiz_ids, fmt):
+    """Yield the questions of `quiz_ids` as CSV or JSON Lines chunks, in import-compatible columns."""
+    result = db.session.execute(
+        db.select(*[getattr(Question, field) for field in QUESTION_EXPORT_FIELDS])
+        .where(Question.quiz_id.in_(quiz_ids))
+        .order_by(Question.quiz_id, Question.id)
+        .execution_options(yield_per=IMPORT_BATCH_SIZE)
+    )
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(QUESTION_EXPORT_FIELDS)
+        for rows in result.partitions():
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield ''.join(json.dumps(dict(zip(QUESTION_EXPORT_FIELDS, row))) + '\n' for row in rows)
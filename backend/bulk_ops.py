@@ -0,0 +1,96 @@
+# backend/bulk_ops.py
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import sqlite, postgresql
+
+from extensions import db
+from model import UserAnswer
+
+# Dialects that understand INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+ANSWER_CONFLICT_COLUMNS = ['user_id', 'quiz_id', 'question_id']  # _user_quiz_question_uc
+
+# Keeps each multi-row VALUES clause under SQLite's bound-parameter limit
+UPSERT_CHUNK_SIZE = 500
+
+
+def conflict_insert(connection):
+    """The dialect's insert() construct if it supports ON CONFLICT, else None."""
+    return _UPSERT_INSERTS.get(connection.dialect.name)
+
+
+def insert_missing(connection, table, rows, index_elements):
+    """
+    INSERT ... ON CONFLICT DO NOTHING placeholder `rows`, so that a following
+    SELECT ... FOR UPDATE finds and locks a row even for a key seen for the
+    first time. Concurrent first writers then wait on that row lock instead of
+    one of them failing on the primary key. Returns False, inserting nothing,
+    on dialects without ON CONFLICT.
+    """
+    dialect_insert = conflict_insert(connection)
+    if dialect_insert is None:
+        return False
+    if rows:
+        connection.execute(dialect_insert(table).values(rows).on_conflict_do_nothing(index_elements=index_elements))
+    return True
+
+
+def upsert_user_answers(rows, only_newer=False):
+    """
+    Insert or update many UserAnswer rows with one statement.
+
+    `rows` is a list of dicts with user_id, quiz_id, question_id, selected_option and
+    attempt_timestamp. Nothing is committed here so callers can keep the answers and
+    whatever they write next (e.g. the Score) in a single transaction.
+    With `only_newer`, an existing row is only updated if its attempt_timestamp is
+    older, so a late autosave flush can't overwrite a submitted answer.
+    """
+    if not rows:
+        return
+
+    # The same key twice in one ON CONFLICT statement is an error on PostgreSQL; keep the last.
+    deduped = {}
+    for row in rows:
+        deduped[(row['user_id'], row['quiz_id'], row['question_id'])] = row
+    rows = list(deduped.values())
+
+    dialect_insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = dialect_insert(UserAnswer.__table__).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=ANSWER_CONFLICT_COLUMNS,
+                set_={
+                    'selected_option': stmt.excluded.selected_option,
+                    'attempt_timestamp': stmt.excluded.attempt_timestamp,
+                },
+                where=(UserAnswer.__table__.c.attempt_timestamp < stmt.excluded.attempt_timestamp) if only_newer else None
+            )
+            db.session.execute(stmt)
+        return
+
+    # Fallback for other dialects: one lookup for every existing row, then bulk insert/update.
+    existing = dict(
+        ((user_id, quiz_id, question_id), (answer_id, attempt_timestamp))
+        for answer_id, user_id, quiz_id, question_id, attempt_timestamp in db.session.query(
+            UserAnswer.id, UserAnswer.user_id, UserAnswer.quiz_id, UserAnswer.question_id, UserAnswer.attempt_timestamp
+        ).filter(tuple_(UserAnswer.user_id, UserAnswer.quiz_id, UserAnswer.question_id).in_(list(deduped)))
+    )
+    updates = []
+    inserts = []
+    for key, row in deduped.items():
+        if key in existing:
+            answer_id, attempt_timestamp = existing[key]
+            if only_newer and attempt_timestamp >= row['attempt_timestamp']:
+                continue
+            updates.append({'id': answer_id, 'selected_option': row['selected_option'], 'attempt_timestamp': row['attempt_timestamp']})
+        else:
+            inserts.append(row)
+    if updates:
+        db.session.bulk_update_mappings(UserAnswer, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(UserAnswer, inserts)
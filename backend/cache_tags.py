@@ -0,0 +1,93 @@
+# backend/cache_tags.py
+
+import json
+import uuid
+import hashlib
+import logging
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import request
+from flask_jwt_extended import get_jwt_identity
+
+from extensions import cache
+
+logger = logging.getLogger(__name__)
+
+# Every tag owns a version token stored under this prefix. A cached response's key
+# is derived from the tokens of the tags it depends on, so replacing a token makes
+# every entry built on top of it unreachable (the stale entries simply expire).
+TAG_KEY_PREFIX = 'tag_version:'
+ENTRY_KEY_PREFIX = 'tagged:'
+
+
+def current_user_id():
+    return json.loads(get_jwt_identity())['id']
+
+
+def _tag_versions(tags):
+    keys = [TAG_KEY_PREFIX + tag for tag in tags]
+    versions = cache.get_many(*keys)
+    for i, key in enumerate(keys):
+        if versions[i] is None:
+            # add() never overwrites, so concurrent first readers agree on one token
+            cache.add(key, uuid.uuid4().hex, timeout=0)
+            versions[i] = cache.get(key)
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Replace the version token of each tag so dependent cache entries stop matching."""
+    keys = [TAG_KEY_PREFIX + tag for tag in dict.fromkeys(tags) if tag]
+    if not keys:
+        return
+    try:
+        # Overwritten rather than deleted: the generic delete_many stops at the
+        # first key that was never read, leaving the tags after it untouched.
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=0)
+    except Exception as e:
+        logger.error(f"ERROR: Failed to invalidate cache tags {keys}: {e}")
+
+
+def cached_with_tags(tags, timeout=None, query_string=False):
+    """
+    Cache a resource method under the entity tags it depends on.
+
+    `tags` are format strings filled from the view kwargs, e.g. 'subject:{subject_id}'.
+    A tag referencing '{user_id}' is filled from the JWT identity and also makes the
+    cache entry per-user.
+    """
+    per_user = any('{user_id}' in tag for tag in tags)
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            context = dict(kwargs)
+            if per_user:
+                context['user_id'] = current_user_id()
+            resolved_tags = [tag.format(**context) for tag in tags]
+
+            base_key = request.path
+            if query_string:
+                base_key += '?' + urlencode(sorted(request.args.items(multi=True)))
+            if per_user:
+                base_key += f"#user:{context['user_id']}"
+
+            try:
+                versions = _tag_versions(resolved_tags)
+                raw_key = base_key + '|' + '|'.join(str(v) for v in versions)
+                cache_key = ENTRY_KEY_PREFIX + hashlib.md5(raw_key.encode('utf-8')).hexdigest()
+                rv = cache.get(cache_key)
+            except Exception as e:
+                logger.error(f"ERROR: Tagged cache lookup failed for {base_key}: {e}")
+                return fn(*args, **kwargs)
+
+            if rv is None:
+                rv = fn(*args, **kwargs)
+                try:
+                    cache.set(cache_key, rv, timeout=timeout)
+                except Exception as e:
+                    logger.error(f"ERROR: Tagged cache store failed for {base_key}: {e}")
+            return rv
+        return wrapper
+    return decorator
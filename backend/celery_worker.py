@@ -3,16 +3,31 @@
 import os
 import logging
 from celery import Celery
-from flask import Flask
+from celery.schedules import crontab
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import Markup
 from datetime import datetime, date, timedelta
 import json
 import csv
-from io import StringIO
+import hashlib
+from collections import defaultdict
 
-from extensions import db
+from extensions import db, cache
+from database import configure_database, run_maintenance
 from model import User, Quiz, Admin, Chapter, Subject, Question, Score, UserAnswer
 from sqlalchemy import func
+import stats # Registers the global stats flush hook for writes made by tasks
+import quiz_snapshots # Keeps quiz snapshots current for question writes made by tasks
+import leaderboards # Feeds scores recorded by tasks into the leaderboards
+import score_distributions # Keeps score distributions current for scores recorded by tasks
+from answer_buffer import flush_buffered_answers
+from submissions import ingest_queued_submissions
+from question_analytics import refresh_question_analytics
+from activity_rollups import refresh_daily_activity, window_activity
+from cache_tags import invalidate_tags
+from report_artifacts import get_artifact_store, new_artifact_path
+from columnar_export import run_columnar_export, ColumnarExportUnavailable
 
 # --- Configure Logging for Celery Worker ---
 logger = logging.getLogger(__name__)
@@ -28,11 +43,15 @@ file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 # -------------------------------------------
 
+# How often buffered autosave answers are written to the database
+AUTOSAVE_FLUSH_SECONDS = int(os.environ.get('AUTOSAVE_FLUSH_SECONDS', 15))
+# Backstop for queued submissions whose kick was lost; submits normally schedule ingestion themselves
+INGEST_SWEEP_SECONDS = int(os.environ.get('INGEST_SWEEP_SECONDS', 10))
+
 # --- Celery Configuration ---
 def create_celery_app():
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_database(app)
     # --- MODIFIED: Set CELERY_BROKER_URL and CELERY_RESULT_BACKEND to use DB 0 ---
     app.config['CELERY_BROKER_URL'] = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0') # Keep DB 0
     app.config['CELERY_RESULT_BACKEND'] = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0') # <--- CHANGED TO DB 0
@@ -41,6 +60,7 @@ def create_celery_app():
     app.config['CELERY_TASK_SERIALIZER'] = 'json'
     app.config['CELERY_RESULT_SERIALIZER'] = 'json'
     app.config['CELERY_TIMEZONE'] = 'Asia/Kolkata'
+    app.config['CELERY_TRACK_STARTED'] = True # Lets the report job status endpoint tell queued from running
 
     app.config['CELERY_BEAT_SCHEDULE'] = {
         'generate-monthly-report': {
@@ -49,10 +69,43 @@ def create_celery_app():
             'args': (),
             'options': {'expires': 86400}
         },
+        'flush-autosaved-answers': {
+            'task': 'celery_worker.flush_autosaved_answers',
+            'schedule': timedelta(seconds=AUTOSAVE_FLUSH_SECONDS),
+            'args': (),
+            'options': {'expires': AUTOSAVE_FLUSH_SECONDS}
+        },
+        'ingest-submissions': {
+            'task': 'celery_worker.ingest_submissions',
+            'schedule': timedelta(seconds=INGEST_SWEEP_SECONDS),
+            'args': (),
+            'options': {'expires': INGEST_SWEEP_SECONDS}
+        },
+        'refresh-question-analytics': {
+            'task': 'celery_worker.question_analytics',
+            'schedule': crontab(minute='*/15'),
+            'args': (),
+        },
+        'database-maintenance': {
+            'task': 'celery_worker.database_maintenance',
+            'schedule': crontab(hour=3, minute=30),
+            'args': (),
+        },
+        'database-vacuum': {
+            'task': 'celery_worker.database_maintenance',
+            'schedule': crontab(hour=4, minute=0, day_of_week='sunday'),
+            'kwargs': {'vacuum': True},
+        },
     }
     app.config['CELERY_ENABLE_UTC'] = True
 
+    # Same cache as the web app, so tasks can invalidate its cache tags
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = 'redis://localhost:6379/1'
+    app.config['CACHE_DEFAULT_TIMEOUT'] = 300
+
     db.init_app(app)
+    cache.init_app(app)
 
     celery_app = Celery(app.name, broker=app.config['CELERY_BROKER_URL'])
     celery_app.conf.update(app.config)
@@ -69,132 +122,261 @@ celery = create_celery_app()
 
 # --- Celery Tasks ---
 
-@celery.task
-def export_users_csv():
+PROGRESS_EVERY = 500 # Rows between progress updates pushed to the result backend
+
+def report_progress(task, current, total):
+    # Direct calls (no worker) have no task id to attach progress to
+    if task.request.id and (current % PROGRESS_EVERY == 0 or current == total):
+        task.update_state(state='PROGRESS', meta={'current': current, 'total': total})
+
+EXPORT_BATCH_SIZE = 1000 # Rows fetched per round-trip while streaming report queries
+
+def users_report_query():
+    # One aggregate over users LEFT JOIN scores; users without attempts get count 0
+    return (
+        db.select(
+            User.id, User.email, User.full_name, User.qualification, User.dob, User.role,
+            func.count(Score.id), func.avg(Score.score)
+        )
+        .outerjoin(Score, Score.user_id == User.id)
+        .group_by(User.id)
+        .order_by(User.id)
+    )
+
+@celery.task(bind=True)
+def export_users_csv(self):
     try:
-        users = User.query.all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow(['User ID', 'Email', 'Full Name', 'Qualification', 'DOB', 'Role', 'Quizzes Taken', 'Average Score'])
-
-        for user in users:
-            user_scores = Score.query.filter_by(user_id=user.id).all()
-            quizzes_taken = len(user_scores)
-            total_score_sum = sum(s.score for s in user_scores)
-            avg_score = round(total_score_sum / quizzes_taken, 2) if quizzes_taken > 0 else 0
-
-            writer.writerow([
-                user.id,
-                user.email,
-                user.full_name,
-                user.qualification,
-                user.dob.isoformat() if user.dob else '',
-                user.role,
-                quizzes_taken,
-                avg_score
-            ])
-        
-        csv_content = output.getvalue()
-        output.close()
-
-        logger.info("\n--- GENERATED USER REPORT CSV (in worker) ---")
-        logger.info(csv_content)
-        logger.info("-------------------------------------------\n")
-
-        return csv_content
+        total_users = db.session.query(func.count(User.id)).scalar()
+
+        rows = db.session.execute(users_report_query().execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        partial_path = new_artifact_path('users_report', 'csv')
+        written = 0
+        with open(partial_path, 'w', newline='', encoding='utf-8') as sink:
+            writer = csv.writer(sink)
+            writer.writerow(['User ID', 'Email', 'Full Name', 'Qualification', 'DOB', 'Role', 'Quizzes Taken', 'Average Score'])
+
+            for user_id, email, full_name, qualification, dob, role, taken, avg in rows:
+                writer.writerow([
+                    user_id,
+                    email,
+                    full_name,
+                    qualification,
+                    dob.isoformat() if dob else '',
+                    role,
+                    taken,
+                    round(avg, 2) if taken > 0 else 0
+                ])
+                written += 1
+                report_progress(self, written, total_users)
+        # Only this small reference goes through the result backend
+        artifact = get_artifact_store().put_file(partial_path)
+
+        logger.info(f"GENERATED USER REPORT CSV: {written} users written to artifact {artifact['key']}")
+
+        return {
+            'status': 'success',
+            'filename': 'users_report.csv',
+            'mimetype': 'text/csv',
+            'artifact': artifact
+        }
     except Exception as e:
         logger.error(f"ERROR: Failed to generate CSV report: {e}")
         import traceback
         traceback.print_exc()
         return {'status': 'error', 'message': f'Failed to generate CSV report: {e}'}
 
-@celery.task
-def generate_monthly_report():
+REPORT_STREAM_BUFFER = 200 # Template chunks collected before each write to disk
+
+# Rendered user sections are reused for as long as the user's name, email and
+# rollups inside the window stay the same. The window start is left out: a
+# section only changes when a day with attempts enters or leaves the window,
+# and that changes the rollups. The TTL bounds how long a renamed quiz title
+# can linger in a reused section.
+REPORT_SECTION_KEY = 'monthly_report_section:{user_id}:{fingerprint}'
+REPORT_SECTION_TTL = 86400
+
+def section_fingerprint(full_name, email, days):
+    payload = json.dumps([
+        full_name, email,
+        [[day.isoformat(), attempts, score_sum] for day, attempts, score_sum in days]
+    ])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def recent_attempts_query(user_ids, period_start):
+    return (
+        db.select(Score.user_id, Quiz.title.label('quiz_title'), Score.score, Score.attempt_timestamp)
+        .outerjoin(Quiz, Quiz.id == Score.quiz_id)
+        .where(Score.user_id.in_(user_ids), Score.attempt_timestamp >= period_start)
+        .order_by(Score.user_id, Score.attempt_timestamp)
+    )
+
+def recent_attempts(user_ids, period_start):
+    """{user_id: [attempt dict, ...]} of the window, read only for the users whose sections are re-rendered."""
+    attempts = defaultdict(list)
+    if not user_ids:
+        return attempts
+    rows = db.session.execute(recent_attempts_query(user_ids, period_start))
+    for row in rows:
+        attempts[row.user_id].append({
+            'quiz_title': row.quiz_title or 'Unknown Quiz',
+            'score': row.score,
+            'attempt_timestamp': row.attempt_timestamp
+        })
+    return attempts
+
+def monthly_report_sections(task, user_batches, activity, period_start, total_users, counts):
+    # Totals come from the daily rollups; scores are only read for users whose
+    # section isn't cached under its current fingerprint.
+    template = current_app.jinja_env.get_template('monthly_report_section.html')
+    index = 0
+    for users in user_batches:
+        keys = {
+            user_id: REPORT_SECTION_KEY.format(
+                user_id=user_id, fingerprint=section_fingerprint(full_name, email, activity.get(user_id, []))
+            )
+            for user_id, full_name, email in users
+        }
+        try:
+            cached = dict(zip(keys.values(), cache.get_many(*keys.values())))
+        except Exception as e:
+            logger.error(f"ERROR: Report section cache unavailable, rendering every section: {e}")
+            cached = {}
+
+        stale = [(user_id, full_name, email) for user_id, full_name, email in users if not cached.get(keys[user_id])]
+        attempts = recent_attempts([user_id for user_id, _, _ in stale if user_id in activity], period_start)
+        rendered = {}
+        for user_id, full_name, email in stale:
+            days = activity.get(user_id, [])
+            quizzes_taken = sum(day_attempts for _, day_attempts, _ in days)
+            score_sum = sum(day_score_sum for _, _, day_score_sum in days)
+            rendered[keys[user_id]] = template.render(section={
+                'full_name': full_name,
+                'email': email,
+                'quizzes_taken': quizzes_taken,
+                'average_score': round(score_sum / quizzes_taken, 2) if quizzes_taken > 0 else 0,
+                'attempts': attempts.get(user_id, [])
+            })
+        if rendered:
+            try:
+                cache.set_many(rendered, timeout=REPORT_SECTION_TTL)
+            except Exception as e:
+                logger.error(f"ERROR: Could not cache report sections: {e}")
+        counts['rendered'] += len(stale)
+        counts['reused'] += len(users) - len(stale)
+
+        for user_id, _, _ in users:
+            index += 1
+            yield Markup(cached.get(keys[user_id]) or rendered[keys[user_id]])
+            report_progress(task, index, total_users)
+
+def report_users_query():
+    # Every user gets a section, active or not
+    return db.select(User.id, User.full_name, User.email).order_by(User.id)
+
+@celery.task(bind=True)
+def generate_monthly_report(self):
     logger.info("\n--- Running Monthly Activity Report Task ---")
-    
+
+    # Fold in scores recorded since the last run; untouched days aren't recounted
+    rollup_summary = refresh_daily_activity()
+
     today = datetime.now().date()
     thirty_days_ago = today - timedelta(days=30)
 
-    users = User.query.all()
-    
-    all_user_reports_html_sections = []
-
-    for user in users:
-        user_recent_scores = Score.query.filter(
-            Score.user_id == user.id,
-            Score.attempt_timestamp >= thirty_days_ago
-        ).all()
-        
-        quizzes_taken_recent = len(user_recent_scores)
-        total_score_sum_recent = sum(s.score for s in user_recent_scores)
-        avg_score_recent = round(total_score_sum_recent / quizzes_taken_recent, 2) if quizzes_taken_recent > 0 else 0
-
-        quiz_attempts_rows = []
-        if user_recent_scores:
-            for score in user_recent_scores:
-                quiz_title = db.session.get(Quiz, score.quiz_id).title if db.session.get(Quiz, score.quiz_id) else 'Unknown Quiz'
-                attempt_time = score.attempt_timestamp.strftime('%Y-%m-%d %H:%M')
-                quiz_attempts_rows.append(f"<tr><td>{quiz_title}</td><td>{score.score}</td><td>{attempt_time}</td></tr>")
-        else:
-            quiz_attempts_rows.append('<tr><td colspan="3">No recent quiz attempts.</td></tr>')
-
-        user_report_section = f"""
-        <div class="user-report-section">
-            <h3>For {user.full_name} ({user.email})</h3>
-            <p><strong>Total Quizzes Taken:</strong> {quizzes_taken_recent}</p>
-            <p><strong>Average Score:</strong> {avg_score_recent}%</p>
-            
-            <h4>Recent Quiz Attempts:</h4>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Quiz Title</th>
-                        <th>Score</th>
-                        <th>Attempted On</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {''.join(quiz_attempts_rows)}
-                </tbody>
-            </table>
-        </div>
-        <hr style="border-top: 1px solid #4a2d73; margin: 30px 0;">
-        """
-        all_user_reports_html_sections.append(user_report_section)
-        logger.info(f"REPORT GENERATED: Monthly report section for {user.email} prepared.")
-
-    consolidated_report_html = f"""
-    <html>
-    <head>
-        <title>Monthly Activity Report - All Users</title>
-        <style>
-            body {{ font-family: sans-serif; background-color: #1a0f2d; color: #e0e0e0; margin: 0; padding: 20px; }}
-            .container {{ max-width: 900px; margin: 20px auto; background-color: #2b1a47; padding: 30px; border-radius: 15px; box-shadow: 0 8px 25px rgba(0,0,0,0.5); border: 1px solid #4a2d73; }}
-            h2 {{ color: #e060a8; text-shadow: 0 0 5px rgba(224, 96, 168, 0.5); font-weight: bold; text-align: center; margin-bottom: 20px; }}
-            h3 {{ color: #5dbeff; margin-top: 30px; border-bottom: 1px solid #4a2d73; padding-bottom: 5px; }}
-            h4 {{ color: #c0b0d0; margin-top: 20px; }}
-            p {{ color: #c0b0d0; line-height: 1.6; }}
-            table {{ width: 100%; border-collapse: collapse; margin-top: 15px; border-radius: 8px; overflow: hidden; }}
-            th, td {{ border: 1px solid #4a2d73; padding: 12px; text-align: left; color: #e0e0e0; }}
-            th {{ background-color: #3d2766; font-weight: bold; color: #e060a8; }}
-            tr:nth-child(even) {{ background-color: #332050; }}
-            tr:hover {{ background-color: #4a307a; }}
-            .footer {{ margin-top: 40px; text-align: center; font-size: 0.9em; color: #6a4a9c; }}
-            .user-report-section {{ margin-bottom: 20px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h2>Consolidated Monthly Activity Report</h2>
-            <p>Report Period: {thirty_days_ago.strftime('%Y-%m-%d')} to {today.strftime('%Y-%m-%d')}</p>
-            {''.join(all_user_reports_html_sections) if all_user_reports_html_sections else '<p style="text-align: center; color: #c0b0d0;">No users found to generate reports for.</p>'}
-            <p class="footer">Generated by Quiz Master. Keep practicing!</p>
-        </div>
-    </body>
-    </html>
-    """
-    
+    total_users = db.session.query(func.count(User.id)).scalar()
+    activity = window_activity(thirty_days_ago)
+    users = db.session.execute(report_users_query().execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    counts = {'rendered': 0, 'reused': 0}
+    template = current_app.jinja_env.get_template('monthly_report.html')
+    stream = template.stream(
+        period_start=thirty_days_ago,
+        period_end=today,
+        sections=monthly_report_sections(self, users.partitions(), activity, thirty_days_ago, total_users, counts)
+    )
+    stream.enable_buffering(REPORT_STREAM_BUFFER)
+
+    partial_path = new_artifact_path('monthly_report', 'html')
+    with open(partial_path, 'w', encoding='utf-8') as sink:
+        stream.dump(sink)
+    artifact = get_artifact_store().put_file(partial_path)
+
+    logger.info(
+        f"REPORT GENERATED: Monthly report for {total_users} users written to artifact {artifact['key']} "
+        f"({counts['rendered']} sections rendered, {counts['reused']} reused, {rollup_summary['days']} user-days recounted)"
+    )
     logger.info("--- Monthly Activity Report Task Finished. ---")
-    return consolidated_report_html
+    return {
+        'status': 'success',
+        'filename': f'monthly_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.html',
+        'mimetype': 'text/html',
+        'artifact': artifact
+    }
+
+
+@celery.task(bind=True)
+def export_analytics_columnar(self, incremental=False):
+    """Scores, answers and the catalog as Parquet (or Arrow IPC) files in one zip artifact."""
+    try:
+        artifact, manifest = run_columnar_export(
+            incremental=incremental, progress=lambda current, total: report_progress(self, current, total)
+        )
+        rows = {name: entry['rows'] for name, entry in manifest['tables'].items()}
+        logger.info(f"COLUMNAR EXPORT ({manifest['mode']}, {manifest['format']}): {rows} written to artifact {artifact['key']}")
+        return {
+            'status': 'success',
+            'filename': f'analytics_export_{manifest["mode"]}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip',
+            'mimetype': 'application/zip',
+            'artifact': artifact
+        }
+    except ColumnarExportUnavailable as e:
+        logger.error(f"ERROR: Columnar export unavailable: {e}")
+        return {'status': 'error', 'message': f'Columnar export unavailable: {e}'}
+
+
+@celery.task
+def database_maintenance(vacuum=False):
+    """Nightly ANALYZE / PRAGMA optimize; VACUUM weekly or when the file is fragmented."""
+    logger.info("--- Database Maintenance Task Started. ---")
+    summary = run_maintenance(db.engine, vacuum=vacuum)
+    summary['report_artifacts_pruned'] = get_artifact_store().prune()
+    logger.info(f"DATABASE MAINTENANCE: {summary}")
+    return summary
+
+
+@celery.task
+def flush_autosaved_answers():
+    """Write autosave buffers from Redis to user_answers in bulk."""
+    written = flush_buffered_answers()
+    if written:
+        logger.info(f"AUTOSAVE FLUSH: {written} answers written")
+    return written
+
+
+@celery.task
+def ingest_submissions():
+    """Grade and persist queued quiz submissions in micro-batches."""
+    processed, user_ids = ingest_queued_submissions()
+    if user_ids:
+        invalidate_tags(*[tag for user_id in user_ids for tag in (f'user:{user_id}:scores', f'user:{user_id}:answers')])
+    if processed:
+        logger.info(f"SUBMISSION INGEST: {processed} submissions processed")
+    return processed
+
+
+@celery.task
+def question_analytics(full=False):
+    """Recompute item statistics for quizzes answered since the last run."""
+    summary = refresh_question_analytics(full=full)
+    logger.info(f"QUESTION ANALYTICS: {summary}")
+    return summary
+
+
+@celery.task
+def rebuild_score_distributions():
+    """Recreate every quiz's score distribution from the scores table."""
+    count = score_distributions.rebuild_score_distributions(db.session.connection())
+    db.session.commit()
+    logger.info(f"SCORE DISTRIBUTIONS: rebuilt {count} quizzes")
+    return count
@@ -0,0 +1,220 @@
+# backend/columnar_export.py
+
+import os
+import json
+import shutil
+import zipfile
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from extensions import db
+from model import User, Subject, Chapter, Quiz, Question, Score, UserAnswer, JobWatermark
+from report_artifacts import get_artifact_store, new_artifact_path
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    # Some pyarrow builds ship without Parquet; Arrow IPC files are written instead
+    pq = None
+
+WATERMARK_NAME = 'columnar_export'
+# Rows committed slightly behind their timestamp are exported again by the next
+# incremental run rather than missed; consumers dedupe on id.
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+FETCH_CHUNK_SIZE = 10000
+
+# Partitioned by month of attempt_timestamp: (model, [(column, arrow type name), ...])
+FACT_TABLES = {
+    'scores': (Score, [
+        ('id', 'int64'), ('user_id', 'int64'), ('quiz_id', 'int64'), ('score', 'int64'), ('attempt_timestamp', 'timestamp'),
+    ]),
+    'user_answers': (UserAnswer, [
+        ('id', 'int64'), ('user_id', 'int64'), ('quiz_id', 'int64'), ('question_id', 'int64'),
+        ('selected_option', 'int64'), ('attempt_timestamp', 'timestamp'),
+    ]),
+}
+
+# Exported whole on every run. Users carry no names, emails or passwords.
+DIMENSION_TABLES = {
+    'subjects': (Subject, [('id', 'int64'), ('name', 'string')]),
+    'chapters': (Chapter, [('id', 'int64'), ('subject_id', 'int64'), ('name', 'string')]),
+    'quizzes': (Quiz, [
+        ('id', 'int64'), ('chapter_id', 'int64'), ('title', 'string'), ('time_duration', 'int64'), ('date_of_quiz', 'timestamp'),
+    ]),
+    'questions': (Question, [('id', 'int64'), ('quiz_id', 'int64'), ('question_text', 'string'), ('correct_option', 'int64')]),
+    'users': (User, [('id', 'int64'), ('role', 'string'), ('qualification', 'string')]),
+}
+
+
+class ColumnarExportUnavailable(Exception):
+    pass
+
+
+def export_format():
+    if pa is None:
+        raise ColumnarExportUnavailable('pyarrow is not installed')
+    return 'parquet' if pq is not None else 'arrow'
+
+
+def _schema(columns):
+    types = {'int64': pa.int64(), 'string': pa.string(), 'timestamp': pa.timestamp('us', tz='UTC')}
+    return pa.schema([(name, types[type_name]) for name, type_name in columns])
+
+
+def _write_table(path, schema, statement):
+    """Stream `statement` into one file, a fetch chunk per record batch. Returns the row count (no file for 0 rows)."""
+    writer = None
+    rows = 0
+    try:
+        result = db.session.execute(statement.execution_options(yield_per=FETCH_CHUNK_SIZE))
+        for chunk in result.partitions():
+            columns = list(zip(*chunk))
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            )
+            if writer is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                writer = pq.ParquetWriter(path, schema) if pq is not None else pa.ipc.new_file(path, schema)
+            writer.write_batch(batch)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _month_starts(first, last):
+    month = datetime(first.year, first.month, 1)
+    while month <= last:
+        yield month
+        month = _next_month(month)
+
+
+def _next_month(month):
+    return datetime(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def fact_partition_query(name, month, since=None, until=None):
+    """
+    Rows of fact table `name` in one month partition (`month` is the first of
+    the month, None for rows without a timestamp), limited to
+    since < attempt_timestamp <= until.
+    """
+    model, columns = FACT_TABLES[name]
+    timestamp = model.attempt_timestamp
+    if month is None:
+        conditions = [timestamp.is_(None)]
+    else:
+        conditions = [timestamp >= month, timestamp < _next_month(month)]
+        if since is not None:
+            conditions.append(timestamp > since)
+        if until is not None:
+            conditions.append(timestamp <= until)
+    return select(*[getattr(model, column) for column, _ in columns]).where(*conditions).order_by(model.id)
+
+
+def export_tables(target_dir, since=None, until=None, progress=None):
+    """
+    Write the fact tables (rows with since < attempt_timestamp <= until,
+    partitioned by month) and the dimension tables under `target_dir` as
+    <table>/month=YYYY-MM/part-0.<ext> and <table>.<ext>. `progress` is called
+    with (tables done, total tables). Returns the manifest's table entries.
+    """
+    extension = 'parquet' if export_format() == 'parquet' else 'arrow'
+    tables = {}
+    total_tables = len(FACT_TABLES) + len(DIMENSION_TABLES)
+
+    for name, (model, columns) in FACT_TABLES.items():
+        schema = _schema(columns)
+        timestamp = model.attempt_timestamp
+        window = []
+        if since is not None:
+            window.append(timestamp > since)
+        if until is not None:
+            window.append(timestamp <= until)
+        first, last = db.session.query(func.min(timestamp), func.max(timestamp)).filter(*window).one()
+
+        # Each month is its own range scan on the attempt_timestamp index
+        months = list(_month_starts(first.replace(tzinfo=None), last.replace(tzinfo=None))) if first is not None else []
+        if since is None:
+            # Rows without a timestamp only ever appear in full exports
+            months.append(None)
+
+        entry = tables[name] = {'rows': 0, 'files': []}
+        for month in months:
+            partition = f'month={month:%Y-%m}' if month else 'month=unknown'
+            relative = f'{name}/{partition}/part-0.{extension}'
+            rows = _write_table(os.path.join(target_dir, relative), schema, fact_partition_query(name, month, since, until))
+            if rows:
+                entry['rows'] += rows
+                entry['files'].append(relative)
+        if progress:
+            progress(len(tables), total_tables)
+
+    for name, (model, columns) in DIMENSION_TABLES.items():
+        relative = f'{name}.{extension}'
+        rows = _write_table(
+            os.path.join(target_dir, relative), _schema(columns),
+            select(*[getattr(model, column) for column, _ in columns]).order_by(model.id)
+        )
+        tables[name] = {'rows': rows, 'files': [relative] if rows else []}
+        if progress:
+            progress(len(tables), total_tables)
+    return tables
+
+
+def run_columnar_export(incremental=False, progress=None):
+    """
+    Export everything, or with `incremental` only fact rows newer than the last
+    export's watermark, as one zip artifact. Returns (artifact reference, manifest).
+    """
+    fmt = export_format()
+    watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+    if watermark is None:
+        watermark = JobWatermark(name=WATERMARK_NAME)
+        db.session.add(watermark)
+    since = watermark.watermark - WATERMARK_OVERLAP if incremental and watermark.watermark is not None else None
+    # Fixed before reading, so rows arriving mid-export wait for the next run
+    until = max(
+        (value for value in (
+            db.session.query(func.max(Score.attempt_timestamp)).scalar(),
+            db.session.query(func.max(UserAnswer.attempt_timestamp)).scalar()
+        ) if value is not None),
+        default=None
+    )
+
+    work_dir = tempfile.mkdtemp(prefix='columnar_export_')
+    try:
+        tables = export_tables(work_dir, since=since, until=until, progress=progress)
+        manifest = {
+            'format': fmt,
+            'mode': 'incremental' if since is not None else 'full',
+            'since': since.isoformat() if since else None,
+            'until': until.isoformat() if until else None,
+            'generated_at': datetime.utcnow().isoformat(),
+            'tables': tables
+        }
+        archive_path = new_artifact_path('analytics_export', 'zip')
+        # Parquet/Arrow files are compressed already, so they are stored as they are
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+            for entry in tables.values():
+                for relative in entry['files']:
+                    archive.write(os.path.join(work_dir, relative), relative)
+        artifact = get_artifact_store().put_file(archive_path, compress=False)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Only advanced once the export is stored
+    if until is not None and (watermark.watermark is None or until > watermark.watermark):
+        watermark.watermark = until
+    watermark.updated_at = datetime.utcnow()
+    db.session.commit()
+    return artifact, manifest
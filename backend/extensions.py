@@ -1,3 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_caching import Cache
 
 db = SQLAlchemy()
+cache = Cache()
@@ -0,0 +1,162 @@
+# backend/indexes.py
+
+import re
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import create_engine, select, inspect
+from sqlalchemy.orm import with_parent
+
+from extensions import db
+from model import Chapter, Quiz, Question, Score, UserAnswer
+from pagination import keyset_query, DEFAULT_PAGE_SIZE
+from queries import (
+    login_candidates_query, score_history_query, chapters_by_subject_query, quizzes_by_chapter_query,
+    questions_by_quiz_query, user_answer_query, SCORE_HISTORY_SORTS, CHAPTER_SORTS, QUIZ_SORTS
+)
+from stats import user_totals_query, user_subject_totals_query
+from leaderboards import best_scores_query
+from activity_rollups import daily_scores_query, new_score_days_query, window_activity_query
+from quiz_snapshots import snapshot_query
+from question_analytics import answered_quizzes_query, answer_columns_query
+from columnar_export import fact_partition_query
+from celery_worker import recent_attempts_query, report_users_query, users_report_query
+
+SAMPLE_ID = 1
+_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+def upgrade_indexes():
+    """
+    Create any index declared in model.py that an existing database lacks.
+    db.create_all() only creates missing tables, so databases created before an
+    index was added pick it up here. Returns the names of the indexes created.
+    """
+    created = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=connection)
+                    created.append(index.name)
+    return created
+
+
+def _hot_queries():
+    """
+    (label, statement, tables allowed to be scanned) for the queries behind the
+    busiest endpoints and jobs, built by the same functions that run them.
+    """
+    now = datetime.utcnow()
+    window_start = now - timedelta(days=30)
+    sample_ids = [SAMPLE_ID, SAMPLE_ID + 1]
+    first_page = {'sort': 'id', 'after': str(SAMPLE_ID), 'limit': DEFAULT_PAGE_SIZE}
+    return [
+        ('login lookup (POST /login)', login_candidates_query('someone@example.com'), set()),
+        ('user score history (GET /api/scores)',
+         keyset_query(score_history_query(SAMPLE_ID, window_start, now), Score.id, SCORE_HISTORY_SORTS,
+                      **dict(first_page, sort='-id'))[0].statement,
+         set()),
+        ('user score history by date (GET /api/scores?sort=attempt_timestamp)',
+         keyset_query(score_history_query(SAMPLE_ID), Score.id, SCORE_HISTORY_SORTS,
+                      **dict(first_page, sort='-attempt_timestamp', after=''))[0].statement,
+         set()),
+        ('user stats rebuild', user_totals_query(sample_ids), set()),
+        ('user stats rebuild by subject', user_subject_totals_query(sample_ids), set()),
+        ('quiz leaderboard reload', best_scores_query(quiz_ids=[SAMPLE_ID]), set()),
+        ('subject leaderboard reload', best_scores_query(subject_ids=[SAMPLE_ID]), set()),
+        ('daily activity recount', daily_scores_query(sample_ids, window_start, now), set()),
+        ('scores since the daily activity watermark', new_score_days_query(window_start), set()),
+        ('monthly report rollup window', window_activity_query(window_start.date()), set()),
+        ('monthly report attempts of re-rendered sections', recent_attempts_query(sample_ids, window_start.date()), set()),
+        ('chapters by subject',
+         keyset_query(chapters_by_subject_query(SAMPLE_ID), Chapter.id, CHAPTER_SORTS, **first_page)[0].statement,
+         set()),
+        ('quizzes by chapter',
+         keyset_query(quizzes_by_chapter_query(SAMPLE_ID), Quiz.id, QUIZ_SORTS, **first_page)[0].statement,
+         set()),
+        ('questions by quiz',
+         keyset_query(questions_by_quiz_query(SAMPLE_ID), Question.id, None, **first_page)[0].statement,
+         set()),
+        ('answer key for grading', snapshot_query(SAMPLE_ID, 'version', 'answer_key'), set()),
+        ('user answer lookup (GET /api/user_answers)', user_answer_query(SAMPLE_ID, SAMPLE_ID, SAMPLE_ID).statement, set()),
+        # What the ORM loads when a question or quiz is deleted with its rows
+        ('answers by question (delete cascade)',
+         select(UserAnswer.id).where(with_parent(Question(id=SAMPLE_ID), Question.user_answers)),
+         set()),
+        ('answers by quiz (delete cascade)',
+         select(UserAnswer.id).where(with_parent(Quiz(id=SAMPLE_ID), Quiz.user_answers)),
+         set()),
+        ('scores by quiz (delete cascade)',
+         select(Score.id).where(with_parent(Quiz(id=SAMPLE_ID), Quiz.scores)),
+         set()),
+        ('columnar export score partition',
+         fact_partition_query('scores', datetime(now.year, now.month, 1), since=window_start, until=now),
+         set()),
+        ('columnar export answer partition',
+         fact_partition_query('user_answers', datetime(now.year, now.month, 1), since=window_start, until=now),
+         set()),
+        ('quizzes answered since the analytics watermark', answered_quizzes_query(window_start), set()),
+        ('answers of the quizzes being analysed', answer_columns_query(sample_ids), set()),
+        # The report jobs visit every user by design; only the score side must be indexed
+        ('monthly report users', report_users_query(), {'users'}),
+        ('users csv export', users_report_query(), {'users'}),
+    ]
+
+
+def _driver_params(compiled):
+    params = compiled.construct_params()
+    values = []
+    for name in compiled.positiontup:
+        value = params[name]
+        if isinstance(value, datetime):
+            value = value.isoformat(' ')
+        elif isinstance(value, date):
+            value = value.isoformat()
+        values.append(value)
+    return tuple(values)
+
+
+def explain(connection, statement):
+    """Return the EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement (SQLite)."""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', _driver_params(compiled))
+    return [row[3] for row in rows]
+
+
+def check_query_plans(verbose=False, live=False):
+    """
+    EXPLAIN every hot query and collect those whose plan scans a table that is
+    not explicitly allowed. Returns a list of (label, plan) failures.
+
+    By default the plans come from an empty in-memory copy of the model schema,
+    so the result depends only on model.py and not on the data or statistics of
+    a particular database. `live` checks the configured database instead, e.g.
+    to confirm upgrade_indexes() has been run there.
+    """
+    if live:
+        engine = db.engine
+    else:
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+
+    failures = []
+    with engine.connect() as connection:
+        if connection.dialect.name != 'sqlite':
+            raise RuntimeError('Query plan checks are only implemented for SQLite')
+        # Use the schema-derived tables as aliases in the plan, e.g. "SCAN scores"
+        table_names = {table.name for table in db.metadata.sorted_tables}
+        for label, statement, allowed_scans in _hot_queries():
+            plan = explain(connection, statement)
+            scanned = {m.group(1) for m in map(_SCAN_RE.match, plan) if m and m.group(1) in table_names}
+            if verbose:
+                print(f'{label}:')
+                for line in plan:
+                    print(f'    {line}')
+            if scanned - allowed_scans:
+                failures.append((label, plan))
+    return failures
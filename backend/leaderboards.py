@@ -0,0 +1,360 @@
+# backend/leaderboards.py
+
+import os
+import json
+import uuid
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+
+from extensions import db
+from model import Score, Quiz, Chapter
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# A user's quiz entry is their best score on it; their subject entry is the sum
+# of those best scores over the subject's quizzes.
+BOARD_KEY = 'leaderboard:{kind}:{board_id}'
+# Set by a full rebuild; until it exists the first reader seeds the boards
+LOADED_KEY = 'leaderboards:loaded'
+# Held while one process seeds, so a cold start doesn't rebuild once per request
+SEED_LOCK_KEY = 'leaderboards:seed_lock'
+SEED_LOCK_SECONDS = 120
+# Changes committed while the boards were unseeded, as JSON {'added': [...]} or
+# {'reload': [[kind, id], ...]}; applied once a seed has set LOADED_KEY
+PENDING_KEY = 'leaderboards:pending'
+
+DEFAULT_LEADERBOARD_LIMIT = 10
+MAX_LEADERBOARD_LIMIT = 100
+# Members per ZADD while repopulating
+REBUILD_CHUNK_SIZE = 1000
+
+# session.info entry collecting score changes until the transaction commits
+PENDING_CHANGES = 'leaderboard_changes'
+
+# Raises the quiz entry to the new score if it's higher and moves the subject
+# total by the same amount, atomically.
+RECORD_BEST_SCRIPT = """
+local old = redis.call('ZSCORE', KEYS[1], ARGV[2])
+local new = tonumber(ARGV[1])
+if old and tonumber(old) >= new then
+    return 0
+end
+redis.call('ZADD', KEYS[1], new, ARGV[2])
+redis.call('ZINCRBY', KEYS[2], new - (tonumber(old) or 0), ARGV[2])
+return 1
+"""
+
+
+def best_scores_query(quiz_ids=None, subject_ids=None):
+    """(subject_id, quiz_id, user_id, best score) rows, optionally limited to some quizzes or subjects."""
+    query = (
+        select(Chapter.subject_id, Score.quiz_id, Score.user_id, func.max(Score.score))
+        .join(Quiz, Quiz.id == Score.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .group_by(Chapter.subject_id, Score.quiz_id, Score.user_id)
+    )
+    if quiz_ids is not None:
+        query = query.where(Score.quiz_id.in_(quiz_ids))
+    if subject_ids is not None:
+        query = query.where(Chapter.subject_id.in_(subject_ids))
+    return query
+
+
+def load_boards(connection, quiz_ids=None, subject_ids=None):
+    """
+    Build {(kind, board_id): {user_id: score}} from the scores table: every board
+    in one pass, or just the quiz and subject boards named.
+    """
+    boards = defaultdict(dict)
+    if quiz_ids is None and subject_ids is None:
+        for subject_id, quiz_id, user_id, best in connection.execute(best_scores_query()):
+            boards[('quiz', quiz_id)][user_id] = best
+            subject_board = boards[('subject', subject_id)]
+            subject_board[user_id] = subject_board.get(user_id, 0) + best
+        return boards
+    if quiz_ids:
+        for _, quiz_id, user_id, best in connection.execute(best_scores_query(quiz_ids=quiz_ids)):
+            boards[('quiz', quiz_id)][user_id] = best
+    if subject_ids:
+        for subject_id, _, user_id, best in connection.execute(best_scores_query(subject_ids=subject_ids)):
+            subject_board = boards[('subject', subject_id)]
+            subject_board[user_id] = subject_board.get(user_id, 0) + best
+    return boards
+
+
+class RedisLeaderboards:
+    """
+    Boards as Redis sorted sets shared by every web and worker process. Like
+    the memory backend they seed themselves from the scores table the first
+    time they are used against an empty Redis.
+    """
+
+    def __init__(self):
+        self.redis = get_redis()
+
+    def _seed(self):
+        """Rebuild every board unless another process already is. Returns True if this one did."""
+        lock = str(uuid.uuid4())
+        if not self.redis.set(SEED_LOCK_KEY, lock, nx=True, ex=SEED_LOCK_SECONDS):
+            return False
+        try:
+            with db.engine.connect() as connection:
+                self.replace(load_boards(connection), 'all')
+        finally:
+            if self.redis.get(SEED_LOCK_KEY) == lock:
+                self.redis.delete(SEED_LOCK_KEY)
+        return True
+
+    def _read(self, queue):
+        """Results of the reads `queue` adds to a pipeline, seeding the boards first if they never were."""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.exists(LOADED_KEY)
+        queue(pipe)
+        loaded, *results = pipe.execute()
+        if not loaded and self._seed():
+            pipe = self.redis.pipeline(transaction=False)
+            queue(pipe)
+            results = pipe.execute()
+        return results
+
+    def _defer(self, change):
+        """
+        Park a change made while the boards were unseeded. A seed that read the
+        scores before the change committed would otherwise overwrite it.
+        """
+        self.redis.rpush(PENDING_KEY, json.dumps(change))
+        # Checked after the push, so a seed that sets the marker later still sees the change
+        if self.redis.exists(LOADED_KEY):
+            self._apply_pending()
+        else:
+            self._seed()
+
+    def _apply_pending(self):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrange(PENDING_KEY, 0, -1)
+        pipe.delete(PENDING_KEY)
+        parked = [json.loads(item) for item in pipe.execute()[0]]
+        added = [tuple(change) for item in parked for change in item.get('added', [])]
+        scope = sorted({tuple(board) for item in parked for board in item.get('reload', [])})
+        # Recording twice is harmless, and reloads read the committed rows, so
+        # they go last in case a recorded score has been deleted since
+        if added:
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_records(pipe, added)
+            pipe.execute()
+        if scope:
+            with db.engine.connect() as connection:
+                boards = load_boards(
+                    connection,
+                    [board_id for kind, board_id in scope if kind == 'quiz'],
+                    [board_id for kind, board_id in scope if kind == 'subject']
+                )
+            self.replace(boards, scope)
+
+    def _queue_records(self, pipe, changes):
+        script = self.redis.register_script(RECORD_BEST_SCRIPT)
+        for quiz_id, subject_id, user_id, score in changes:
+            keys = [BOARD_KEY.format(kind='quiz', board_id=quiz_id), BOARD_KEY.format(kind='subject', board_id=subject_id)]
+            script(keys=keys, args=[score, user_id], client=pipe)
+
+    def record(self, changes):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.exists(LOADED_KEY)
+        self._queue_records(pipe, changes)
+        if not pipe.execute()[0]:
+            self._defer({'added': [list(change) for change in changes]})
+
+    def replace(self, boards, scope):
+        """Swap in `boards`; every board named in `scope` ((kind, id) pairs, or 'all') is cleared first."""
+        if scope == 'all':
+            stale = list(self.redis.scan_iter(match=BOARD_KEY.format(kind='*', board_id='*'), count=REBUILD_CHUNK_SIZE))
+        else:
+            stale = [BOARD_KEY.format(kind=kind, board_id=board_id) for kind, board_id in scope]
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.exists(LOADED_KEY)
+        if stale:
+            pipe.delete(*stale)
+        for (kind, board_id), entries in boards.items():
+            key = BOARD_KEY.format(kind=kind, board_id=board_id)
+            items = list(entries.items())
+            for start in range(0, len(items), REBUILD_CHUNK_SIZE):
+                pipe.zadd(key, dict(items[start:start + REBUILD_CHUNK_SIZE]))
+        if scope == 'all':
+            pipe.set(LOADED_KEY, 1)
+        loaded = pipe.execute()[0]
+        if scope == 'all':
+            self._apply_pending()
+        elif not loaded:
+            self._defer({'reload': [list(board) for board in scope]})
+
+    def top(self, kind, board_id, limit):
+        key = BOARD_KEY.format(kind=kind, board_id=board_id)
+        entries, = self._read(lambda pipe: pipe.zrevrange(key, 0, limit - 1, withscores=True))
+        return [(int(member), score) for member, score in entries]
+
+    def rank(self, kind, board_id, user_id):
+        key = BOARD_KEY.format(kind=kind, board_id=board_id)
+
+        def queue(pipe):
+            pipe.zrevrank(key, user_id)
+            pipe.zscore(key, user_id)
+        rank, score = self._read(queue)
+        return None if rank is None else (rank + 1, score)
+
+    def size(self, kind, board_id):
+        size, = self._read(lambda pipe: pipe.zcard(BOARD_KEY.format(kind=kind, board_id=board_id)))
+        return size
+
+
+class SortedScores:
+    """Sorted-set stand-in: a dict for scores plus a list kept ordered by (-score, user_id)."""
+
+    def __init__(self):
+        self.scores = {}
+        self.order = []
+
+    def set(self, user_id, score):
+        old = self.scores.get(user_id)
+        if old is not None:
+            del self.order[bisect.bisect_left(self.order, (-old, user_id))]
+        self.scores[user_id] = score
+        bisect.insort(self.order, (-score, user_id))
+
+    def rank(self, user_id):
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return bisect.bisect_left(self.order, (-score, user_id)) + 1, score
+
+
+class MemoryLeaderboards:
+    """
+    Per-process boards for deployments without Redis. They are loaded from the
+    scores table on first use, so each worker process holds its own copy and
+    only sees the submissions it handled itself since then.
+    """
+    boards = defaultdict(SortedScores)
+    loaded = False
+    lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        if not MemoryLeaderboards.loaded:
+            with db.engine.connect() as connection:
+                self.replace(load_boards(connection), 'all')
+
+    def record(self, changes):
+        with self.lock:
+            self._ensure_loaded()
+            for quiz_id, subject_id, user_id, score in changes:
+                quiz_board = self.boards[('quiz', quiz_id)]
+                old = quiz_board.scores.get(user_id, 0)
+                if user_id in quiz_board.scores and old >= score:
+                    continue
+                quiz_board.set(user_id, score)
+                subject_board = self.boards[('subject', subject_id)]
+                subject_board.set(user_id, subject_board.scores.get(user_id, 0) + score - old)
+
+    def replace(self, boards, scope):
+        with self.lock:
+            if scope == 'all':
+                self.boards.clear()
+            else:
+                for board in scope:
+                    self.boards.pop(board, None)
+            for board, entries in boards.items():
+                for user_id, score in entries.items():
+                    self.boards[board].set(user_id, score)
+            MemoryLeaderboards.loaded = MemoryLeaderboards.loaded or scope == 'all'
+
+    def top(self, kind, board_id, limit):
+        with self.lock:
+            self._ensure_loaded()
+            board = self.boards.get((kind, board_id))
+            return [(user_id, -negative) for negative, user_id in board.order[:limit]] if board else []
+
+    def rank(self, kind, board_id, user_id):
+        with self.lock:
+            self._ensure_loaded()
+            board = self.boards.get((kind, board_id))
+            return board.rank(user_id) if board else None
+
+    def size(self, kind, board_id):
+        with self.lock:
+            self._ensure_loaded()
+            board = self.boards.get((kind, board_id))
+            return len(board.scores) if board else 0
+
+
+LEADERBOARD_BACKENDS = {
+    'redis': RedisLeaderboards,
+    'memory': MemoryLeaderboards,
+}
+
+
+def get_leaderboards():
+    """The configured backend: LEADERBOARD_BACKEND in the app config or environment, Redis by default."""
+    name = current_app.config.get('LEADERBOARD_BACKEND') or os.environ.get('LEADERBOARD_BACKEND', 'redis')
+    return LEADERBOARD_BACKENDS[name]()
+
+
+def rebuild_leaderboards():
+    """Repopulate every board from the scores table in one pass. Returns the number of boards."""
+    with db.engine.connect() as connection:
+        boards = load_boards(connection)
+    get_leaderboards().replace(boards, 'all')
+    return len(boards)
+
+
+@event.listens_for(Session, 'before_flush')
+def collect_score_changes(session, flush_context, instances):
+    # Runs before the rows go out, so the quiz -> subject mapping of a quiz being
+    # deleted together with its scores can still be read.
+    added = [obj for obj in session.new if isinstance(obj, Score)]
+    removed = [obj for obj in session.deleted if isinstance(obj, Score)]
+    if not added and not removed:
+        return
+    quiz_ids = {obj.quiz_id for obj in added + removed}
+    subjects = dict(session.connection().execute(
+        select(Quiz.id, Chapter.subject_id).join(Chapter, Chapter.id == Quiz.chapter_id).where(Quiz.id.in_(quiz_ids))
+    ).all())
+
+    changes = session.info.setdefault(PENDING_CHANGES, {'added': [], 'quizzes': set(), 'subjects': set()})
+    for obj in added:
+        if obj.quiz_id in subjects:
+            changes['added'].append((obj.quiz_id, subjects[obj.quiz_id], obj.user_id, obj.score))
+    for obj in removed:
+        changes['quizzes'].add(obj.quiz_id)
+        if obj.quiz_id in subjects:
+            changes['subjects'].add(subjects[obj.quiz_id])
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_score_changes(session):
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if not changes:
+        return
+    try:
+        leaderboards = get_leaderboards()
+        if changes['added']:
+            leaderboards.record(changes['added'])
+        if changes['quizzes'] or changes['subjects']:
+            # Removing a score can lower a best score, which needs the remaining rows
+            scope = [('quiz', quiz_id) for quiz_id in changes['quizzes']] + [('subject', subject_id) for subject_id in changes['subjects']]
+            with db.engine.connect() as connection:
+                boards = load_boards(connection, changes['quizzes'], changes['subjects'])
+            leaderboards.replace(boards, scope)
+    except Exception as e:
+        # The scores are already committed; rebuild-leaderboards repairs the boards
+        logger.error(f"ERROR: Failed to update leaderboards: {e}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def forget_score_changes(session, previous_transaction):
+    session.info.pop(PENDING_CHANGES, None)
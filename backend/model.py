@@ -16,6 +16,8 @@ class User(db.Model):
 
     scores_attempted = db.relationship('Score', backref='user', lazy=True, cascade="all, delete-orphan")
     user_answers = db.relationship('UserAnswer', backref='user', lazy=True, cascade="all, delete-orphan")
+    stats = db.relationship('UserStats', uselist=False, lazy=True, cascade="all, delete-orphan")
+    submissions = db.relationship('QuizSubmission', lazy=True, cascade="all, delete-orphan")
 
 
     def __repr__(self):
@@ -70,6 +72,7 @@ class Chapter(db.Model):
 
     quizzes = db.relationship('Quiz', back_populates='chapter', cascade="all, delete-orphan")
 
+    # The unique index leads with subject_id, so it also serves chapters-by-subject lookups
     __table_args__ = (db.UniqueConstraint('subject_id', 'name', name='_subject_chapter_name_uc'),)
 
 
@@ -96,9 +99,13 @@ class Quiz(db.Model):
 
     chapter = db.relationship('Chapter', back_populates='quizzes')
 
+    __table_args__ = (db.Index('ix_quizzes_chapter_id', 'chapter_id'),)
+
     questions = db.relationship('Question', backref='quiz', lazy=True, cascade="all, delete-orphan")
     scores = db.relationship('Score', backref='quiz', lazy=True, cascade="all, delete-orphan")
     user_answers = db.relationship('UserAnswer', backref='quiz', lazy=True, cascade="all, delete-orphan")
+    snapshot = db.relationship('QuizSnapshot', uselist=False, lazy=True, cascade="all, delete-orphan")
+    submissions = db.relationship('QuizSubmission', lazy=True, cascade="all, delete-orphan")
 
 
     def __repr__(self):
@@ -119,6 +126,8 @@ class Question(db.Model):
     option4 = db.Column(db.String(200), nullable=False)
     correct_option = db.Column(db.Integer, nullable=False) 
 
+    __table_args__ = (db.Index('ix_questions_quiz_id', 'quiz_id'),)
+
     def __repr__(self):
         return f'<Question {self.question_text}>'
 
@@ -137,7 +146,14 @@ class UserAnswer(db.Model):
 
     question = db.relationship('Question', backref=db.backref('user_answers', lazy=True))
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'quiz_id', 'question_id', name='_user_quiz_question_uc'),)
+    # The unique constraint's index also serves per-user lookups; the other two
+    # back the quiz and question delete cascades.
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'quiz_id', 'question_id', name='_user_quiz_question_uc'),
+        db.Index('ix_user_answers_quiz_id', 'quiz_id'),
+        db.Index('ix_user_answers_question_id', 'question_id'),
+        db.Index('ix_user_answers_attempt_timestamp_quiz_id', 'attempt_timestamp', 'quiz_id'), # quizzes with new answers, for analytics
+    )
 
     def __repr__(self):
         return f'<UserAnswer User:{self.user_id} Quiz:{self.quiz_id} Q:{self.question_id} Opt:{self.selected_option}>'
@@ -154,8 +170,169 @@ class Score(db.Model):
     score = db.Column(db.Integer, nullable=False)
     attempt_timestamp = db.Column(db.DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        db.Index('ix_scores_user_id_attempt_timestamp', 'user_id', 'attempt_timestamp'), # score history, report windows
+        db.Index('ix_scores_quiz_id_score', 'quiz_id', 'score'), # per-quiz results, quiz delete cascade
+        db.Index('ix_scores_attempt_timestamp', 'attempt_timestamp'), # date-range scans across all users
+    )
+
     def __repr__(self):
         return f'<Score {self.score} for User {self.user_id} on Quiz {self.quiz_id}>'
 
     def as_dict(self):
         return {c.key: getattr(self, c.key) for c in self.__table__.columns}
+
+
+class GlobalStats(db.Model):
+    __tablename__ = 'global_stats'
+    id = db.Column(db.Integer, primary_key=True) # Single row, always id 1
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    total_subjects = db.Column(db.Integer, nullable=False, default=0)
+    total_chapters = db.Column(db.Integer, nullable=False, default=0)
+    total_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    total_scores = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<GlobalStats users={self.total_users} scores={self.total_scores}>'
+
+    def as_dict(self):
+        return {c.key: getattr(self, c.key) for c in self.__table__.columns}
+
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=True)
+    last_attempt_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    # {"<subject_id>": {"attempts": n, "score_sum": n, "best_score": n}}
+    subject_breakdown = db.Column(db.JSON, nullable=False, default=dict)
+
+    def __repr__(self):
+        return f'<UserStats User:{self.user_id} attempts={self.attempts}>'
+
+    def as_dict(self):
+        return {
+            'attempts': self.attempts,
+            'average_score': round(self.score_sum / self.attempts, 2) if self.attempts else 0,
+            'best_score': self.best_score,
+            'last_attempt_at': self.last_attempt_at.isoformat() if self.last_attempt_at else None,
+            'subjects': [{
+                'subject_id': int(subject_id),
+                'attempts': entry['attempts'],
+                'average_score': round(entry['score_sum'] / entry['attempts'], 2) if entry['attempts'] else 0,
+                'best_score': entry['best_score']
+            } for subject_id, entry in (self.subject_breakdown or {}).items()]
+        }
+
+
+class QuizSnapshot(db.Model):
+    __tablename__ = 'quiz_snapshots'
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1) # Bumped on every recompile
+    etag = db.Column(db.String(64), nullable=False) # Content hash of body
+    question_count = db.Column(db.Integer, nullable=False, default=0)
+    body = db.Column(db.LargeBinary, nullable=False) # The serialised question list, ready to send
+    body_gzip = db.Column(db.LargeBinary, nullable=False)
+    answer_key = db.Column(db.LargeBinary, nullable=False) # Packed (question id, correct option) pairs, never sent to users
+    compiled_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<QuizSnapshot Quiz:{self.quiz_id} v{self.version}>'
+
+
+class QuizSubmission(db.Model):
+    """One graded quiz submission, keyed by the client's idempotency key so a retried submit can't score twice."""
+    __tablename__ = 'quiz_submissions'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
+    submission_key = db.Column(db.String(64), nullable=False)
+    score_id = db.Column(db.Integer, db.ForeignKey('scores.id'), nullable=False)
+    correct_answers_count = db.Column(db.Integer, nullable=False)
+    total_questions = db.Column(db.Integer, nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False) # When the request arrived; also the Score's attempt_timestamp
+    graded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    score = db.relationship('Score')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'submission_key', name='_user_submission_key_uc'),
+        db.Index('ix_quiz_submissions_quiz_id', 'quiz_id'), # quiz delete cascade
+    )
+
+    def __repr__(self):
+        return f'<QuizSubmission {self.submission_key} for User {self.user_id} on Quiz {self.quiz_id}>'
+
+
+class QuestionAnalytics(db.Model):
+    """
+    Item statistics of one question, recomputed by the question analytics job.
+    Derived data without foreign keys: the job drops rows of deleted questions.
+    """
+    __tablename__ = 'question_analytics'
+    question_id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, nullable=False)
+    answer_count = db.Column(db.Integer, nullable=False, default=0)
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
+    # How often each option was picked; skipped_count covers 0 / out-of-range answers
+    option1_count = db.Column(db.Integer, nullable=False, default=0)
+    option2_count = db.Column(db.Integer, nullable=False, default=0)
+    option3_count = db.Column(db.Integer, nullable=False, default=0)
+    option4_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)
+    difficulty = db.Column(db.Float, nullable=True) # Share of answers that were correct
+    discrimination = db.Column(db.Float, nullable=True) # Upper minus lower 27% group share correct
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_question_analytics_quiz_id', 'quiz_id'),)
+
+    def __repr__(self):
+        return f'<QuestionAnalytics Q:{self.question_id} p={self.difficulty}>'
+
+
+class JobWatermark(db.Model):
+    """How far an incremental job has processed, by job name."""
+    __tablename__ = 'job_watermarks'
+    name = db.Column(db.String(64), primary_key=True)
+    watermark = db.Column(db.DateTime(timezone=True), nullable=True) # Same type as the timestamps it tracks
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<JobWatermark {self.name} {self.watermark}>'
+
+
+class ScoreDistribution(db.Model):
+    """
+    Packed per-score counts of one quiz's attempts, kept current by a flush hook.
+    Derived data without foreign keys: the row goes once its last score is deleted.
+    """
+    __tablename__ = 'score_distributions'
+    quiz_id = db.Column(db.Integer, primary_key=True)
+    sketch = db.Column(db.LargeBinary, nullable=False) # int32 (score, count) pairs, see score_distributions.py
+    total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScoreDistribution Quiz:{self.quiz_id} n={self.total}>'
+
+
+class UserDailyActivity(db.Model):
+    """
+    One user's attempts and score total on one day, rolled up from the scores
+    table for the monthly report. Derived data without foreign keys.
+    """
+    __tablename__ = 'user_daily_activity'
+    user_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_user_daily_activity_day', 'day'),) # report window scans
+
+    def __repr__(self):
+        return f'<UserDailyActivity User:{self.user_id} {self.day} attempts={self.attempts}>'
@@ -0,0 +1,103 @@
+# backend/pagination.py
+
+import json
+import base64
+from datetime import datetime, date
+
+from flask import request
+from flask_restful import abort
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(sort_value, row_id):
+    payload = json.dumps([sort_value, row_id], default=lambda v: v.isoformat())
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, sort_column):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        python_type = sort_column.type.python_type
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif python_type is date:
+            sort_value = date.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        abort(400, message='Invalid pagination cursor')
+
+
+def keyset_query(query, id_column, sort_columns, sort, after, limit):
+    """
+    `query` narrowed to the page after the `after` cursor, in `sort` order
+    (<key|-key>), and limited to one row more than `limit`. Returns (query,
+    sort column); the sort column is `id_column` for the id sort.
+    """
+    sort_columns = dict(sort_columns or {})
+    sort_columns.setdefault('id', id_column)
+
+    descending = sort.startswith('-')
+    sort_key = sort.lstrip('-')
+    if sort_key not in sort_columns:
+        abort(400, message=f'Cannot sort by "{sort_key}". Allowed: {", ".join(sorted(sort_columns))}')
+    sort_column = sort_columns[sort_key]
+    by_id = sort_column is id_column
+
+    if after:
+        if by_id:
+            try:
+                last_id = int(after)
+            except ValueError:
+                abort(400, message='Invalid pagination cursor')
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        else:
+            last_value, last_id = _decode_cursor(after, sort_column)
+            if descending:
+                query = query.filter(or_(sort_column < last_value, and_(sort_column == last_value, id_column < last_id)))
+            else:
+                query = query.filter(or_(sort_column > last_value, and_(sort_column == last_value, id_column > last_id)))
+
+    if by_id:
+        order = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order = [sort_column.desc(), id_column.desc()] if descending else [sort_column.asc(), id_column.asc()]
+
+    # One extra row tells us whether another page exists
+    return query.order_by(*order).limit(limit + 1), sort_column
+
+
+def paginate(query, id_column, sort_columns=None, default_sort='id'):
+    """
+    Keyset-paginate `query` using ?after=<cursor>&limit=<n>&sort=<key|-key>.
+
+    Rows are ordered by the chosen sort column with `id_column` as tie-breaker, so
+    pages stay stable while rows are inserted. With the default id sort the cursor
+    is just the last id; other sorts use an opaque token carrying (value, id).
+    Returns (rows, next_cursor, limit); next_cursor is None on the last page.
+    """
+    limit = request.args.get('limit', type=int, default=DEFAULT_PAGE_SIZE)
+    if limit is None or limit < 1:
+        abort(400, message='limit must be a positive integer')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    sort = request.args.get('sort', type=str, default=default_sort).strip() or default_sort
+    after = request.args.get('after', type=str, default='').strip()
+    page_query, sort_column = keyset_query(query, id_column, sort_columns, sort, after, limit)
+    by_id = sort_column is id_column
+
+    rows = page_query.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        last_id = getattr(last, id_column.key)
+        next_cursor = str(last_id) if by_id else _encode_cursor(getattr(last, sort_column.key), last_id)
+    return rows, next_cursor, limit
+
+
+def page_response(items, next_cursor, limit):
+    return {'items': items, 'next_cursor': next_cursor, 'limit': limit}
@@ -0,0 +1,89 @@
+# backend/passwords.py
+
+import os
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Full werkzeug method spec including cost parameters. Stored hashes whose
+# prefix differs are rehashed on the next successful login.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+# hashlib's scrypt/pbkdf2 release the GIL, so these threads hash in parallel
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 2))
+# Hashes running or queued before new ones are refused outright
+HASH_MAX_PENDING = int(os.environ.get('HASH_MAX_PENDING', HASH_WORKERS * 8))
+HASH_TIMEOUT = float(os.environ.get('HASH_TIMEOUT', 10))
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+class HashingPool:
+    """
+    Runs password hashing on a fixed number of threads so a login burst can't
+    take every request worker's CPU, and sheds work once too much is queued.
+    The executor is created on first use so forked workers each get their own.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hashing')
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The hash still finishes in the background and frees its slot then
+            raise HashingOverloaded()
+
+
+hashing_pool = HashingPool(HASH_WORKERS, HASH_MAX_PENDING, HASH_TIMEOUT)
+
+
+def hash_password(password):
+    return hashing_pool.run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored_hash, password):
+    return hashing_pool.run(check_password_hash, stored_hash, password)
+
+
+def needs_rehash(stored_hash):
+    return stored_hash.split('$', 1)[0] != PASSWORD_HASH_METHOD
+
+
+# Bulk imports hash in separate processes so they don't compete with logins for the pool above
+BULK_HASH_PROCESSES = int(os.environ.get('BULK_HASH_PROCESSES', os.cpu_count() or 2))
+
+
+def hash_passwords(passwords):
+    """Hash many passwords across a process pool, preserving order."""
+    if not passwords:
+        return []
+    hash_one = partial(generate_password_hash, method=PASSWORD_HASH_METHOD)
+    processes = min(BULK_HASH_PROCESSES, len(passwords))
+    chunksize = max(1, len(passwords) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(hash_one, passwords, chunksize=chunksize))
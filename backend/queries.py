@@ -0,0 +1,62 @@
+# backend/queries.py
+#
+# Statements behind the busiest request handlers in app.py. They live here so
+# check_query_plans() in indexes.py explains the very queries the endpoints run.
+
+from sqlalchemy import select, union_all, literal
+
+from extensions import db
+from model import User, Admin, Subject, Chapter, Quiz, Question, Score, UserAnswer
+
+# Sort keys each paginated endpoint accepts besides id
+SCORE_HISTORY_SORTS = {'attempt_timestamp': Score.attempt_timestamp, 'score': Score.score}
+CHAPTER_SORTS = {'name': Chapter.name}
+QUIZ_SORTS = {'title': Quiz.title, 'date_of_quiz': Quiz.date_of_quiz}
+
+
+def login_candidates_query(identifier):
+    """
+    Users and admins matching a login identifier, users first, in one round trip.
+    Each branch is a unique-index lookup (users.email, admins.email/username).
+    """
+    users = select(
+        User.id, User.password, User.role, literal('users').label('table')
+    ).where(User.email == identifier)
+    admins = select(
+        Admin.id, Admin.password, literal('admin').label('role'), literal('admins').label('table')
+    ).where((Admin.email == identifier) | (Admin.username == identifier))
+    return union_all(users, admins)
+
+
+def score_history_query(user_id, date_from=None, date_to=None):
+    """A user's scores with their catalog context, in one column-projected query."""
+    query = db.session.query(
+        Score.id, Score.user_id, Score.quiz_id, Score.score, Score.attempt_timestamp,
+        Quiz.title.label('quiz_title'),
+        Chapter.id.label('chapter_id'), Chapter.name.label('chapter_name'),
+        Subject.id.label('subject_id'), Subject.name.label('subject_name')
+    ).outerjoin(Quiz, Quiz.id == Score.quiz_id) \
+     .outerjoin(Chapter, Chapter.id == Quiz.chapter_id) \
+     .outerjoin(Subject, Subject.id == Chapter.subject_id) \
+     .filter(Score.user_id == user_id)
+    if date_from:
+        query = query.filter(Score.attempt_timestamp >= date_from)
+    if date_to:
+        query = query.filter(Score.attempt_timestamp < date_to)
+    return query
+
+
+def chapters_by_subject_query(subject_id):
+    return Chapter.query.filter_by(subject_id=subject_id)
+
+
+def quizzes_by_chapter_query(chapter_id):
+    return Quiz.query.filter_by(chapter_id=chapter_id)
+
+
+def questions_by_quiz_query(quiz_id):
+    return Question.query.filter_by(quiz_id=quiz_id)
+
+
+def user_answer_query(user_id, quiz_id, question_id):
+    return UserAnswer.query.filter_by(user_id=user_id, quiz_id=quiz_id, question_id=question_id)
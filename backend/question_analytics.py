@@ -0,0 +1,179 @@
+# backend/question_analytics.py
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, func
+
+from extensions import db
+from model import UserAnswer, Question, QuestionAnalytics, JobWatermark
+
+WATERMARK_NAME = 'question_analytics'
+# Answers are upserted in place and queued submissions commit with their
+# request time, so rows can land slightly behind the watermark. Quizzes seen in
+# this window are recomputed again; recomputing is idempotent.
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+# Quizzes recomputed per transaction, and rows fetched per round-trip
+QUIZ_BATCH_SIZE = 50
+FETCH_CHUNK_SIZE = 10000
+
+# Share of respondents in each of the upper and lower groups (Kelley's 27%)
+DISCRIMINATION_GROUP = 0.27
+OPTION_COLUMNS = 5  # skipped, option1..option4
+
+
+def answer_columns_query(quiz_ids):
+    return (
+        select(UserAnswer.quiz_id, UserAnswer.user_id, UserAnswer.question_id, UserAnswer.selected_option, Question.correct_option)
+        .join(Question, Question.id == UserAnswer.question_id)
+        .where(UserAnswer.quiz_id.in_(quiz_ids))
+    )
+
+
+def answered_quizzes_query(since=None):
+    """Quiz ids of answers after `since` (every answered quiz, once each, without it)."""
+    if since is None:
+        return select(UserAnswer.quiz_id).distinct()
+    # Deduplicated by the caller rather than with DISTINCT, which SQLite would
+    # rather answer by walking the quiz_id index than the few rows past `since`
+    return select(UserAnswer.quiz_id).where(UserAnswer.attempt_timestamp > since)
+
+
+def load_answer_columns(quiz_ids):
+    """
+    quiz_id, user_id, question_id, selected_option and correct_option arrays for
+    every answer of `quiz_ids`, fetched in chunks straight into int64 columns.
+    """
+    result = db.session.execute(answer_columns_query(quiz_ids).execution_options(yield_per=FETCH_CHUNK_SIZE))
+    chunks = [np.array(rows, dtype=np.int64) for rows in result.partitions()]
+    if not chunks:
+        return None
+    return np.concatenate(chunks).T
+
+
+def compute_question_stats(quiz_ids, user_ids, question_ids, selected, correct_option):
+    """
+    Per-question counts, difficulty and discrimination for the answer columns.
+    Returns a list of QuestionAnalytics column dicts.
+    """
+    correct = selected == correct_option
+    questions, question_index = np.unique(question_ids, return_inverse=True)
+    question_quiz = np.zeros(len(questions), dtype=np.int64)
+    question_quiz[question_index] = quiz_ids
+
+    answer_count = np.bincount(question_index, minlength=len(questions))
+    correct_count = np.bincount(question_index, weights=correct, minlength=len(questions))
+    option = np.where((selected >= 1) & (selected <= 4), selected, 0)
+    option_counts = np.bincount(
+        question_index * OPTION_COLUMNS + option, minlength=len(questions) * OPTION_COLUMNS
+    ).reshape(-1, OPTION_COLUMNS)
+
+    # Each respondent's total within a quiz decides their group
+    pairs, pair_index = np.unique(np.stack([quiz_ids, user_ids]), axis=1, return_inverse=True)
+    pair_index = pair_index.ravel()
+    totals = np.bincount(pair_index, weights=correct, minlength=pairs.shape[1])
+    order = np.lexsort((totals, pairs[0]))
+    _, starts, sizes = np.unique(pairs[0][order], return_index=True, return_counts=True)
+    position = np.arange(len(order)) - np.repeat(starts, sizes)
+    respondents = np.repeat(sizes, sizes)
+    group_size = np.maximum(1, np.floor(respondents * DISCRIMINATION_GROUP)).astype(np.int64)
+    group = np.zeros(len(order), dtype=np.int8)
+    group[order[position < group_size]] = -1
+    group[order[position >= respondents - group_size]] = 1
+    # Too few respondents to split into distinct groups
+    group[order[respondents < 2]] = 0
+    answer_group = group[pair_index]
+
+    def group_share(flag):
+        answered = np.bincount(question_index, weights=answer_group == flag, minlength=len(questions))
+        right = np.bincount(question_index, weights=(answer_group == flag) & correct, minlength=len(questions))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(answered > 0, right / answered, np.nan)
+
+    discrimination = group_share(1) - group_share(-1)
+    difficulty = correct_count / answer_count
+
+    now = datetime.utcnow()
+    return [{
+        'question_id': int(questions[i]),
+        'quiz_id': int(question_quiz[i]),
+        'answer_count': int(answer_count[i]),
+        'correct_count': int(correct_count[i]),
+        'skipped_count': int(option_counts[i, 0]),
+        'option1_count': int(option_counts[i, 1]),
+        'option2_count': int(option_counts[i, 2]),
+        'option3_count': int(option_counts[i, 3]),
+        'option4_count': int(option_counts[i, 4]),
+        'difficulty': round(float(difficulty[i]), 4),
+        'discrimination': None if np.isnan(discrimination[i]) else round(float(discrimination[i]), 4),
+        'computed_at': now
+    } for i in range(len(questions))]
+
+
+def refresh_question_analytics(full=False):
+    """
+    Recompute analytics for every quiz with answers newer than the last run's
+    watermark (all quizzes with `full`). Returns a summary dict.
+    """
+    watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+    if watermark is None:
+        watermark = JobWatermark(name=WATERMARK_NAME)
+        db.session.add(watermark)
+    # Answers up to here are covered by this run
+    high_water = db.session.query(func.max(UserAnswer.attempt_timestamp)).scalar()
+
+    since = None if full or watermark.watermark is None else watermark.watermark - WATERMARK_OVERLAP
+    quiz_ids = sorted({quiz_id for (quiz_id,) in db.session.execute(answered_quizzes_query(since))})
+
+    table = QuestionAnalytics.__table__
+    questions = 0
+    for start in range(0, len(quiz_ids), QUIZ_BATCH_SIZE):
+        batch = quiz_ids[start:start + QUIZ_BATCH_SIZE]
+        columns = load_answer_columns(batch)
+        rows = compute_question_stats(*columns) if columns is not None else []
+        db.session.execute(table.delete().where(table.c.quiz_id.in_(batch)))
+        if rows:
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+        questions += len(rows)
+
+    # Questions deleted since their analytics were computed
+    db.session.execute(table.delete().where(table.c.question_id.not_in(select(Question.id))))
+    if high_water is not None and (watermark.watermark is None or high_water > watermark.watermark):
+        watermark.watermark = high_water
+    watermark.updated_at = datetime.utcnow()
+    db.session.commit()
+    return {'quizzes': len(quiz_ids), 'questions': questions, 'watermark': watermark.watermark.isoformat() if watermark.watermark else None}
+
+
+def quiz_analytics(quiz_id):
+    """Questions of a quiz with their stored analytics (zeros for questions nobody answered yet)."""
+    rows = db.session.execute(
+        select(Question.id, Question.question_text, Question.option1, Question.option2, Question.option3, Question.option4,
+               Question.correct_option, QuestionAnalytics)
+        .outerjoin(QuestionAnalytics, QuestionAnalytics.question_id == Question.id)
+        .where(Question.quiz_id == quiz_id)
+        .order_by(Question.id)
+    )
+    questions = []
+    computed_at = None
+    for row in rows:
+        stats = row.QuestionAnalytics
+        if stats is not None and (computed_at is None or stats.computed_at > computed_at):
+            computed_at = stats.computed_at
+        questions.append({
+            'question_id': row.id,
+            'question_text': row.question_text,
+            'correct_option': row.correct_option,
+            'answer_count': stats.answer_count if stats else 0,
+            'difficulty': stats.difficulty if stats else None,
+            'discrimination': stats.discrimination if stats else None,
+            'options': [{
+                'option': number,
+                'text': getattr(row, f'option{number}'),
+                'count': getattr(stats, f'option{number}_count') if stats else 0
+            } for number in range(1, 5)],
+            'skipped_count': stats.skipped_count if stats else 0
+        })
+    return {'quiz_id': quiz_id, 'computed_at': computed_at.isoformat() if computed_at else None, 'questions': questions}
@@ -0,0 +1,196 @@
+# backend/quiz_snapshots.py
+
+import gzip
+import json
+import hashlib
+from itertools import chain
+from collections import defaultdict
+from datetime import datetime
+
+from flask import request, Response
+from sqlalchemy import event, select, inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from database import table_ready
+from bulk_ops import conflict_insert
+from model import Quiz, Question, QuizSnapshot
+from answer_keys import pack_answer_key, RECOMPILED_QUIZZES
+
+# Question fields served to quiz takers, in payload order. correct_option stays
+# server-side in the packed answer key.
+SNAPSHOT_FIELDS = ('id', 'quiz_id', 'question_text', 'option1', 'option2', 'option3', 'option4')
+GZIP_LEVEL = 6
+# Columns a recompile overwrites; version is bumped instead
+SNAPSHOT_COLUMNS = ('etag', 'question_count', 'body', 'body_gzip', 'answer_key', 'compiled_at')
+
+
+def build_quiz_snapshots(connection, quiz_ids):
+    """
+    Serialise the question lists and answer keys of `quiz_ids` into QuizSnapshot
+    row dicts, without a version. Returns {quiz_id: row} for the quizzes that exist.
+    """
+    live_quiz_ids = {qid for (qid,) in connection.execute(select(Quiz.id).where(Quiz.id.in_(quiz_ids)))}
+
+    questions = defaultdict(list)
+    answers = defaultdict(list)
+    rows = connection.execute(
+        select(*[getattr(Question, field) for field in SNAPSHOT_FIELDS], Question.correct_option)
+        .where(Question.quiz_id.in_(live_quiz_ids))
+        .order_by(Question.quiz_id, Question.id)
+    )
+    for row in rows:
+        questions[row.quiz_id].append({field: getattr(row, field) for field in SNAPSHOT_FIELDS})
+        answers[row.quiz_id].append((row.id, row.correct_option))
+
+    snapshots = {}
+    now = datetime.utcnow()
+    for quiz_id in live_quiz_ids:
+        body = json.dumps(questions.get(quiz_id, []), separators=(',', ':')).encode('utf-8')
+        snapshots[quiz_id] = {
+            'quiz_id': quiz_id,
+            'etag': hashlib.sha256(body).hexdigest()[:32],
+            'question_count': len(questions.get(quiz_id, [])),
+            'body': body,
+            # mtime=0 keeps the compressed bytes a pure function of the body
+            'body_gzip': gzip.compress(body, GZIP_LEVEL, mtime=0),
+            'answer_key': pack_answer_key(answers.get(quiz_id, [])),
+            'compiled_at': now,
+        }
+    return snapshots
+
+
+def store_quiz_snapshots(connection, quiz_ids):
+    """
+    Compile `quiz_ids` and write their QuizSnapshot rows on `connection`,
+    bumping the version of rows that already exist. The upsert lets two
+    transactions compile the same quiz at once; the later one just wins.
+    Quizzes that no longer exist lose their snapshot. Returns the compiled
+    quiz ids.
+    """
+    quiz_ids = {qid for qid in quiz_ids if qid is not None}
+    if not quiz_ids:
+        return set()
+    table = QuizSnapshot.__table__
+    snapshots = build_quiz_snapshots(connection, quiz_ids)
+
+    gone = quiz_ids - set(snapshots)
+    if gone:
+        connection.execute(table.delete().where(table.c.quiz_id.in_(gone)))
+    if not snapshots:
+        return set()
+
+    dialect_insert = conflict_insert(connection)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values([dict(row, version=1) for row in snapshots.values()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['quiz_id'],
+            set_={
+                'version': table.c.version + 1,
+                **{name: stmt.excluded[name] for name in SNAPSHOT_COLUMNS},
+            }
+        )
+        connection.execute(stmt)
+        return set(snapshots)
+
+    # Fallback for other dialects: replace the rows, carrying the versions over
+    versions = dict(connection.execute(select(table.c.quiz_id, table.c.version).where(table.c.quiz_id.in_(snapshots))).all())
+    connection.execute(table.delete().where(table.c.quiz_id.in_(snapshots)))
+    connection.execute(table.insert(), [dict(row, version=versions.get(quiz_id, 0) + 1) for quiz_id, row in snapshots.items()])
+    return set(snapshots)
+
+
+def compile_quiz_snapshots(session, quiz_ids):
+    """
+    Recompile the snapshots of `quiz_ids` in `session`'s transaction, so the
+    change commits or rolls back with the questions.
+    """
+    store_quiz_snapshots(session.connection(), quiz_ids)
+    # Cached answer keys of these quizzes are dropped once this commits
+    session.info.setdefault(RECOMPILED_QUIZZES, set()).update(qid for qid in quiz_ids if qid is not None)
+
+
+@event.listens_for(Session, 'after_flush')
+def recompile_changed_quizzes(session, flush_context):
+    # Attribute history is still available here, so a question moved to another
+    # quiz refreshes both the quiz it left and the one it joined.
+    deleted_quiz_ids = {obj.id for obj in session.deleted if isinstance(obj, Quiz)}
+    quiz_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Question):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        quiz_ids.add(obj.quiz_id)
+        quiz_ids.update(inspect(obj).attrs.quiz_id.history.deleted)
+    quiz_ids -= deleted_quiz_ids
+    if quiz_ids and table_ready(session.connection(), QuizSnapshot.__table__):
+        compile_quiz_snapshots(session, quiz_ids)
+
+
+def compile_all_quiz_snapshots(connection):
+    """
+    Compile every quiz on `connection` and delete snapshots of removed quizzes.
+    Returns the compiled quiz ids; once the transaction commits, pass them to
+    invalidate_answer_keys().
+    """
+    table = QuizSnapshot.__table__
+    connection.execute(table.delete().where(table.c.quiz_id.not_in(select(Quiz.id))))
+    return store_quiz_snapshots(connection, [qid for (qid,) in connection.execute(select(Quiz.id))])
+
+
+def snapshot_query(quiz_id, *columns):
+    """Select the named QuizSnapshot columns of one quiz."""
+    table = QuizSnapshot.__table__
+    return select(*[table.c[name] for name in columns]).where(table.c.quiz_id == quiz_id)
+
+
+def _load_snapshot(quiz_id, *columns):
+    """
+    The named snapshot columns of one quiz, compiling the snapshot first if the
+    quiz has none yet, or None if the quiz doesn't exist.
+    """
+    table = QuizSnapshot.__table__
+    ready = table_ready(db.session.connection(), table)
+    if ready:
+        snapshot = db.session.execute(snapshot_query(quiz_id, *columns)).first()
+        if snapshot is not None:
+            return snapshot
+    if db.session.get(Quiz, quiz_id) is None:
+        return None
+    if not ready:
+        # Until `flask upgrade-db` creates the table, serve a snapshot built in memory
+        snapshot = build_quiz_snapshots(db.session.connection(), [quiz_id])[quiz_id]
+        return tuple(dict(snapshot, version=0)[name] for name in columns)
+    # Quizzes created before snapshots existed are compiled on first read, in a
+    # transaction of its own so the caller's is neither committed nor extended
+    with db.engine.begin() as connection:
+        store_quiz_snapshots(connection, [quiz_id])
+        return connection.execute(snapshot_query(quiz_id, *columns)).first()
+
+
+def load_answer_key(quiz_id):
+    """(version, packed answer key) of a quiz, or None if the quiz doesn't exist."""
+    return _load_snapshot(quiz_id, 'version', 'answer_key')
+
+
+def serve_quiz_snapshot(quiz_id):
+    """
+    Response carrying a quiz's precompiled question list, gzip-encoded when the
+    client accepts it, with a strong ETag so unchanged lists revalidate as 304.
+    Returns None if the quiz doesn't exist.
+    """
+    use_gzip = request.accept_encodings['gzip'] > 0
+    snapshot = _load_snapshot(quiz_id, 'etag', 'body_gzip' if use_gzip else 'body')
+    if snapshot is None:
+        return None
+
+    etag, body = snapshot
+    response = Response(body, mimetype='application/json')
+    # Each encoding is a different representation and needs its own strong ETag
+    response.set_etag(f'{etag}-gz' if use_gzip else etag)
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
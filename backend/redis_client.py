@@ -0,0 +1,25 @@
+# backend/redis_client.py
+
+import os
+
+import redis
+
+# Working data kept in Redis directly (autosave buffers etc.), as opposed to the
+# Flask-Caching entries in DB 1. A separate DB keeps a cache flush from dropping it.
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/2')
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2))
+
+_client = None
+
+
+def get_redis():
+    """Shared client; redis-py's pool reconnects per process after a fork."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            REDIS_URL,
+            decode_responses=True,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
@@ -0,0 +1,153 @@
+# backend/report_artifacts.py
+
+import os
+import gzip
+import time
+import shutil
+import hashlib
+import tempfile
+from abc import ABC, abstractmethod
+
+from flask import request, send_file
+
+# Generated report files are stored here by the worker and served by the web app
+ARTIFACTS_DIR = os.environ.get('REPORTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports'))
+# Reports are mostly repeated markup, so they are stored gzipped unless disabled
+COMPRESS_ARTIFACTS = os.environ.get('REPORT_ARTIFACT_GZIP', '1') != '0'
+# Files older than this are removed by the nightly maintenance task
+ARTIFACT_MAX_AGE = int(os.environ.get('REPORT_ARTIFACT_MAX_AGE', 7 * 86400))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactStore(ABC):
+    """
+    Where finished report files live. Tasks hand a file to `put_file` and pass
+    the returned reference dict (JSON-safe, a few hundred bytes) through the
+    result backend; the web app hands it back to `send`. An object storage
+    backend implements these methods and is registered in ARTIFACT_STORES.
+    """
+    name = None
+
+    @abstractmethod
+    def put_file(self, path, compress=COMPRESS_ARTIFACTS):
+        """Store the file at `path` (which is consumed) and return its reference."""
+
+    @abstractmethod
+    def exists(self, reference):
+        pass
+
+    @abstractmethod
+    def send(self, reference, mimetype, download_name):
+        """A response for the artifact; conditional and range requests are honoured where the backend can."""
+
+    def prune(self, max_age=ARTIFACT_MAX_AGE):
+        """Remove artifacts older than `max_age` seconds. Returns how many were removed."""
+        return 0
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalArtifactStore(ArtifactStore):
+    """
+    Content-addressed files under ARTIFACTS_DIR: <digest[:2]>/<digest>[.gz],
+    where the digest is the SHA-256 of the uncompressed content. Identical
+    reports share one file.
+    """
+    name = 'local'
+
+    def __init__(self, root=ARTIFACTS_DIR):
+        self.root = root
+
+    def _path(self, reference):
+        key = reference['key']
+        # Keys are generated here, but they round-trip through the result backend
+        if not key.replace('.gz', '').isalnum():
+            raise ValueError(f'Invalid artifact key: {key!r}')
+        return os.path.join(self.root, key[:2], key)
+
+    def put_file(self, path, compress=COMPRESS_ARTIFACTS):
+        digest = file_digest(path)
+        size = os.path.getsize(path)
+        reference = {
+            'store': self.name,
+            'key': digest + ('.gz' if compress else ''),
+            'sha256': digest,
+            'size': size,
+            'encoding': 'gzip' if compress else None
+        }
+        target = self._path(reference)
+        if os.path.exists(target):
+            # Same content stored before; refresh its age for pruning
+            os.utime(target)
+            os.remove(path)
+            return reference
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if compress:
+            fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+            with open(path, 'rb') as source, os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as sink:
+                shutil.copyfileobj(source, sink, HASH_CHUNK_SIZE)
+            os.remove(path)
+        else:
+            partial_path = path
+        os.replace(partial_path, target)
+        return reference
+
+    def exists(self, reference):
+        return os.path.exists(self._path(reference))
+
+    def send(self, reference, mimetype, download_name):
+        path = self._path(reference)
+        if reference.get('encoding') != 'gzip':
+            return send_file(path, mimetype=mimetype, as_attachment=True, download_name=download_name,
+                             conditional=True, etag=reference['sha256'])
+
+        if 'gzip' in request.accept_encodings:
+            # The stored bytes go out as they are; ranges apply to the gzipped body
+            response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=download_name,
+                                 conditional=True, etag=f"{reference['sha256']}-gzip")
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            # Decompressed on the fly; no known length, so no ranges
+            response = send_file(gzip.open(path, 'rb'), mimetype=mimetype, as_attachment=True, download_name=download_name,
+                                 conditional=True, etag=reference['sha256'])
+        response.headers.add('Vary', 'Accept-Encoding')
+        return response
+
+    def prune(self, max_age=ARTIFACT_MAX_AGE):
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+
+ARTIFACT_STORES = {
+    'local': LocalArtifactStore,
+}
+
+
+def get_artifact_store(name=None):
+    """The store called `name`, or the one configured by REPORT_ARTIFACT_STORE (local by default)."""
+    return ARTIFACT_STORES[name or os.environ.get('REPORT_ARTIFACT_STORE', 'local')]()
+
+
+def new_artifact_path(prefix, extension):
+    """A scratch file for a task to write a report into before storing it."""
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=ARTIFACTS_DIR, prefix=f'{prefix}_', suffix=f'.{extension}.part')
+    os.close(fd)
+    return path
@@ -0,0 +1,188 @@
+# backend/score_distributions.py
+
+import sys
+import bisect
+import logging
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+
+from extensions import db
+from database import table_ready
+from bulk_ops import insert_missing
+from model import Score, Quiz, Chapter, ScoreDistribution
+
+logger = logging.getLogger(__name__)
+
+# Quantiles reported alongside every histogram
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+# Sketches pack scores as int32
+SKETCH_SCORE_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+def sketchable(score):
+    """Whether `score` fits in a sketch: an int inside the int32 range."""
+    return isinstance(score, int) and SKETCH_SCORE_RANGE[0] <= score <= SKETCH_SCORE_RANGE[1]
+
+
+class ScoreSketch:
+    """
+    Counts per distinct score. Scores are small integers (correct answers), so
+    the exact counts take about as little space as a t-digest or KLL sketch
+    would, merge by addition, and also shrink exactly when scores are deleted.
+    """
+    __slots__ = ('counts',)
+
+    def __init__(self, counts=None):
+        self.counts = Counter({score: count for score, count in (counts or {}).items() if count > 0})
+
+    @classmethod
+    def from_blob(cls, blob):
+        """Unpack the interleaved little-endian int32 (score, count) pairs written by `to_blob`."""
+        values = array('i')
+        values.frombytes(blob)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return cls(dict(zip(values[::2], values[1::2])))
+
+    def to_blob(self):
+        values = array('i')
+        for score in sorted(self.counts):
+            values.extend((score, self.counts[score]))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tobytes()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def update(self, deltas):
+        """Apply {score: +n/-n}; counts never drop below zero."""
+        for score, delta in deltas.items():
+            count = self.counts.get(score, 0) + delta
+            if count > 0:
+                self.counts[score] = count
+            else:
+                self.counts.pop(score, None)
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def percentile_rank(self, score):
+        """Share of scores below `score`, counting ties as half, as a percentage."""
+        total = self.total
+        if not total:
+            return None
+        below = sum(count for value, count in self.counts.items() if value < score)
+        return round(100 * (below + self.counts.get(score, 0) / 2) / total, 1)
+
+    def quantile(self, q):
+        """Smallest score with at least a `q` share of scores at or below it."""
+        scores = sorted(self.counts)
+        if not scores:
+            return None
+        cumulative = []
+        running = 0
+        for score in scores:
+            running += self.counts[score]
+            cumulative.append(running)
+        return scores[min(bisect.bisect_left(cumulative, q * running), len(scores) - 1)]
+
+    def summary(self):
+        total = self.total
+        return {
+            'count': total,
+            'mean': round(sum(score * count for score, count in self.counts.items()) / total, 2) if total else None,
+            'min': min(self.counts) if total else None,
+            'max': max(self.counts) if total else None,
+            'quantiles': {f'p{int(q * 100)}': self.quantile(q) for q in SUMMARY_QUANTILES},
+            'histogram': [{'score': score, 'count': self.counts[score]} for score in sorted(self.counts)]
+        }
+
+
+def update_score_distributions(connection, deltas):
+    """Fold {quiz_id: {score: delta}} into the stored sketches on `connection`."""
+    table = ScoreDistribution.__table__
+    now = datetime.utcnow()
+    # Quizzes without a sketch yet get an empty row to lock, so concurrent
+    # first scores can't both insert
+    insert_missing(connection, table, [
+        {'quiz_id': quiz_id, 'sketch': b'', 'total': 0, 'updated_at': now} for quiz_id in sorted(deltas)
+    ], ['quiz_id'])
+    stored = {
+        row.quiz_id: row.sketch
+        for row in connection.execute(select(table.c.quiz_id, table.c.sketch).where(table.c.quiz_id.in_(deltas)).with_for_update())
+    }
+    for quiz_id, quiz_deltas in deltas.items():
+        sketch = ScoreSketch.from_blob(stored[quiz_id]) if quiz_id in stored else ScoreSketch()
+        sketch.update(quiz_deltas)
+        values = {'sketch': sketch.to_blob(), 'total': sketch.total, 'updated_at': now}
+        if quiz_id not in stored:
+            if sketch.total:
+                connection.execute(table.insert().values(quiz_id=quiz_id, **values))
+        elif sketch.total:
+            connection.execute(table.update().where(table.c.quiz_id == quiz_id).values(values))
+        else:
+            connection.execute(table.delete().where(table.c.quiz_id == quiz_id))
+
+
+@event.listens_for(Session, 'after_flush')
+def apply_score_distribution_deltas(session, flush_context):
+    # Same connection as the flush, so the sketches commit or roll back with the scores
+    deltas = defaultdict(Counter)
+    for objects, delta in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            if not isinstance(obj, Score):
+                continue
+            if not sketchable(obj.score):
+                # Raising here would fail the flush; rebuild-score-distributions skips them too
+                logger.warning(f"Score {obj.id} of quiz {obj.quiz_id} left out of its distribution: {obj.score!r} is not an int32")
+                continue
+            deltas[obj.quiz_id][obj.score] += delta
+    deltas = {quiz_id: quiz_deltas for quiz_id, quiz_deltas in deltas.items() if any(quiz_deltas.values())}
+    if deltas and table_ready(session.connection(), ScoreDistribution.__table__):
+        update_score_distributions(session.connection(), deltas)
+
+
+def rebuild_score_distributions(connection):
+    """Recreate every quiz's sketch from one grouped pass over the scores table. Returns the number of quizzes."""
+    counts = defaultdict(dict)
+    for quiz_id, score, count in connection.execute(
+        select(Score.quiz_id, Score.score, func.count(Score.id)).group_by(Score.quiz_id, Score.score)
+    ):
+        if sketchable(score):
+            counts[quiz_id][score] = count
+
+    now = datetime.utcnow()
+    rows = []
+    for quiz_id, quiz_counts in counts.items():
+        sketch = ScoreSketch(quiz_counts)
+        rows.append({'quiz_id': quiz_id, 'sketch': sketch.to_blob(), 'total': sketch.total, 'updated_at': now})
+
+    table = ScoreDistribution.__table__
+    connection.execute(table.delete())
+    if rows:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def quiz_score_sketch(quiz_id):
+    blob = db.session.query(ScoreDistribution.sketch).filter_by(quiz_id=quiz_id).scalar()
+    return ScoreSketch.from_blob(blob) if blob is not None else ScoreSketch()
+
+
+def subject_score_sketch(subject_id):
+    """The subject's quiz sketches merged, without touching the scores table."""
+    sketch = ScoreSketch()
+    blobs = db.session.query(ScoreDistribution.sketch) \
+        .join(Quiz, Quiz.id == ScoreDistribution.quiz_id) \
+        .join(Chapter, Chapter.id == Quiz.chapter_id) \
+        .filter(Chapter.subject_id == subject_id)
+    for (blob,) in blobs:
+        sketch.merge(ScoreSketch.from_blob(blob))
+    return sketch
@@ -0,0 +1,295 @@
+# backend/search.py
+
+import re
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import text, func, select, literal, literal_column, union_all, or_, column, bindparam, Integer
+
+from extensions import db
+from model import Subject, Chapter, Quiz, Question
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# What each searchable kind indexes. `title` is the column shown in hits and
+# `parent` the foreign key the client needs to navigate to the hit.
+SearchSpec = namedtuple('SearchSpec', 'model index_name columns title parent')
+
+SEARCHABLE = {
+    'subject': SearchSpec(Subject, 'subjects_fts', ('name', 'description'), 'name', None),
+    'chapter': SearchSpec(Chapter, 'chapters_fts', ('name', 'description'), 'name', 'subject_id'),
+    'quiz': SearchSpec(Quiz, 'quizzes_fts', ('title', 'description'), 'title', 'chapter_id'),
+    'question': SearchSpec(Question, 'questions_fts', ('question_text',), 'question_text', 'quiz_id'),
+}
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(raw_query):
+    """Split free text into word tokens; anything else (quotes, operators) is dropped."""
+    return _TERM_RE.findall(raw_query or '')
+
+
+class SearchBackend(ABC):
+    """
+    Interface for the search index. `match_ids` returns a selectable of matching
+    primary keys (for filtering list endpoints) and `search` returns ranked hits
+    across kinds. Terms are prefix-matched and ANDed together.
+    """
+    name = None
+
+    def install(self, connection, rebuild=False):
+        pass
+
+    def installed(self, connection):
+        """True once `install` has created the index; backends without one are always ready."""
+        return True
+
+    @abstractmethod
+    def match_ids(self, kind, terms):
+        pass
+
+    @abstractmethod
+    def search(self, terms, kinds, limit):
+        pass
+
+
+class Fts5SearchBackend(SearchBackend):
+    """
+    SQLite FTS5 external-content tables, one per kind, whose rowid is the source
+    row id. Triggers on the source tables keep them in sync, so bulk Core inserts
+    and cascaded deletes are indexed as well as ORM writes.
+    """
+    name = 'fts5'
+
+    def _ddl(self, spec):
+        table = spec.model.__tablename__
+        index = spec.index_name
+        cols = ', '.join(spec.columns)
+        new_vals = ', '.join(f'new.{c}' for c in spec.columns)
+        old_vals = ', '.join(f'old.{c}' for c in spec.columns)
+        delete_old = f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old_vals});"
+        insert_new = f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new_vals});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete_old} {insert_new} END",
+        ]
+
+    @staticmethod
+    def _objects(index):
+        return {index, f'{index}_ai', f'{index}_ad', f'{index}_au'}
+
+    @staticmethod
+    def _existing(connection):
+        return {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))}
+
+    def install(self, connection, rebuild=False):
+        existing = self._existing(connection)
+        for spec in SEARCHABLE.values():
+            index = spec.index_name
+            missing = self._objects(index) - existing
+            for statement in self._ddl(spec):
+                connection.execute(text(statement))
+            # A new index, or one whose triggers were dropped with its table, is
+            # out of date until rebuilt from the content table.
+            if rebuild or missing:
+                connection.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+
+    def installed(self, connection):
+        existing = self._existing(connection)
+        return all(self._objects(spec.index_name) <= existing for spec in SEARCHABLE.values())
+
+    @staticmethod
+    def _match_expression(terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def match_ids(self, kind, terms):
+        index = SEARCHABLE[kind].index_name
+        return (
+            text(f"SELECT rowid FROM {index} WHERE {index} MATCH :fts_query")
+            .bindparams(fts_query=self._match_expression(terms))
+            .columns(column('rowid', Integer))
+        )
+
+    def search(self, terms, kinds, limit):
+        parts = []
+        for kind in kinds:
+            spec = SEARCHABLE[kind]
+            table = spec.model.__tablename__
+            index = spec.index_name
+            parent = f't.{spec.parent}' if spec.parent else 'NULL'
+            # Each kind is cut to `limit` first so FTS5 can use its rank-ordered scan
+            parts.append(
+                f"SELECT * FROM (SELECT '{kind}' AS kind, t.id AS id, t.{spec.title} AS title, "
+                f"{parent} AS parent_id, snippet({index}, -1, '[', ']', '...', 12) AS snippet, "
+                f"{index}.rank AS rank FROM {index} JOIN {table} t ON t.id = {index}.rowid "
+                f"WHERE {index} MATCH :fts_query ORDER BY {index}.rank LIMIT :limit)"
+            )
+        sql = ' UNION ALL '.join(parts) + ' ORDER BY rank LIMIT :limit'
+        rows = db.session.execute(text(sql), {'fts_query': self._match_expression(terms), 'limit': limit})
+        return [dict(row._mapping) for row in rows]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    PostgreSQL full-text search over an expression GIN index per kind. The
+    tsvector is computed from the row itself, so no sync is needed.
+    """
+    name = 'tsvector'
+    config = "'english'::regconfig"
+
+    def _document(self, spec):
+        # Built from literals so it matches the index expression below exactly
+        model = spec.model
+        parts = [func.coalesce(getattr(model, column), literal_column("''")) for column in spec.columns]
+        document = parts[0]
+        for part in parts[1:]:
+            document = document.op('||')(literal_column("' '")).op('||')(part)
+        return func.to_tsvector(literal_column(self.config), document)
+
+    def _query(self, terms):
+        return func.to_tsquery(literal_column(self.config), ' & '.join(f'{term}:*' for term in terms))
+
+    def install(self, connection, rebuild=False):
+        for spec in SEARCHABLE.values():
+            table = spec.model.__tablename__
+            columns = " || ' ' || ".join(f"coalesce({column}, '')" for column in spec.columns)
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} "
+                f"USING GIN (to_tsvector({self.config}, {columns}))"
+            ))
+
+    def installed(self, connection):
+        expected = {f'ix_{spec.model.__tablename__}_search' for spec in SEARCHABLE.values()}
+        existing = {row[0] for row in connection.execute(
+            text("SELECT indexname FROM pg_indexes WHERE indexname IN :names").bindparams(bindparam('names', expanding=True)),
+            {'names': sorted(expected)}
+        )}
+        return expected <= existing
+
+    def match_ids(self, kind, terms):
+        spec = SEARCHABLE[kind]
+        return select(spec.model.id).where(self._document(spec).op('@@')(self._query(terms)))
+
+    def search(self, terms, kinds, limit):
+        tsquery = self._query(terms)
+        selects = []
+        for kind in kinds:
+            spec = SEARCHABLE[kind]
+            model = spec.model
+            document = self._document(spec)
+            rank = func.ts_rank(document, tsquery)
+            selects.append(
+                select(
+                    literal(kind).label('kind'),
+                    model.id.label('id'),
+                    getattr(model, spec.title).label('title'),
+                    (getattr(model, spec.parent) if spec.parent else literal(None)).label('parent_id'),
+                    func.ts_headline(literal_column(self.config), getattr(model, spec.columns[-1]), tsquery).label('snippet'),
+                    # negated so that, as with bm25, lower sorts first
+                    (-rank).label('rank'),
+                )
+                .where(document.op('@@')(tsquery))
+                .order_by(rank.desc())
+                .limit(limit)
+                .subquery()
+                .select()
+            )
+        combined = union_all(*selects).subquery()
+        rows = db.session.execute(select(combined).order_by(combined.c.rank).limit(limit))
+        return [dict(row._mapping) for row in rows]
+
+
+class LikeSearchBackend(SearchBackend):
+    """Fallback for databases without a full-text engine: unindexed substring scans."""
+    name = 'like'
+
+    def _condition(self, spec, terms):
+        model = spec.model
+        return [or_(*[getattr(model, column).ilike(f'%{term}%') for column in spec.columns]) for term in terms]
+
+    def match_ids(self, kind, terms):
+        spec = SEARCHABLE[kind]
+        return select(spec.model.id).where(*self._condition(spec, terms))
+
+    def search(self, terms, kinds, limit):
+        hits = []
+        for kind in kinds:
+            spec = SEARCHABLE[kind]
+            model = spec.model
+            parent = getattr(model, spec.parent) if spec.parent else literal(None)
+            rows = db.session.execute(
+                select(model.id, getattr(model, spec.title), parent, getattr(model, spec.columns[-1]))
+                .where(*self._condition(spec, terms))
+                .order_by(model.id)
+                .limit(limit)
+            )
+            hits.extend({'kind': kind, 'id': row[0], 'title': row[1], 'parent_id': row[2], 'snippet': row[3], 'rank': 0} for row in rows)
+        return hits[:limit]
+
+
+SEARCH_BACKENDS = {
+    'fts5': Fts5SearchBackend,
+    'tsvector': PostgresSearchBackend,
+    'like': LikeSearchBackend,
+}
+
+# Used when SEARCH_BACKEND isn't configured
+DIALECT_BACKENDS = {
+    'sqlite': 'fts5',
+    'postgresql': 'tsvector',
+}
+
+# Engines whose configured index has been seen installed; a missing one is looked up again
+_installed_engines = set()
+
+
+def configured_search_backend():
+    """The backend named by SEARCH_BACKEND, or the one for the database's dialect."""
+    name = current_app.config.get('SEARCH_BACKEND') or DIALECT_BACKENDS.get(db.engine.dialect.name, 'like')
+    return SEARCH_BACKENDS[name]()
+
+
+def get_search_backend():
+    """
+    The configured backend, or LikeSearchBackend until `flask upgrade-db` or
+    `flask rebuild-search-index` has installed its index. Building an index
+    can mean a long write transaction, so requests never do it themselves.
+    """
+    engine = db.engine
+    backend = configured_search_backend()
+    if engine not in _installed_engines:
+        with engine.connect() as connection:
+            if not backend.installed(connection):
+                return LikeSearchBackend()
+        _installed_engines.add(engine)
+    return backend
+
+
+def rebuild_search_index():
+    """Create the search index if needed and reindex every row."""
+    backend = configured_search_backend()
+    with db.engine.begin() as connection:
+        backend.install(connection, rebuild=True)
+    return backend
+
+
+def filter_by_search(query, kind, raw_query):
+    """Restrict an ORM query over `kind` rows to those matching `raw_query`."""
+    terms = search_terms(raw_query)
+    if not terms:
+        return query
+    ids = get_search_backend().match_ids(kind, terms)
+    return query.filter(SEARCHABLE[kind].model.id.in_(ids))
+
+
+def search(raw_query, kinds=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Ranked hits for `raw_query` across `kinds` (default: every searchable kind)."""
+    terms = search_terms(raw_query)
+    if not terms:
+        return []
+    return get_search_backend().search(terms, list(kinds or SEARCHABLE), limit)
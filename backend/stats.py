@@ -0,0 +1,210 @@
+# backend/stats.py
+
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from database import table_ready
+from bulk_ops import insert_missing
+from model import User, Subject, Chapter, Quiz, Question, Score, GlobalStats, UserStats
+
+GLOBAL_STATS_ID = 1
+
+# Which GlobalStats counter each model feeds
+COUNTED_MODELS = {
+    User: 'total_users',
+    Subject: 'total_subjects',
+    Chapter: 'total_chapters',
+    Quiz: 'total_quizzes',
+    Question: 'total_questions',
+    Score: 'total_scores',
+}
+
+
+def _collect_deltas(objects, sign, deltas):
+    for obj in objects:
+        column = COUNTED_MODELS.get(type(obj))
+        if column is None:
+            continue
+        deltas[column] += sign
+        if isinstance(obj, Score):
+            deltas['score_sum'] += sign * (obj.score or 0)
+
+
+@event.listens_for(Session, 'after_flush')
+def apply_stats_deltas(session, flush_context):
+    # new/deleted still hold the pre-flush state here, and the UPDATEs run on the
+    # flush's own connection, so the counters commit or roll back with the rows.
+    connection = session.connection()
+
+    deltas = Counter()
+    _collect_deltas(session.new, 1, deltas)
+    _collect_deltas(session.deleted, -1, deltas)
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    # Skipped until upgrade-db has created the table; its backfill counts these rows
+    if deltas and table_ready(connection, GlobalStats.__table__):
+        table = GlobalStats.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.id == GLOBAL_STATS_ID)
+            .values({column: table.c[column] + delta for column, delta in deltas.items()})
+        )
+
+    if not table_ready(connection, UserStats.__table__):
+        return
+    # best_score can't be decremented, so users who lost scores are recounted instead
+    recount_user_ids = {obj.user_id for obj in session.deleted if isinstance(obj, Score)}
+    if recount_user_ids:
+        rebuild_user_stats(connection, recount_user_ids)
+    new_scores = [obj for obj in session.new if isinstance(obj, Score) and obj.user_id not in recount_user_ids]
+    if new_scores:
+        record_user_attempts(connection, new_scores)
+
+
+def _as_utc(value):
+    """Aware UTC; SQLite hands back naive values, PostgreSQL aware ones."""
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _merge_attempt(entry, score):
+    entry['attempts'] += 1
+    entry['score_sum'] += score
+    entry['best_score'] = score if entry['best_score'] is None else max(entry['best_score'], score)
+
+
+def record_user_attempts(connection, scores):
+    """Fold freshly inserted Score rows into their users' UserStats rows."""
+    table = UserStats.__table__
+    quiz_subjects = dict(connection.execute(
+        select(Quiz.id, Chapter.subject_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .where(Quiz.id.in_({s.quiz_id for s in scores}))
+    ).all())
+
+    scores_by_user = defaultdict(list)
+    for score in scores:
+        scores_by_user[score.user_id].append(score)
+
+    # First attempts get an empty row to lock, so concurrent ones can't both insert
+    insert_missing(connection, table, [{
+        'user_id': user_id, 'attempts': 0, 'score_sum': 0, 'best_score': None, 'last_attempt_at': None, 'subject_breakdown': {}
+    } for user_id in sorted(scores_by_user)], ['user_id'])
+
+    for user_id, user_scores in sorted(scores_by_user.items()):
+        row = connection.execute(select(table).where(table.c.user_id == user_id).with_for_update()).first()
+        totals = {
+            'attempts': row.attempts if row else 0,
+            'score_sum': row.score_sum if row else 0,
+            'best_score': row.best_score if row else None,
+        }
+        last_attempt_at = _as_utc(row.last_attempt_at) if row else None
+        breakdown = dict(row.subject_breakdown or {}) if row else {}
+
+        for score in user_scores:
+            _merge_attempt(totals, score.score)
+            attempted_at = _as_utc(score.attempt_timestamp) or datetime.now(timezone.utc)
+            if last_attempt_at is None or attempted_at > last_attempt_at:
+                last_attempt_at = attempted_at
+            subject_id = quiz_subjects.get(score.quiz_id)
+            if subject_id is not None:
+                entry = dict(breakdown.get(str(subject_id), {'attempts': 0, 'score_sum': 0, 'best_score': None}))
+                _merge_attempt(entry, score.score)
+                breakdown[str(subject_id)] = entry
+
+        values = dict(totals, last_attempt_at=last_attempt_at, subject_breakdown=breakdown)
+        if row:
+            connection.execute(table.update().where(table.c.user_id == user_id).values(values))
+        else:
+            connection.execute(table.insert().values(user_id=user_id, **values))
+
+
+def user_totals_query(user_ids=None):
+    """(user_id, attempts, score sum, best score, last attempt) per user, for everyone or `user_ids`."""
+    query = (
+        select(Score.user_id, func.count(Score.id), func.sum(Score.score), func.max(Score.score), func.max(Score.attempt_timestamp))
+        .group_by(Score.user_id)
+    )
+    return query if user_ids is None else query.where(Score.user_id.in_(user_ids))
+
+
+def user_subject_totals_query(user_ids=None):
+    """(user_id, subject_id, attempts, score sum, best score) per user and subject."""
+    query = (
+        select(Score.user_id, Chapter.subject_id, func.count(Score.id), func.sum(Score.score), func.max(Score.score))
+        .join(Quiz, Quiz.id == Score.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .group_by(Score.user_id, Chapter.subject_id)
+    )
+    return query if user_ids is None else query.where(Score.user_id.in_(user_ids))
+
+
+def rebuild_user_stats(connection, user_ids=None):
+    """Recompute UserStats from the scores table, for the given users or for everyone."""
+    table = UserStats.__table__
+    delete = table.delete() if user_ids is None else table.delete().where(table.c.user_id.in_(user_ids))
+    totals_query = user_totals_query(user_ids)
+    subjects_query = user_subject_totals_query(user_ids)
+
+    breakdowns = defaultdict(dict)
+    for user_id, subject_id, attempts, score_sum, best_score in connection.execute(subjects_query):
+        breakdowns[user_id][str(subject_id)] = {'attempts': attempts, 'score_sum': score_sum, 'best_score': best_score}
+
+    rows = [{
+        'user_id': user_id,
+        'attempts': attempts,
+        'score_sum': score_sum,
+        'best_score': best_score,
+        'last_attempt_at': last_attempt_at,
+        'subject_breakdown': breakdowns.get(user_id, {})
+    } for user_id, attempts, score_sum, best_score, last_attempt_at in connection.execute(totals_query)]
+
+    connection.execute(delete)
+    if rows:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def adjust_global_stats(**deltas):
+    """Apply counter deltas for writes that bypass the ORM unit of work (bulk inserts)."""
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = GlobalStats.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id == GLOBAL_STATS_ID)
+        .values({column: table.c[column] + delta for column, delta in deltas.items()})
+    )
+
+
+def rebuild_global_stats():
+    """Recount everything from the source tables and overwrite the stats row."""
+    GlobalStats.__table__.create(db.engine, checkfirst=True)
+
+    values = {column: db.session.query(func.count(model.id)).scalar() for model, column in COUNTED_MODELS.items()}
+    values['score_sum'] = db.session.query(func.coalesce(func.sum(Score.score), 0)).scalar()
+
+    stats = db.session.get(GlobalStats, GLOBAL_STATS_ID)
+    if stats is None:
+        stats = GlobalStats(id=GLOBAL_STATS_ID)
+        db.session.add(stats)
+    for column, value in values.items():
+        setattr(stats, column, value)
+    db.session.commit()
+    return stats
+
+
+def get_global_stats():
+    stats = db.session.get(GlobalStats, GLOBAL_STATS_ID)
+    if stats is None:
+        stats = rebuild_global_stats()
+    return stats
+
+
+def get_user_stats(user_id):
+    return db.session.get(UserStats, user_id)
@@ -0,0 +1,259 @@
+# backend/submissions.py
+
+import os
+import re
+import json
+import uuid
+import logging
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from extensions import db
+from model import Score, QuizSubmission
+from answer_keys import get_answer_key
+from bulk_ops import upsert_user_answers
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 'sync' grades inside the request; 'queued' acknowledges with 202 and leaves
+# grading to the ingest_submissions worker task.
+SUBMISSION_MODE = os.environ.get('SUBMISSION_MODE', 'sync')
+
+SUBMISSION_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+QUEUE_KEY = 'submissions:queue'
+# Held while a worker drains the queue, so batches are consumed one at a time
+INGEST_LOCK_KEY = 'submissions:ingest_lock'
+INGEST_LOCK_SECONDS = 120
+# Set for a moment after a worker kick so a burst of submits schedules one task
+KICK_KEY = 'submissions:kick'
+KICK_SECONDS = 1
+# Per-submission status hash read by the polling endpoint
+STATUS_KEY = 'submission:{user_id}:{submission_key}'
+STATUS_TTL = 86400
+
+INGEST_BATCH_SIZE = int(os.environ.get('SUBMISSION_BATCH_SIZE', 200))
+INGEST_MAX_BATCHES = 50
+
+
+def new_submission_key():
+    return uuid.uuid4().hex
+
+
+def valid_submission_key(key):
+    return bool(key) and SUBMISSION_KEY_PATTERN.match(key) is not None
+
+
+def submission_response(submission):
+    return {
+        'message': 'Quiz submitted successfully!',
+        'status': 'graded',
+        'submission_id': submission.submission_key,
+        'quiz_id': submission.quiz_id,
+        'final_score': submission.correct_answers_count,
+        'correct_answers_count': submission.correct_answers_count,
+        'total_questions': submission.total_questions
+    }
+
+
+def record_submissions(items):
+    """
+    Grade `items` and write their answers, Score and QuizSubmission rows in one
+    transaction. Each item is a dict with user_id, quiz_id, submission_key,
+    answers ([question_id, selected_option] pairs, last one wins) and
+    submitted_at. Keys that were already recorded write nothing and get their
+    stored result back. Returns {(user_id, submission_key): result dict}.
+    """
+    pending = {}
+    for item in items:
+        pending.setdefault((item['user_id'], item['submission_key']), item)
+    if not pending:
+        return {}
+
+    results = {}
+    for submission in QuizSubmission.query.filter(
+        tuple_(QuizSubmission.user_id, QuizSubmission.submission_key).in_(list(pending))
+    ):
+        results[(submission.user_id, submission.submission_key)] = submission_response(submission)
+    pending = {key: item for key, item in pending.items() if key not in results}
+
+    # Loading a missing answer key may compile and commit it, so do that before adding rows
+    answer_keys = {quiz_id: get_answer_key(quiz_id) for quiz_id in {item['quiz_id'] for item in pending.values()}}
+
+    answer_rows = []
+    created = []
+    for key, item in pending.items():
+        answer_key = answer_keys[item['quiz_id']]
+        if answer_key is None:
+            results[key] = {'status': 'failed', 'submission_id': item['submission_key'], 'message': 'Quiz not found'}
+            continue
+        submitted_at = item['submitted_at']
+        if isinstance(submitted_at, str):
+            submitted_at = datetime.fromisoformat(submitted_at)
+        submitted = {}
+        for question_id, selected_option in item['answers']:
+            if question_id in answer_key:
+                submitted[question_id] = selected_option
+        correct_answers_count = answer_key.grade(submitted)
+
+        answer_rows.extend({
+            'user_id': item['user_id'],
+            'quiz_id': item['quiz_id'],
+            'question_id': question_id,
+            'selected_option': selected_option,
+            'attempt_timestamp': submitted_at
+        } for question_id, selected_option in submitted.items())
+        submission = QuizSubmission(
+            user_id=item['user_id'],
+            quiz_id=item['quiz_id'],
+            submission_key=item['submission_key'],
+            score=Score(user_id=item['user_id'], quiz_id=item['quiz_id'], score=correct_answers_count, attempt_timestamp=submitted_at),
+            correct_answers_count=correct_answers_count,
+            total_questions=len(answer_key),
+            submitted_at=submitted_at
+        )
+        db.session.add(submission)
+        created.append((key, submission))
+
+    if not created:
+        return results
+    try:
+        # An answer saved later (e.g. a newer attempt in the same batch) is kept
+        upsert_user_answers(answer_rows, only_newer=True)
+        db.session.commit()
+    except IntegrityError:
+        # Another writer recorded one of these keys meanwhile; redo them one by one
+        # so only the duplicates are skipped.
+        db.session.rollback()
+        if len(created) == 1:
+            (user_id, submission_key), _ = created[0]
+            existing = QuizSubmission.query.filter_by(user_id=user_id, submission_key=submission_key).first()
+            if existing is None:
+                raise
+            results[(user_id, submission_key)] = submission_response(existing)
+            return results
+        for key, _ in created:
+            results.update(record_submissions([pending[key]]))
+        return results
+
+    for key, submission in created:
+        results[key] = submission_response(submission)
+    return results
+
+
+def _set_status(pipe, user_id, submission_key, result):
+    status_key = STATUS_KEY.format(user_id=user_id, submission_key=submission_key)
+    pipe.hset(status_key, mapping={'status': result['status'], 'result': json.dumps(result)})
+    pipe.expire(status_key, STATUS_TTL)
+
+
+def enqueue_submission(user_id, quiz_id, submission_key, answers):
+    """
+    Queue a validated submission for the ingest task. Returns the current status
+    dict if `submission_key` was already queued or graded, else None.
+    Raises RedisError if Redis is unavailable.
+    """
+    redis_client = get_redis()
+    status_key = STATUS_KEY.format(user_id=user_id, submission_key=submission_key)
+    if not redis_client.hsetnx(status_key, 'status', 'queued'):
+        return submission_status(user_id, submission_key)
+    item = {
+        'user_id': user_id,
+        'quiz_id': quiz_id,
+        'submission_key': submission_key,
+        'answers': [[question_id, selected_option] for question_id, selected_option in answers.items()],
+        'submitted_at': datetime.utcnow().isoformat()
+    }
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.expire(status_key, STATUS_TTL)
+    pipe.rpush(QUEUE_KEY, json.dumps(item))
+    pipe.execute()
+    return None
+
+
+def should_kick_ingest():
+    """True for the first enqueue in each KICK_SECONDS window; that caller schedules the task."""
+    return bool(get_redis().set(KICK_KEY, 1, nx=True, ex=KICK_SECONDS))
+
+
+def submission_status(user_id, submission_key):
+    """Status dict of a submission ({'status': 'queued'|'graded'|'failed', ...}) or None if unknown."""
+    try:
+        status = get_redis().hgetall(STATUS_KEY.format(user_id=user_id, submission_key=submission_key))
+    except Exception as e:
+        logger.error(f"ERROR: Could not read submission status {submission_key}: {e}")
+        status = None
+    if status:
+        if 'result' in status:
+            return json.loads(status['result'])
+        return {'status': status.get('status', 'queued'), 'submission_id': submission_key}
+    # Statuses expire from Redis; graded submissions stay in the database
+    submission = QuizSubmission.query.filter_by(user_id=user_id, submission_key=submission_key).first()
+    return submission_response(submission) if submission else None
+
+
+def _record_batch(items):
+    """
+    record_submissions() for a queued batch. If the batch fails as a whole, its
+    items are recorded one at a time and those that still fail are marked
+    failed, so one bad item can't hold up the queue behind it. Items already
+    recorded are skipped by their keys when a batch is replayed.
+    """
+    try:
+        return record_submissions(items)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"ERROR: Submission batch failed, recording items one by one: {e}")
+    results = {}
+    for item in items:
+        key = (item['user_id'], item['submission_key'])
+        if key in results:
+            continue
+        try:
+            results.update(record_submissions([item]))
+        except OperationalError:
+            # The database itself is unavailable; leave the batch queued for the next run
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"ERROR: Could not record submission {item['submission_key']}: {e}")
+            results[key] = {'status': 'failed', 'submission_id': item['submission_key'], 'message': 'Submission could not be graded'}
+    return results
+
+
+def ingest_queued_submissions():
+    """
+    Grade queued submissions in batches of INGEST_BATCH_SIZE, one transaction per
+    batch. A batch is only removed from the queue after it commits; if the worker
+    dies first it is read again and the idempotency keys skip what was already
+    recorded. Returns (submissions processed, user ids with new scores).
+    """
+    redis_client = get_redis()
+    lock = str(uuid.uuid4())
+    if not redis_client.set(INGEST_LOCK_KEY, lock, nx=True, ex=INGEST_LOCK_SECONDS):
+        return 0, set()
+    processed = 0
+    user_ids = set()
+    try:
+        for _ in range(INGEST_MAX_BATCHES):
+            raw_items = redis_client.lrange(QUEUE_KEY, 0, INGEST_BATCH_SIZE - 1)
+            if not raw_items:
+                break
+            results = _record_batch([json.loads(raw) for raw in raw_items])
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.ltrim(QUEUE_KEY, len(raw_items), -1)
+            for (user_id, submission_key), result in results.items():
+                _set_status(pipe, user_id, submission_key, result)
+                if result['status'] == 'graded':
+                    user_ids.add(user_id)
+            pipe.expire(INGEST_LOCK_KEY, INGEST_LOCK_SECONDS)
+            pipe.execute()
+            processed += len(raw_items)
+    finally:
+        if redis_client.get(INGEST_LOCK_KEY) == lock:
+            redis_client.delete(INGEST_LOCK_KEY)
+    return processed, user_ids
@@ -0,0 +1,152 @@
+# backend/tests/conftest.py
+#
+# Run from the backend directory:
+#
+#     python -m pytest -q
+#
+# The tests drive the real app.py app against a throwaway SQLite file, with
+# SimpleCache in place of the Redis cache and no Redis server at all.
+
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read when app.py is imported, so they must be set first. Port 1 refuses
+# connections straight away, which is what the Redis fallbacks expect.
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), 'quiz.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE_PATH}'
+os.environ['REDIS_URL'] = 'redis://127.0.0.1:1/0'
+
+from flask_jwt_extended import create_access_token
+
+import app as app_module
+from app import app as quiz_app
+from extensions import db, cache
+from model import User, Subject, Chapter, Quiz, Question, Score
+from database import _ready_tables
+from stats import rebuild_global_stats
+import leaderboards
+import redis_client
+import search
+from fake_redis import FakeRedis
+
+# Correct option of each seeded question, in question order
+CORRECT_OPTIONS = (1, 2, 3, 4)
+
+
+@pytest.fixture
+def app():
+    quiz_app.config['CACHE_TYPE'] = 'SimpleCache'
+    quiz_app.config['LEADERBOARD_BACKEND'] = 'memory'
+    quiz_app.config['TESTING'] = True
+    cache.init_app(quiz_app)
+    leaderboards.MemoryLeaderboards.boards.clear()
+    leaderboards.MemoryLeaderboards.loaded = False
+    redis_client._client = None
+    with quiz_app.app_context():
+        # A new file each time, so search indexes and ANALYZE statistics don't carry over
+        db.engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(DATABASE_PATH + suffix):
+                os.remove(DATABASE_PATH + suffix)
+        _ready_tables.clear()
+        search._installed_engines.clear()
+        db.create_all()
+        rebuild_global_stats()
+        cache.clear()
+        yield quiz_app
+        db.session.remove()
+
+
+@pytest.fixture
+def fake_redis(app, monkeypatch):
+    """A FakeRedis behind get_redis(), in place of the unreachable server."""
+    client = FakeRedis()
+    monkeypatch.setattr(redis_client, '_client', client)
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeResult:
+    def __init__(self, state, result=None, info=None):
+        self.state = state
+        self.result = result
+        self.info = info
+
+
+@pytest.fixture
+def job_result(monkeypatch):
+    """Set the Celery result the report job endpoints will see."""
+    results = {}
+    monkeypatch.setattr(app_module.celery, 'AsyncResult', lambda job_id: results['result'])
+    return lambda *args, **kwargs: results.update(result=FakeResult(*args, **kwargs))
+
+
+def auth(user, role='user'):
+    """Authorization header for `user` (anything with an id)."""
+    token = create_access_token(identity={'id': user.id, 'role': role})
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def quiz(app):
+    """A quiz of four questions whose correct options are CORRECT_OPTIONS."""
+    subject = Subject(name='Physics', description='')
+    chapter = Chapter(subject=subject, name='Motion', description='')
+    quiz = Quiz(chapter=chapter, title='Kinematics', description='', time_duration=10)
+    db.session.add_all([subject, chapter, quiz])
+    db.session.flush()
+    db.session.add_all([
+        Question(quiz_id=quiz.id, question_text=f'Q{i}', option1='a', option2='b', option3='c', option4='d', correct_option=option)
+        for i, option in enumerate(CORRECT_OPTIONS)
+    ])
+    db.session.commit()
+    return quiz
+
+
+@pytest.fixture
+def questions(quiz):
+    return Question.query.filter_by(quiz_id=quiz.id).order_by(Question.id).all()
+
+
+@pytest.fixture
+def users(app):
+    users = [
+        User(email=f'u{i}@example.com', password='x', full_name=f'User {i}', qualification='x', dob=date(2000, 1, 1))
+        for i in range(2)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def add_scores(quiz, user, *scores, at=None):
+    rows = [Score(user_id=user.id, quiz_id=quiz.id, score=score, attempt_timestamp=at or datetime.utcnow()) for score in scores]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def table_rows(model):
+    table = model.__table__
+    columns = [column for column in table.columns if column.name not in ('updated_at', 'computed_at')]
+    return sorted(tuple(row) for row in db.session.execute(select(*columns)))
+
+
+def assert_matches_rebuild(model, rebuild):
+    """The hook-maintained rows equal what `rebuild(connection)` writes from scratch."""
+    maintained = table_rows(model)
+    db.session.rollback()
+    with db.engine.begin() as connection:
+        rebuild(connection)
+    assert table_rows(model) == maintained
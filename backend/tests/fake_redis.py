@@ -0,0 +1,171 @@
+# backend/tests/fake_redis.py
+#
+# Just enough of a redis-py client (decode_responses=True) for the buffers,
+# queues and boards in this app. Expiry times are recorded but never enforced.
+
+import fnmatch
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.scripts = {}
+
+    # keys and strings
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return key in self.data
+
+    def scan_iter(self, match='*', count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    # hashes
+
+    def hset(self, key, mapping):
+        fields = self.data.setdefault(key, {})
+        added = sum(field not in fields for field in mapping)
+        fields.update({field: str(value) for field, value in mapping.items()})
+        return added
+
+    def hsetnx(self, key, field, value):
+        fields = self.data.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = str(value)
+        return 1
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    # sets
+
+    def sadd(self, key, *members):
+        items = self.data.setdefault(key, set())
+        added = len(set(members) - items)
+        items.update(members)
+        return added
+
+    def srem(self, key, *members):
+        items = self.data.get(key, set())
+        removed = len(items & set(members))
+        items.difference_update(members)
+        if not items:
+            self.data.pop(key, None)
+        return removed
+
+    def spop(self, key, count):
+        items = self.data.get(key, set())
+        popped = sorted(items)[:count]
+        items.difference_update(popped)
+        if not items:
+            self.data.pop(key, None)
+        return popped
+
+    # lists
+
+    def rpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:None if end == -1 else end + 1]
+
+    def ltrim(self, key, start, end):
+        if key in self.data:
+            self.data[key] = self.data[key][start:None if end == -1 else end + 1]
+            if not self.data[key]:
+                del self.data[key]
+        return True
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    # sorted sets
+
+    def zadd(self, key, mapping):
+        board = self.data.setdefault(key, {})
+        added = sum(str(member) not in board for member in mapping)
+        board.update({str(member): float(score) for member, score in mapping.items()})
+        return added
+
+    def zincrby(self, key, amount, member):
+        board = self.data.setdefault(key, {})
+        board[str(member)] = board.get(str(member), 0.0) + float(amount)
+        return board[str(member)]
+
+    def zscore(self, key, member):
+        return self.data.get(key, {}).get(str(member))
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def _ranked(self, key):
+        return sorted(self.data.get(key, {}).items(), key=lambda item: (-item[1], item[0]))
+
+    def zrevrange(self, key, start, end, withscores=False):
+        entries = self._ranked(key)[start:None if end == -1 else end + 1]
+        return entries if withscores else [member for member, _ in entries]
+
+    def zrevrank(self, key, member):
+        members = [m for m, _ in self._ranked(key)]
+        return members.index(str(member)) if str(member) in members else None
+
+    # scripts and pipelines
+
+    def register_script(self, source):
+        """Scripts run as the Python function registered for their source with `scripts[source] = fn`."""
+        return FakeScript(self, self.scripts[source])
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakeScript:
+    def __init__(self, redis, fn):
+        self.redis = redis
+        self.fn = fn
+
+    def __call__(self, keys=(), args=(), client=None):
+        if isinstance(client, FakePipeline):
+            client._queue(lambda: self.fn(self.redis, list(keys), [str(arg) for arg in args]))
+            return client
+        return self.fn(self.redis, list(keys), [str(arg) for arg in args])
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def _queue(self, call):
+        self.calls.append(call)
+        return self
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        return lambda *args, **kwargs: self._queue(lambda: method(*args, **kwargs))
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [call() for call in calls]
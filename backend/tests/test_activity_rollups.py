@@ -0,0 +1,58 @@
+# backend/tests/test_activity_rollups.py
+
+from datetime import datetime, timedelta
+
+from extensions import db
+from model import UserDailyActivity
+from activity_rollups import rebuild_daily_activity, refresh_daily_activity, window_activity
+from celery_worker import section_fingerprint
+from conftest import add_scores, table_rows, assert_matches_rebuild
+
+
+def test_daily_activity_recounts_days_that_lose_scores(quiz, users):
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    scores = add_scores(quiz, users[0], 2, 3, at=yesterday)
+    with db.engine.begin() as connection:
+        rebuild_daily_activity(connection)
+    assert table_rows(UserDailyActivity)[0][2:] == (2, 5)
+
+    db.session.delete(scores[0])
+    db.session.commit()
+    assert table_rows(UserDailyActivity)[0][2:] == (1, 3)
+    assert_matches_rebuild(UserDailyActivity, rebuild_daily_activity)
+
+    db.session.delete(scores[1])
+    db.session.commit()
+    assert UserDailyActivity.query.count() == 0
+
+
+def test_refresh_counts_scores_newer_than_the_watermark(quiz, users):
+    two_days_ago = datetime.utcnow() - timedelta(days=2)
+    add_scores(quiz, users[0], 1, at=two_days_ago)
+    first = refresh_daily_activity()
+    assert (first['full'], first['days']) == (False, 1)
+
+    add_scores(quiz, users[0], 2, at=two_days_ago + timedelta(minutes=1))
+    add_scores(quiz, users[1], 4)
+    assert refresh_daily_activity()['days'] == 2
+    assert_matches_rebuild(UserDailyActivity, rebuild_daily_activity)
+
+    activity = window_activity(two_days_ago.date())
+    assert activity[users[0].id] == [(two_days_ago.date(), 2, 3)]
+    assert activity[users[1].id] == [(datetime.utcnow().date(), 1, 4)]
+    assert window_activity(datetime.utcnow().date() + timedelta(days=1)) == {}
+
+
+def test_report_section_fingerprint_follows_the_rollups(quiz, users):
+    day = datetime.utcnow() - timedelta(days=1)
+    add_scores(quiz, users[0], 2, at=day)
+    refresh_daily_activity()
+    before = section_fingerprint(users[0].full_name, users[0].email, window_activity(day.date())[users[0].id])
+    assert before == section_fingerprint(users[0].full_name, users[0].email, window_activity(day.date())[users[0].id])
+
+    # Another attempt on the same day changes the section
+    add_scores(quiz, users[0], 1, at=day)
+    refresh_daily_activity()
+    after = section_fingerprint(users[0].full_name, users[0].email, window_activity(day.date())[users[0].id])
+    assert after != before
+    assert section_fingerprint('Someone else', users[0].email, window_activity(day.date())[users[0].id]) != after
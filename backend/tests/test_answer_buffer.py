@@ -0,0 +1,69 @@
+# backend/tests/test_answer_buffer.py
+
+from extensions import db
+from model import UserAnswer
+from answer_buffer import AUTOSAVE_KEY, DIRTY_SET, flush_buffered_answers, drain_buffered_answers
+from conftest import auth
+
+
+def autosave(client, user, quiz, answers):
+    payload = {'answers': [{'question_id': qid, 'selected_option': option} for qid, option in answers.items()]}
+    return client.post(f'/api/user/quizzes/{quiz.id}/autosave', json=payload, headers=auth(user))
+
+
+def submit(client, user, quiz, answers, key):
+    payload = {'quiz_id': quiz.id, 'answers': [{'question_id': qid, 'selected_option': option} for qid, option in answers.items()]}
+    return client.post('/api/quiz_attempt_submit', json=payload, headers=dict(auth(user), **{'Idempotency-Key': key}))
+
+
+def test_autosave_buffers_and_the_submit_drains(client, fake_redis, quiz, questions, users):
+    key = AUTOSAVE_KEY.format(user_id=users[0].id, quiz_id=quiz.id)
+    assert autosave(client, users[0], quiz, {questions[0].id: 1, questions[1].id: 3}).status_code == 202
+    assert autosave(client, users[0], quiz, {questions[1].id: 2}).status_code == 202
+    assert set(fake_redis.hgetall(key)) == {str(questions[0].id), str(questions[1].id)}
+    assert UserAnswer.query.count() == 0
+
+    # What the submit sends overrides the buffer
+    response = submit(client, users[0], quiz, {questions[0].id: 4}, 'key-00000001')
+    assert response.status_code == 200
+    assert response.json['correct_answers_count'] == 1
+    assert not fake_redis.exists(key) and not fake_redis.exists(DIRTY_SET)
+    assert dict(db.session.query(UserAnswer.question_id, UserAnswer.selected_option)) == {questions[0].id: 4, questions[1].id: 2}
+
+
+def test_autosave_rejects_answers_outside_the_quiz(client, fake_redis, quiz, questions, users):
+    assert autosave(client, users[0], quiz, {999: 1}).status_code == 400
+    assert autosave(client, users[0], quiz, {questions[0].id: 5}).status_code == 400
+    assert client.post(f'/api/user/quizzes/{quiz.id}/autosave', json={'answers': []}, headers=auth(users[0])).status_code == 400
+    assert fake_redis.data == {}
+
+
+def test_flush_writes_buffers_and_keeps_them_for_the_submit(client, fake_redis, quiz, questions, users):
+    autosave(client, users[0], quiz, {questions[0].id: 1})
+    autosave(client, users[1], quiz, {questions[0].id: 2, questions[1].id: 2})
+    assert flush_buffered_answers() == 3
+    assert UserAnswer.query.count() == 3
+    assert not fake_redis.exists(DIRTY_SET)
+    # Nothing is dirty now, so a second flush writes nothing
+    assert flush_buffered_answers() == 0
+    assert drain_buffered_answers(users[1].id, quiz.id) == {questions[0].id: 2, questions[1].id: 2}
+
+
+def test_without_redis_autosaves_are_written_and_graded(client, quiz, questions, users):
+    assert autosave(client, users[0], quiz, {questions[0].id: 1, questions[1].id: 2}).status_code == 202
+    assert UserAnswer.query.count() == 2
+
+    # The quiz page sends 0 for the questions it has no answer for
+    response = submit(client, users[0], quiz, {q.id: 0 for q in questions}, 'key-00000001')
+    assert response.status_code == 200
+    assert response.json['correct_answers_count'] == 2
+
+
+def test_without_redis_a_previous_attempt_is_not_regraded(client, quiz, questions, users):
+    all_correct = {q.id: q.correct_option for q in questions}
+    assert submit(client, users[0], quiz, all_correct, 'key-00000001').json['correct_answers_count'] == 4
+
+    # The second attempt only answers the first question before submitting
+    autosave(client, users[0], quiz, {questions[0].id: questions[0].correct_option})
+    response = submit(client, users[0], quiz, {q.id: 0 for q in questions}, 'key-00000002')
+    assert response.json['correct_answers_count'] == 1
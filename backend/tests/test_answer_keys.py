@@ -0,0 +1,52 @@
+# backend/tests/test_answer_keys.py
+
+from sqlalchemy import text
+
+from extensions import db
+from model import Quiz, Question, QuizSnapshot
+from answer_keys import AnswerKey, pack_answer_key, get_answer_key, answer_key_token
+from upgrade import upgrade_database
+from conftest import auth
+
+
+def test_packed_key_round_trips_and_grades():
+    packed = pack_answer_key([(70000, 2), (3, 4), (12, 1)])
+    key = AnswerKey(answer_key_token(1, packed), packed)
+    assert key.correct == {3: 4, 12: 1, 70000: 2}
+    assert len(key) == 3 and 12 in key and 13 not in key
+    assert key.grade({3: 4, 12: 2, 70000: 2, 99: 1}) == 2
+
+
+def test_keys_of_every_edited_quiz_are_reloaded(quiz, questions):
+    other = Quiz(chapter_id=quiz.chapter_id, title='Other', description='', time_duration=5)
+    db.session.add(other)
+    db.session.commit()
+    moved = Question(quiz_id=other.id, question_text='Moved', option1='a', option2='b', option3='', option4='', correct_option=2)
+    db.session.add(moved)
+    db.session.commit()
+    # Only `other` has a cached pointer; the missing one of `quiz` must not stop its invalidation
+    assert moved.id in get_answer_key(other.id)
+
+    # Moving a question changes both quizzes in one commit
+    moved.quiz_id = quiz.id
+    db.session.commit()
+    assert moved.id not in get_answer_key(other.id)
+    assert get_answer_key(quiz.id).correct[moved.id] == 2
+
+
+def test_question_payload_leaves_out_correct_option(client, quiz, questions, users):
+    response = client.get(f'/api/user/quizzes/{quiz.id}/questions', headers=auth(users[0]))
+    assert response.status_code == 200
+    assert [q['id'] for q in response.json] == [q.id for q in questions]
+    assert all('correct_option' not in q for q in response.json)
+
+
+def test_upgrade_adds_and_fills_the_answer_key_column(quiz, questions):
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(text('ALTER TABLE quiz_snapshots DROP COLUMN answer_key'))
+    summary = upgrade_database()
+    assert summary['columns'] == ['quiz_snapshots.answer_key']
+    db.session.expire_all()
+    assert get_answer_key(quiz.id).correct == {q.id: q.correct_option for q in questions}
+    assert upgrade_database()['columns'] == []
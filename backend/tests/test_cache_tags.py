@@ -0,0 +1,58 @@
+# backend/tests/test_cache_tags.py
+
+from extensions import db
+from cache_tags import cached_with_tags, invalidate_tags
+from conftest import auth, add_scores
+
+
+def test_invalidating_a_tag_drops_only_entries_built_on_it(app):
+    calls = []
+
+    def view(name):
+        calls.append(name)
+        return name
+
+    first = cached_with_tags(['a'])(lambda: view('first'))
+    second = cached_with_tags(['b'])(lambda: view('second'))
+    with app.test_request_context('/one'):
+        first()
+        first()
+    with app.test_request_context('/two'):
+        second()
+    assert calls == ['first', 'second']
+
+    # A tag nothing has read yet must not stop the ones after it
+    invalidate_tags('never-read', 'a')
+    with app.test_request_context('/one'):
+        first()
+    with app.test_request_context('/two'):
+        second()
+    assert calls == ['first', 'second', 'first']
+
+
+def score_history(client, user):
+    response = client.get('/api/scores', headers=auth(user))
+    assert response.status_code == 200
+    return response.json['items']
+
+
+def test_score_history_follows_catalog_renames(client, quiz, users):
+    add_scores(quiz, users[0], 2)
+    admin = auth(users[1], role='admin')
+    assert score_history(client, users[0])[0]['chapter_name'] == 'Motion'
+
+    response = client.put(f'/api/chapters/{quiz.chapter_id}', json={'name': 'Dynamics'}, headers=admin)
+    assert response.status_code == 200
+    assert score_history(client, users[0])[0]['chapter_name'] == 'Dynamics'
+
+    response = client.put(f'/api/subjects/{quiz.chapter.subject_id}', json={'name': 'Mechanics'}, headers=admin)
+    assert response.status_code == 200
+    assert score_history(client, users[0])[0]['subject_name'] == 'Mechanics'
+
+
+def test_a_new_score_shows_up_in_the_cached_history(client, quiz, users):
+    headers = auth(users[0])
+    assert score_history(client, users[0]) == []
+    response = client.post('/api/scores', json={'quiz_id': quiz.id, 'score': 3}, headers=headers)
+    assert response.status_code == 201
+    assert [entry['score'] for entry in score_history(client, users[0])] == [3]
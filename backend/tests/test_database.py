@@ -0,0 +1,33 @@
+# backend/tests/test_database.py
+
+from sqlalchemy import text
+
+from extensions import db
+from database import database_url, engine_options, run_maintenance, SQLITE_BUSY_TIMEOUT_MS, DB_POOL_SIZE
+
+
+def test_sqlite_connections_get_the_pragmas(app):
+    with db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == SQLITE_BUSY_TIMEOUT_MS
+        # 1 is NORMAL
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+
+
+def test_database_url_accepts_heroku_style_postgres(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://quiz:secret@db/quiz')
+    assert database_url() == 'postgresql://quiz:secret@db/quiz'
+
+
+def test_engine_options_per_backend():
+    assert engine_options('sqlite://') == {}
+    assert engine_options('sqlite:///:memory:') == {}
+    assert engine_options('sqlite:///quiz.db')['pool_size'] == DB_POOL_SIZE
+    assert 'pool_pre_ping' not in engine_options('sqlite:///quiz.db')
+    assert engine_options('postgresql://db/quiz')['pool_pre_ping'] is True
+
+
+def test_maintenance_analyzes_and_vacuums_on_request(app):
+    summary = run_maintenance(db.engine)
+    assert summary['dialect'] == 'sqlite' and 'free_page_ratio' in summary
+    assert run_maintenance(db.engine, vacuum=True)['vacuumed'] is True
@@ -0,0 +1,28 @@
+# backend/tests/test_indexes.py
+
+from sqlalchemy import inspect, select
+
+from extensions import db
+from model import Score, UserAnswer
+from indexes import upgrade_indexes, check_query_plans, explain
+
+
+def test_hot_queries_use_indexes_on_the_model_schema(app):
+    assert check_query_plans() == []
+
+
+def test_upgrade_restores_an_index_the_live_database_lacks(app):
+    index = next(ix for ix in UserAnswer.__table__.indexes if ix.name == 'ix_user_answers_question_id')
+    index.drop(db.engine)
+    assert [label for label, _ in check_query_plans(live=True)] == ['answers by question (delete cascade)']
+
+    assert upgrade_indexes() == [index.name]
+    assert index.name in {ix['name'] for ix in inspect(db.engine).get_indexes('user_answers')}
+    assert check_query_plans(live=True) == []
+    assert upgrade_indexes() == []
+
+
+def test_explain_reports_scans(app):
+    with db.engine.connect() as connection:
+        plan = explain(connection, select(Score.id).where(Score.score == 3))
+    assert any(line.startswith('SCAN scores') for line in plan)
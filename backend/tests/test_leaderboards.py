@@ -0,0 +1,96 @@
+# backend/tests/test_leaderboards.py
+
+import pytest
+
+import leaderboards
+from extensions import db
+from model import Score
+from leaderboards import BOARD_KEY, LOADED_KEY, PENDING_KEY, RECORD_BEST_SCRIPT, get_leaderboards
+from conftest import auth, add_scores
+
+
+def record_best(redis, keys, args):
+    """RECORD_BEST_SCRIPT in Python, for FakeRedis."""
+    new, member = float(args[0]), args[1]
+    old = redis.zscore(keys[0], member)
+    if old is not None and old >= new:
+        return 0
+    redis.zadd(keys[0], {member: new})
+    redis.zincrby(keys[1], new - (old or 0), member)
+    return 1
+
+
+@pytest.fixture
+def redis_boards(app, fake_redis):
+    app.config['LEADERBOARD_BACKEND'] = 'redis'
+    fake_redis.scripts[RECORD_BEST_SCRIPT] = record_best
+    return fake_redis
+
+
+def board(client, user, kind, board_id):
+    response = client.get(f'/api/{kind}/{board_id}/leaderboard', headers=auth(user))
+    assert response.status_code == 200
+    return response.json
+
+
+def test_memory_boards_keep_best_scores_and_subject_totals(client, quiz, users):
+    add_scores(quiz, users[0], 1, 3)
+    add_scores(quiz, users[1], 2)
+
+    quiz_board = board(client, users[1], 'quizzes', quiz.id)
+    assert [(entry['user_id'], entry['score']) for entry in quiz_board['entries']] == [(users[0].id, 3), (users[1].id, 2)]
+    assert quiz_board['total_entries'] == 2
+    assert quiz_board['me'] == {'rank': 2, 'score': 2}
+
+    # Scores after the boards are loaded arrive through the commit hook
+    add_scores(quiz, users[1], 4)
+    subject_board = board(client, users[0], 'subjects', quiz.chapter.subject_id)
+    assert [(entry['user_id'], entry['score']) for entry in subject_board['entries']] == [(users[1].id, 4), (users[0].id, 3)]
+
+
+def test_deleting_a_best_score_lowers_the_entry(client, quiz, users):
+    low, high = add_scores(quiz, users[0], 1, 3)
+    assert board(client, users[0], 'quizzes', quiz.id)['me'] == {'rank': 1, 'score': 3}
+
+    db.session.delete(high)
+    db.session.commit()
+    assert board(client, users[0], 'quizzes', quiz.id)['me'] == {'rank': 1, 'score': 1}
+    assert board(client, users[0], 'subjects', quiz.chapter.subject_id)['me'] == {'rank': 1, 'score': 1}
+
+
+def test_redis_boards_seed_from_the_scores_table(client, redis_boards, quiz, users):
+    add_scores(quiz, users[0], 2)
+    # A cold Redis, as after a flush or a restart without persistence
+    redis_boards.data.clear()
+
+    assert board(client, users[0], 'quizzes', quiz.id)['me'] == {'rank': 1, 'score': 2}
+    assert redis_boards.exists(LOADED_KEY)
+
+    add_scores(quiz, users[1], 3)
+    add_scores(quiz, users[0], 1)
+    assert redis_boards.zrevrange(BOARD_KEY.format(kind='quiz', board_id=quiz.id), 0, -1, withscores=True) == [
+        (str(users[1].id), 3.0), (str(users[0].id), 2.0)
+    ]
+
+
+def test_changes_committed_during_a_seed_are_not_lost(redis_boards, quiz, users, monkeypatch):
+    dropped, = add_scores(quiz, users[0], 2)
+    redis_boards.data.clear()
+    load_boards = leaderboards.load_boards
+    calls = []
+
+    def load_then_commit(connection, *args):
+        boards = load_boards(connection, *args)
+        calls.append(args)
+        if len(calls) == 1:
+            # The seed has read the scores but not yet written the boards
+            add_scores(quiz, users[1], 3)
+            db.session.delete(dropped)
+            db.session.commit()
+        return boards
+    monkeypatch.setattr(leaderboards, 'load_boards', load_then_commit)
+
+    assert get_leaderboards().top('quiz', quiz.id, 10) == [(users[1].id, 3.0)]
+    assert get_leaderboards().top('subject', quiz.chapter.subject_id, 10) == [(users[1].id, 3.0)]
+    assert not redis_boards.exists(PENDING_KEY)
+    assert Score.query.count() == 1
@@ -0,0 +1,73 @@
+# backend/tests/test_pagination.py
+
+from datetime import date
+
+import pytest
+
+from extensions import db
+from model import User
+from conftest import auth
+
+
+@pytest.fixture
+def admin(app):
+    # Names repeat so the name sort has to fall back to the id tie-breaker
+    users = [
+        User(email=f'user{i:02}@example.com', password='x', full_name=f'Name {i % 3}', qualification='x', dob=date(2000, 1, 1))
+        for i in range(10)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return auth(users[0], role='admin')
+
+
+def walk(client, headers, **params):
+    """Every page of /api/admin/users, following next_cursor; returns the ids in order."""
+    ids, pages, after = [], 0, ''
+    while True:
+        query = dict(params, after=after) if after else params
+        response = client.get('/api/admin/users', query_string=query, headers=headers)
+        assert response.status_code == 200
+        ids += [user['id'] for user in response.json['items']]
+        pages += 1
+        after = response.json['next_cursor']
+        if after is None:
+            return ids, pages
+
+
+def test_id_cursor_walks_every_row_once(client, admin):
+    ids, pages = walk(client, admin, limit=3)
+    assert ids == sorted(ids) and len(ids) == 10
+    assert pages == 4
+
+    ids, _ = walk(client, admin, limit=4, sort='-id')
+    assert ids == sorted(ids, reverse=True) and len(ids) == 10
+
+
+def test_value_cursor_breaks_ties_by_id(client, admin):
+    expected = [u.id for u in User.query.order_by(User.full_name, User.id)]
+    assert walk(client, admin, limit=3, sort='full_name')[0] == expected
+
+    expected = [u.id for u in User.query.order_by(User.full_name.desc(), User.id.desc())]
+    assert walk(client, admin, limit=2, sort='-full_name')[0] == expected
+
+
+def test_filter_narrows_before_paging(client, admin):
+    ids, _ = walk(client, admin, limit=2, query='Name 1')
+    assert ids == [u.id for u in User.query.filter_by(full_name='Name 1').order_by(User.id)]
+
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0},
+    {'sort': 'password'},
+    {'after': 'abc'},
+    {'sort': 'email', 'after': 'not-a-cursor'},
+])
+def test_bad_paging_parameters_are_rejected(client, admin, params):
+    response = client.get('/api/admin/users', query_string=params, headers=admin)
+    assert response.status_code == 400
+
+
+def test_limit_is_capped(client, admin):
+    response = client.get('/api/admin/users', query_string={'limit': 10000}, headers=admin)
+    assert response.json['limit'] == 200
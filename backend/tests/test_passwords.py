@@ -0,0 +1,72 @@
+# backend/tests/test_passwords.py
+
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import app as app_module
+from extensions import db
+from passwords import HashingPool, HashingOverloaded, needs_rehash, hash_password, PASSWORD_HASH_METHOD
+
+
+def test_pool_sheds_work_beyond_its_pending_limit():
+    pool = HashingPool(workers=1, max_pending=1, timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(pool.run(slow)))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(HashingOverloaded):
+        pool.run(lambda: 'refused')
+
+    release.set()
+    worker.join(5)
+    assert results == ['slow']
+    # The finished hash gave its slot back
+    assert pool.run(lambda: 'accepted') == 'accepted'
+
+
+def test_pool_times_out_without_leaking_the_slot():
+    pool = HashingPool(workers=1, max_pending=1, timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(HashingOverloaded):
+        pool.run(release.wait, 5)
+    release.set()
+    pool._get_executor().submit(lambda: None).result(5)
+    assert pool.run(lambda: 'accepted') == 'accepted'
+
+
+def test_needs_rehash_compares_the_method_prefix():
+    assert not needs_rehash(hash_password('secret'))
+    assert needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000'))
+
+
+def test_login_rehashes_an_outdated_hash(client, users):
+    users[0].password = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+    db.session.commit()
+
+    response = client.post('/login', json={'email': users[0].email, 'password': 'secret'})
+    assert response.status_code == 200 and response.json['role'] == 'user'
+    db.session.refresh(users[0])
+    assert users[0].password.startswith(PASSWORD_HASH_METHOD + '$')
+
+    response = client.post('/login', json={'email': users[0].email, 'password': 'wrong'})
+    assert response.status_code == 401
+
+
+def test_login_answers_503_when_hashing_is_saturated(client, users, monkeypatch):
+    def overloaded(*args):
+        raise HashingOverloaded()
+
+    monkeypatch.setattr(app_module, 'verify_password', overloaded)
+    response = client.post('/login', json={'email': users[0].email, 'password': 'secret'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
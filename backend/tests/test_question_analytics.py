@@ -0,0 +1,78 @@
+# backend/tests/test_question_analytics.py
+
+from datetime import datetime
+
+import numpy as np
+
+from extensions import db
+from model import UserAnswer, JobWatermark, QuestionAnalytics
+from question_analytics import WATERMARK_OVERLAP, compute_question_stats, refresh_question_analytics
+from conftest import auth
+
+
+def columns(answers):
+    """compute_question_stats() arguments from (quiz, user, question, selected, correct) tuples."""
+    return [np.array(column, dtype=np.int64) for column in zip(*answers)]
+
+
+def test_counts_difficulty_and_discrimination():
+    answers = [
+        # Question 10 (correct option 1): user 3 is wrong, user 4 skipped it
+        (1, 1, 10, 1, 1), (1, 2, 10, 1, 1), (1, 3, 10, 2, 1), (1, 4, 10, 0, 1),
+        # Question 11 (correct option 2): everyone is right
+        (1, 1, 11, 2, 2), (1, 2, 11, 2, 2), (1, 3, 11, 2, 2), (1, 4, 11, 2, 2),
+    ]
+    stats = {row['question_id']: row for row in compute_question_stats(*columns(answers))}
+
+    first = stats[10]
+    assert (first['quiz_id'], first['answer_count'], first['correct_count']) == (1, 4, 2)
+    assert (first['skipped_count'], first['option1_count'], first['option2_count']) == (1, 2, 1)
+    assert first['difficulty'] == 0.5
+    # Top group (user 2) got it right, bottom group (user 3) didn't
+    assert first['discrimination'] == 1.0
+
+    second = stats[11]
+    assert (second['difficulty'], second['discrimination']) == (1.0, 0.0)
+
+
+def test_lone_respondent_has_no_discrimination():
+    stats = compute_question_stats(*columns([(1, 1, 10, 1, 1), (2, 1, 20, 3, 1), (2, 2, 20, 1, 1)]))
+    by_question = {row['question_id']: row for row in stats}
+    assert by_question[10]['discrimination'] is None
+    assert by_question[10]['difficulty'] == 1.0
+    # Quizzes are grouped separately: quiz 2 has two respondents
+    assert by_question[20]['quiz_id'] == 2
+    assert by_question[20]['discrimination'] == 1.0
+
+
+def answer(quiz, user, picks, at=None):
+    db.session.add_all([
+        UserAnswer(user_id=user.id, quiz_id=quiz.id, question_id=question.id, selected_option=option, attempt_timestamp=at or datetime.utcnow())
+        for question, option in picks
+    ])
+    db.session.commit()
+
+
+def test_refresh_stores_analytics_and_moves_the_watermark(client, quiz, questions, users):
+    answer(quiz, users[0], [(questions[0], 1), (questions[1], 3)])
+    answer(quiz, users[1], [(questions[0], 2)])
+    summary = refresh_question_analytics()
+    assert (summary['quizzes'], summary['questions']) == (1, 2)
+
+    response = client.get(f'/api/admin/quizzes/{quiz.id}/analytics', headers=auth(users[0], role='admin'))
+    assert response.status_code == 200
+    first, second, unanswered = response.json['questions'][:3]
+    assert (first['answer_count'], first['difficulty']) == (2, 0.5)
+    assert [option['count'] for option in first['options']] == [1, 1, 0, 0]
+    assert (second['answer_count'], second['difficulty']) == (1, 0.0)
+    assert (unanswered['answer_count'], unanswered['difficulty']) == (0, None)
+
+    # The overlap rereads recent answers; once they are older than the watermark
+    # less the overlap, only a full run picks up late-arriving ones
+    assert refresh_question_analytics()['quizzes'] == 1
+    answer(quiz, users[1], [(questions[1], 2)], at=datetime.utcnow() - 2 * WATERMARK_OVERLAP)
+    db.session.query(JobWatermark).update({'watermark': datetime.utcnow() + WATERMARK_OVERLAP})
+    db.session.commit()
+    assert refresh_question_analytics()['quizzes'] == 0
+    assert refresh_question_analytics(full=True)['questions'] == 2
+    assert QuestionAnalytics.query.filter_by(question_id=questions[1].id).one().difficulty == 0.5
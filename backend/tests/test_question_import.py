@@ -0,0 +1,106 @@
+# backend/tests/test_question_import.py
+
+import json
+
+import pytest
+
+import bulk_import
+from extensions import db, cache
+from model import Quiz, Question, QuizSnapshot, GlobalStats
+from stats import GLOBAL_STATS_ID
+from answer_keys import get_answer_key
+from cache_tags import TAG_KEY_PREFIX, _tag_versions
+from bulk_import import import_questions, export_questions, ImportAborted
+from conftest import auth
+
+QUESTIONS_CSV = """question_text,option1,option2,option3,option4,correct_option
+Unit of force?,newton,joule,,,1
+Missing options,a,,,,1
+Unit of energy?,newton,joule,watt,,2
+Bad option,a,b,c,d,5
+"""
+
+
+def test_import_validates_rows_and_refreshes_the_quiz(quiz):
+    summary = import_questions(QUESTIONS_CSV, 'csv', quiz_id=quiz.id)
+    assert (summary['created'], summary['quiz_ids']) == (2, [quiz.id])
+    assert [error['row'] for error in summary['errors']] == [3, 5]
+
+    imported = Question.query.filter_by(question_text='Unit of energy?').one()
+    assert (imported.option3, imported.option4, imported.correct_option) == ('watt', '', 2)
+    # Core inserts bypass the flush hooks, so these are refreshed by the import itself
+    assert db.session.get(QuizSnapshot, quiz.id).question_count == 6
+    assert get_answer_key(quiz.id).correct[imported.id] == 2
+    assert db.session.get(GlobalStats, GLOBAL_STATS_ID).total_questions == 6
+
+
+def test_ndjson_rows_must_carry_string_text(quiz):
+    lines = [
+        json.dumps({'question_text': ['not', 'text'], 'option1': 'a', 'option2': 'b', 'correct_option': 1}),
+        json.dumps({'question_text': 'Fine', 'option1': 'a', 'option2': 'b', 'correct_option': '2'}),
+    ]
+    summary = import_questions('\n'.join(lines), 'ndjson', quiz_id=quiz.id)
+    assert summary['errors'] == [{'row': 1, 'message': 'question_text must be a string'}]
+    assert Question.query.filter_by(question_text='Fine').one().correct_option == 2
+
+
+def test_chapter_import_routes_rows_to_their_quiz(quiz):
+    other = Quiz(chapter_id=quiz.chapter_id, title='Other', description='', time_duration=5)
+    db.session.add(other)
+    db.session.commit()
+    rows = [
+        {'quiz_id': other.id, 'question_text': 'To other', 'option1': 'a', 'option2': 'b', 'correct_option': 1},
+        {'question_text': 'No quiz', 'option1': 'a', 'option2': 'b', 'correct_option': 1},
+        {'quiz_id': 999, 'question_text': 'Elsewhere', 'option1': 'a', 'option2': 'b', 'correct_option': 1},
+    ]
+    summary = import_questions('\n'.join(map(json.dumps, rows)), 'ndjson', chapter_id=quiz.chapter_id)
+    assert (summary['created'], summary['quiz_ids']) == (1, [other.id])
+    assert [error['message'] for error in summary['errors']] == [
+        'quiz_id is required when importing into a chapter',
+        'Quiz 999 is not in this chapter',
+    ]
+
+
+def failing_after(lines, count):
+    """The first `count` lines, then a read error, like a dropped upload."""
+    for number, line in enumerate(lines):
+        if number == count:
+            raise OSError('connection reset')
+        yield line
+
+
+def test_an_aborted_import_reports_and_invalidates_committed_batches(quiz, monkeypatch):
+    monkeypatch.setattr(bulk_import, 'IMPORT_BATCH_SIZE', 2)
+    tag_key = TAG_KEY_PREFIX + f'quiz:{quiz.id}:questions'
+    before = _tag_versions([f'quiz:{quiz.id}:questions'])[0]
+    lines = ['question_text,option1,option2,correct_option\n'] + [f'Q{i},a,b,1\n' for i in range(5)]
+
+    with pytest.raises(ImportAborted) as aborted:
+        import_questions(failing_after(lines, 4), 'csv', quiz_id=quiz.id)
+    assert isinstance(aborted.value.cause, OSError)
+    # One batch of two committed before the third row's read failed
+    assert (aborted.value.summary['created'], aborted.value.summary['quiz_ids']) == (2, [quiz.id])
+    assert Question.query.filter_by(quiz_id=quiz.id).count() == 6
+    assert cache.get(tag_key) != before
+
+
+def test_export_round_trips_through_import(quiz, questions):
+    target = Quiz(chapter_id=quiz.chapter_id, title='Copy', description='', time_duration=5)
+    db.session.add(target)
+    db.session.commit()
+    for fmt in ('csv', 'ndjson'):
+        exported = ''.join(export_questions([quiz.id], fmt))
+        assert import_questions(exported, fmt, quiz_id=target.id)['created'] == 4
+    copied = Question.query.filter_by(quiz_id=target.id).order_by(Question.id).all()
+    assert [(q.question_text, q.correct_option) for q in copied] == [(q.question_text, q.correct_option) for q in questions] * 2
+
+
+def test_import_endpoint_reports_a_partial_import(client, quiz, users, monkeypatch):
+    def aborted(lines, fmt, quiz_id=None, chapter_id=None):
+        raise ImportAborted({'created': 2, 'failed': 0, 'errors': [], 'quiz_ids': [quiz_id]}, OSError('reset'))
+
+    import app as app_module
+    monkeypatch.setattr(app_module, 'import_questions', aborted)
+    response = client.post(f'/api/quizzes/{quiz.id}/questions/import?format=csv', data='x', headers=auth(users[0], role='admin'))
+    assert response.status_code == 500
+    assert (response.json['created'], response.json['message']) == (2, 'Question import failed partway')
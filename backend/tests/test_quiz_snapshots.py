@@ -0,0 +1,72 @@
+# backend/tests/test_quiz_snapshots.py
+
+import gzip
+import json
+
+from extensions import db
+from database import _ready_tables
+from model import Question, QuizSnapshot
+from quiz_snapshots import compile_all_quiz_snapshots
+from answer_keys import get_answer_key
+from conftest import auth
+
+
+def test_snapshot_is_recompiled_with_its_questions(quiz, questions):
+    snapshot = db.session.get(QuizSnapshot, quiz.id)
+    assert (snapshot.question_count, snapshot.version) == (4, 1)
+    assert get_answer_key(quiz.id).correct == {q.id: q.correct_option for q in questions}
+
+    db.session.delete(questions[0])
+    db.session.commit()
+    db.session.refresh(snapshot)
+    assert (snapshot.question_count, snapshot.version) == (3, 2)
+    assert questions[0].id not in get_answer_key(quiz.id)
+
+
+def test_served_snapshot_revalidates_per_encoding(client, quiz, questions, users):
+    url = f'/api/user/quizzes/{quiz.id}/questions'
+    headers = auth(users[0])
+    plain = client.get(url, headers=headers)
+    assert plain.status_code == 200
+    assert [q['question_text'] for q in plain.json] == [q.question_text for q in questions]
+
+    zipped = client.get(url, headers=dict(headers, **{'Accept-Encoding': 'gzip'}))
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.data)) == plain.json
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+    unchanged = client.get(url, headers=dict(headers, **{'If-None-Match': plain.headers['ETag']}))
+    assert unchanged.status_code == 304
+
+    questions[0].question_text = 'Edited'
+    db.session.commit()
+    changed = client.get(url, headers=dict(headers, **{'If-None-Match': plain.headers['ETag']}))
+    assert changed.status_code == 200 and changed.json[0]['question_text'] == 'Edited'
+
+
+def test_a_quiz_without_a_snapshot_is_compiled_on_first_read(client, quiz, users):
+    db.session.execute(QuizSnapshot.__table__.delete())
+    db.session.commit()
+    assert len(client.get(f'/api/user/quizzes/{quiz.id}/questions', headers=auth(users[0])).json) == 4
+    assert db.session.get(QuizSnapshot, quiz.id).question_count == 4
+    assert client.get('/api/user/quizzes/999/questions', headers=auth(users[0])).status_code == 404
+
+
+def test_compile_all_drops_snapshots_of_removed_quizzes(quiz):
+    db.session.execute(QuizSnapshot.__table__.insert().values(
+        quiz_id=999, version=1, etag='x', question_count=0, body=b'[]', body_gzip=b'', answer_key=b''
+    ))
+    db.session.commit()
+    with db.engine.begin() as connection:
+        assert compile_all_quiz_snapshots(connection) == {quiz.id}
+    assert [row.quiz_id for row in QuizSnapshot.query] == [quiz.id]
+
+
+def test_questions_are_served_before_the_snapshot_table_exists(client, quiz, users):
+    QuizSnapshot.__table__.drop(db.engine)
+    _ready_tables.clear()
+    db.session.add(Question(quiz_id=quiz.id, question_text='New', option1='a', option2='b', option3='c', option4='d', correct_option=1))
+    db.session.commit()
+    # Built in memory until `flask upgrade-db` creates the table
+    assert len(client.get(f'/api/user/quizzes/{quiz.id}/questions', headers=auth(users[0])).json) == 5
+    assert len(get_answer_key(quiz.id)) == 5
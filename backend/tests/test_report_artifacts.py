@@ -0,0 +1,85 @@
+# backend/tests/test_report_artifacts.py
+
+import os
+import gzip
+import time
+
+import pytest
+
+from report_artifacts import ARTIFACT_STORES, LocalArtifactStore
+from conftest import auth
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A local store under a temporary directory, also used by the download endpoint."""
+    store = LocalArtifactStore(str(tmp_path / 'reports'))
+    monkeypatch.setitem(ARTIFACT_STORES, 'local', lambda: store)
+    return store
+
+
+def scratch(tmp_path, content, name='report.part'):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def stored_files(store):
+    return sorted(filename for _, _, filenames in os.walk(store.root) for filename in filenames)
+
+
+def test_identical_reports_share_one_file(tmp_path, store):
+    first = store.put_file(scratch(tmp_path, b'<html>same</html>'))
+    second = store.put_file(scratch(tmp_path, b'<html>same</html>', 'again.part'))
+    assert first == second
+    assert first['encoding'] == 'gzip' and first['size'] == 17
+    assert stored_files(store) == [first['key']]
+    assert not os.path.exists(tmp_path / 'report.part') and not os.path.exists(tmp_path / 'again.part')
+
+    other = store.put_file(scratch(tmp_path, b'<html>other</html>'), compress=False)
+    assert other['key'] == other['sha256'] != first['sha256']
+    assert len(stored_files(store)) == 2
+
+
+def test_invalid_keys_are_refused(store):
+    with pytest.raises(ValueError):
+        store.exists({'key': '../../etc/passwd'})
+
+
+def test_prune_removes_old_artifacts(tmp_path, store):
+    old = store.put_file(scratch(tmp_path, b'old'))
+    new = store.put_file(scratch(tmp_path, b'new'))
+    past = time.time() - 3600
+    os.utime(store._path(old), (past, past))
+    assert store.prune(max_age=60) == 1
+    assert not store.exists(old) and store.exists(new)
+
+
+def test_download_serves_gzip_with_an_etag(client, users, job_result, tmp_path, store):
+    reference = store.put_file(scratch(tmp_path, b'id,name\n1,a\n'))
+    job_result('SUCCESS', result={'status': 'success', 'artifact': reference, 'filename': 'users.csv', 'mimetype': 'text/csv'})
+    headers = auth(users[0], role='admin')
+
+    response = client.get('/api/admin/reports/jobs/abc/download', headers=dict(headers, **{'Accept-Encoding': 'gzip'}))
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == f'"{reference["sha256"]}-gzip"'
+    assert gzip.decompress(response.data) == b'id,name\n1,a\n'
+
+    plain = client.get('/api/admin/reports/jobs/abc/download', headers=dict(headers, **{'Accept-Encoding': 'identity'}))
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] == f'"{reference["sha256"]}"'
+    assert plain.data == b'id,name\n1,a\n'
+
+    cached = client.get('/api/admin/reports/jobs/abc/download', headers=dict(headers, **{'If-None-Match': plain.headers['ETag']}))
+    assert cached.status_code == 304
+
+
+def test_download_of_a_pruned_or_forged_artifact_is_gone(client, users, job_result, tmp_path, store):
+    reference = store.put_file(scratch(tmp_path, b'report'))
+    os.remove(store._path(reference))
+    job_result('SUCCESS', result={'status': 'success', 'artifact': reference})
+    assert client.get('/api/admin/reports/jobs/abc/download', headers=auth(users[0], role='admin')).status_code == 410
+
+    job_result('SUCCESS', result={'status': 'success', 'artifact': dict(reference, key='../secret')})
+    assert client.get('/api/admin/reports/jobs/abc/download', headers=auth(users[0], role='admin')).status_code == 410
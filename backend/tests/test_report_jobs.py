@@ -0,0 +1,31 @@
+# backend/tests/test_report_jobs.py
+
+import pytest
+
+from conftest import auth
+
+
+@pytest.mark.parametrize('payload, status', [
+    ({'status': 'success', 'filename': 'users.csv'}, 'finished'),
+    ({'status': 'error', 'message': 'disk full'}, 'failed'),
+    ('not a dict', 'failed'),
+    (None, 'failed'),
+])
+def test_job_status_reports_finished_payloads(client, users, job_result, payload, status):
+    job_result('SUCCESS', result=payload)
+    response = client.get('/api/admin/reports/jobs/abc', headers=auth(users[0], role='admin'))
+    assert response.status_code == 200
+    assert response.json['status'] == status
+    assert ('download_url' in response.json) == (status == 'finished')
+
+
+def test_job_status_reports_progress(client, users, job_result):
+    job_result('PROGRESS', info={'current': 3, 'total': 10})
+    response = client.get('/api/admin/reports/jobs/abc', headers=auth(users[0], role='admin'))
+    assert response.json == {'job_id': 'abc', 'status': 'running', 'progress': {'current': 3, 'total': 10}}
+
+
+def test_download_waits_for_the_job(client, users, job_result):
+    job_result('STARTED')
+    response = client.get('/api/admin/reports/jobs/abc/download', headers=auth(users[0], role='admin'))
+    assert response.status_code == 409
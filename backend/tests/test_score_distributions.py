@@ -0,0 +1,50 @@
+# backend/tests/test_score_distributions.py
+
+from extensions import db
+from model import Score, ScoreDistribution
+from score_distributions import ScoreSketch, rebuild_score_distributions, quiz_score_sketch
+from conftest import add_scores, assert_matches_rebuild
+
+
+def test_score_sketch_round_trips_and_summarises():
+    sketch = ScoreSketch({1: 2, 3: 1, 4: 1, 5: 0})
+    assert ScoreSketch.from_blob(sketch.to_blob()).counts == sketch.counts
+    assert ScoreSketch.from_blob(b'').total == 0
+    assert sketch.total == 4
+    assert sketch.percentile_rank(3) == 62.5
+    assert sketch.quantile(0.5) == 1
+    assert sketch.quantile(0.75) == 3
+    assert sketch.summary()['mean'] == 2.25
+
+    sketch.update({1: -5, 4: 2})
+    assert sketch.counts == {3: 1, 4: 3}
+    assert ScoreSketch().percentile_rank(1) is None
+    assert sketch.merge(ScoreSketch({3: 1})).counts == {3: 2, 4: 3}
+
+
+def test_score_distributions_follow_inserts_and_deletes(quiz, users):
+    first = add_scores(quiz, users[0], 2, 2, 3)
+    assert quiz_score_sketch(quiz.id).counts == {2: 2, 3: 1}
+    assert_matches_rebuild(ScoreDistribution, rebuild_score_distributions)
+
+    db.session.delete(first[0])
+    db.session.commit()
+    assert quiz_score_sketch(quiz.id).counts == {2: 1, 3: 1}
+
+    # The row goes with the quiz's last score
+    for score in Score.query.all():
+        db.session.delete(score)
+    db.session.commit()
+    assert ScoreDistribution.query.count() == 0
+
+
+def test_scores_outside_int32_are_left_out_instead_of_failing_the_flush(quiz, users):
+    add_scores(quiz, users[0], 2, 2 ** 31, 2.5)
+    assert Score.query.count() == 3
+    assert quiz_score_sketch(quiz.id).counts == {2: 1}
+    assert_matches_rebuild(ScoreDistribution, rebuild_score_distributions)
+
+    for score in Score.query.all():
+        db.session.delete(score)
+    db.session.commit()
+    assert ScoreDistribution.query.count() == 0
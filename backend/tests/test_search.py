@@ -0,0 +1,78 @@
+# backend/tests/test_search.py
+
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+from model import Question
+from search import search, get_search_backend, rebuild_search_index, filter_by_search, LikeSearchBackend, Fts5SearchBackend
+from conftest import auth
+
+
+def fts5_tables():
+    return {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE name LIKE '%_fts'"))}
+
+
+def hit_ids(hits, kind):
+    return sorted(hit['id'] for hit in hits if hit['kind'] == kind)
+
+
+def test_requests_fall_back_to_like_until_the_index_is_installed(quiz, questions):
+    assert isinstance(get_search_backend(), LikeSearchBackend)
+    hits = search('kinem')
+    assert [(hit['kind'], hit['id']) for hit in hits] == [('quiz', quiz.id)]
+    # Searching must not have built the index
+    assert fts5_tables() == set()
+
+    rebuild_search_index()
+    assert isinstance(get_search_backend(), Fts5SearchBackend)
+    assert [(hit['kind'], hit['id']) for hit in search('kinem')] == [('quiz', quiz.id)]
+
+
+def test_like_and_fts5_find_the_same_rows(quiz, questions):
+    questions[0].question_text = 'Velocity of a falling body'
+    questions[1].question_text = 'Falling bodies and air resistance'
+    db.session.commit()
+    like_hits = search('fall bod', limit=50)
+
+    rebuild_search_index()
+    fts_hits = search('fall bod', limit=50)
+    assert hit_ids(fts_hits, 'question') == hit_ids(like_hits, 'question') == [questions[0].id, questions[1].id]
+    # Every term has to match
+    assert search('falling velocity air') == []
+
+
+def test_triggers_keep_the_index_in_sync(quiz, questions):
+    rebuild_search_index()
+    question = Question(quiz_id=quiz.id, question_text='Projectile range', option1='a', option2='b', option3='c', option4='d', correct_option=1)
+    db.session.add(question)
+    db.session.commit()
+    assert hit_ids(search('projectile'), 'question') == [question.id]
+
+    question.question_text = 'Circular motion'
+    db.session.commit()
+    assert search('projectile') == []
+    assert hit_ids(search('circular'), 'question') == [question.id]
+
+    db.session.delete(question)
+    db.session.commit()
+    assert search('circular') == []
+
+
+@pytest.mark.parametrize('install', [False, True])
+def test_filter_by_search_narrows_a_list_query(quiz, questions, install):
+    if install:
+        rebuild_search_index()
+    query = filter_by_search(Question.query, 'question', 'q2')
+    assert [q.id for q in query] == [questions[2].id]
+
+
+def test_search_endpoint_checks_its_parameters(client, quiz, users):
+    headers = auth(users[0])
+    assert client.get('/api/search', headers=headers).status_code == 400
+    assert client.get('/api/search?q=x&types=answer', headers=headers).status_code == 400
+    assert client.get('/api/search?q=x&limit=0', headers=headers).status_code == 400
+
+    response = client.get('/api/search?q=physics&types=subject', headers=headers)
+    assert response.status_code == 200
+    assert [hit['title'] for hit in response.json['results']] == ['Physics']
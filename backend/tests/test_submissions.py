@@ -0,0 +1,165 @@
+# backend/tests/test_submissions.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from extensions import db
+from model import Score, QuizSubmission, UserAnswer
+from bulk_ops import upsert_user_answers
+from submissions import record_submissions, _record_batch, enqueue_submission, ingest_queued_submissions, QUEUE_KEY, INGEST_LOCK_KEY
+from conftest import auth
+
+
+def submission(user, quiz, key, answers, submitted_at=None):
+    return {
+        'user_id': user.id,
+        'quiz_id': quiz.id,
+        'submission_key': key,
+        'answers': answers,
+        'submitted_at': submitted_at or datetime.utcnow()
+    }
+
+
+def test_submission_is_graded_from_the_answer_key(quiz, questions, users):
+    answers = [[questions[0].id, 1], [questions[1].id, 2], [questions[2].id, 1], [999999, 1]]
+    result = record_submissions([submission(users[0], quiz, 'key-00000001', answers)])[(users[0].id, 'key-00000001')]
+
+    assert result['status'] == 'graded'
+    assert result['correct_answers_count'] == 2
+    assert result['total_questions'] == 4
+    # The answer to a question from another quiz is neither graded nor stored
+    assert {row.question_id for row in UserAnswer.query} == {q.id for q in questions[:3]}
+
+
+def test_answer_key_follows_question_edits(quiz, questions, users):
+    answers = [[questions[0].id, 4]]
+    first = record_submissions([submission(users[0], quiz, 'key-00000001', answers)])
+    assert first[(users[0].id, 'key-00000001')]['correct_answers_count'] == 0
+
+    questions[0].correct_option = 4
+    db.session.commit()
+    second = record_submissions([submission(users[0], quiz, 'key-00000002', answers)])
+    assert second[(users[0].id, 'key-00000002')]['correct_answers_count'] == 1
+
+
+def test_retried_submission_returns_the_first_result(quiz, questions, users):
+    answers = [[q.id, 1] for q in questions]
+    first = record_submissions([submission(users[0], quiz, 'key-00000001', answers)])
+    retry = record_submissions([submission(users[0], quiz, 'key-00000001', [[questions[0].id, 2]])])
+
+    assert retry == first
+    assert Score.query.count() == 1
+    assert QuizSubmission.query.count() == 1
+
+
+def test_same_key_twice_in_one_batch_is_recorded_once(quiz, questions, users):
+    item = submission(users[0], quiz, 'key-00000001', [[questions[0].id, 1]])
+    results = record_submissions([item, dict(item)])
+    assert list(results) == [(users[0].id, 'key-00000001')]
+    assert Score.query.count() == 1
+
+
+def test_submission_for_missing_quiz_fails(quiz, users):
+    item = dict(submission(users[0], quiz, 'key-00000001', []), quiz_id=999999)
+    result = record_submissions([item])[(users[0].id, 'key-00000001')]
+    assert result['status'] == 'failed'
+    assert Score.query.count() == 0
+
+
+def test_bad_queued_item_does_not_block_its_batch(quiz, questions, users):
+    good = submission(users[0], quiz, 'key-00000001', [[q.id, 1] for q in questions])
+    bad = dict(submission(users[1], quiz, 'key-00000002', []), submitted_at='not a timestamp')
+    results = _record_batch([bad, good])
+
+    assert results[(users[1].id, 'key-00000002')]['status'] == 'failed'
+    assert results[(users[0].id, 'key-00000001')]['status'] == 'graded'
+    assert Score.query.count() == 1
+
+
+def test_upsert_only_newer_keeps_the_later_answer(quiz, questions, users):
+    now = datetime.utcnow()
+    row = {'user_id': users[0].id, 'quiz_id': quiz.id, 'question_id': questions[0].id}
+    upsert_user_answers([dict(row, selected_option=2, attempt_timestamp=now)])
+    db.session.commit()
+
+    # A late autosave flush older than the stored answer is ignored...
+    upsert_user_answers([dict(row, selected_option=3, attempt_timestamp=now - timedelta(minutes=1))], only_newer=True)
+    db.session.commit()
+    assert db.session.query(UserAnswer.selected_option).scalar() == 2
+
+    # ...while a newer one replaces it, and without only_newer anything does
+    upsert_user_answers([dict(row, selected_option=4, attempt_timestamp=now + timedelta(minutes=1))], only_newer=True)
+    db.session.commit()
+    assert db.session.query(UserAnswer.selected_option).scalar() == 4
+    upsert_user_answers([dict(row, selected_option=1, attempt_timestamp=now - timedelta(hours=1))])
+    db.session.commit()
+    assert db.session.query(UserAnswer.selected_option).scalar() == 1
+    assert UserAnswer.query.count() == 1
+
+
+def test_submission_does_not_overwrite_a_newer_answer(quiz, questions, users):
+    later = datetime.utcnow() + timedelta(minutes=5)
+    upsert_user_answers([{
+        'user_id': users[0].id, 'quiz_id': quiz.id, 'question_id': questions[0].id,
+        'selected_option': 3, 'attempt_timestamp': later
+    }])
+    db.session.commit()
+    record_submissions([submission(users[0], quiz, 'key-00000001', [[questions[0].id, 1]])])
+    assert db.session.query(UserAnswer.selected_option).filter_by(question_id=questions[0].id).scalar() == 3
+
+
+def post_submission(client, user, payload, key):
+    headers = dict(auth(user), **{'Idempotency-Key': key})
+    return client.post('/api/quiz_attempt_submit', json=payload, headers=headers)
+
+
+def test_submit_rejects_invalid_options_before_grading(client, quiz, questions, users):
+    for option in (7, True, '1'):
+        response = post_submission(client, users[0], {'quiz_id': quiz.id, 'answers': [{'question_id': questions[0].id, 'selected_option': option}]}, 'key-00000001')
+        assert response.status_code == 400
+    assert post_submission(client, users[0], {'quiz_id': quiz.id, 'answers': ['x']}, 'key-00000001').status_code == 400
+    assert Score.query.count() == 0
+
+
+def test_submit_skips_unanswered_questions(client, quiz, questions, users):
+    answers = [{'question_id': questions[0].id, 'selected_option': 1}] + [{'question_id': q.id, 'selected_option': 0} for q in questions[1:]]
+    response = post_submission(client, users[0], {'quiz_id': quiz.id, 'answers': answers}, 'key-00000001')
+    assert response.status_code == 200
+    assert response.get_json()['correct_answers_count'] == 1
+    assert UserAnswer.query.count() == 1
+
+
+@pytest.fixture
+def queued(fake_redis, monkeypatch):
+    """Queued submission mode with the worker kick left out; tests run the ingest themselves."""
+    monkeypatch.setattr(app_module, 'SUBMISSION_MODE', 'queued')
+    monkeypatch.setattr(app_module.ingest_submissions, 'apply_async', lambda **kwargs: None)
+    return fake_redis
+
+
+def test_queued_submission_is_graded_by_the_ingest(client, queued, quiz, questions, users):
+    payload = {'quiz_id': quiz.id, 'answers': [{'question_id': q.id, 'selected_option': 1} for q in questions]}
+    response = post_submission(client, users[0], payload, 'key-00000001')
+    assert response.status_code == 202
+    assert response.json['status_url'] == '/api/submissions/key-00000001'
+    # A retry while it waits doesn't queue it twice
+    assert post_submission(client, users[0], payload, 'key-00000001').status_code == 202
+    assert queued.llen(QUEUE_KEY) == 1
+    assert client.get('/api/submissions/key-00000001', headers=auth(users[0])).status_code == 202
+
+    assert ingest_queued_submissions() == (1, {users[0].id})
+    assert not queued.exists(QUEUE_KEY) and not queued.exists(INGEST_LOCK_KEY)
+    status = client.get('/api/submissions/key-00000001', headers=auth(users[0]))
+    assert status.status_code == 200
+    assert status.json['correct_answers_count'] == 1
+    # Other users can't see it
+    assert client.get('/api/submissions/key-00000001', headers=auth(users[1])).status_code == 404
+
+
+def test_ingest_waits_for_a_worker_already_draining(queued, quiz, questions, users):
+    enqueue_submission(users[0].id, quiz.id, 'key-00000001', {questions[0].id: 1})
+    queued.set(INGEST_LOCK_KEY, 'other-worker')
+    assert ingest_queued_submissions() == (0, set())
+    assert queued.llen(QUEUE_KEY) == 1
@@ -0,0 +1,56 @@
+# backend/tests/test_user_import.py
+
+from datetime import date
+
+from extensions import db
+from model import User, GlobalStats
+from stats import GLOBAL_STATS_ID
+from passwords import verify_password
+from bulk_import import import_users, _insert_user_batch
+from conftest import auth
+
+USERS_CSV = """email,password,full_name,qualification,dob
+new1@example.com,pw1,New One,BSc,2001-02-03
+u0@example.com,pw,Taken,BSc,2001-02-03
+new2@example.com,pw2,New Two,MSc,2002-03-04
+new1@example.com,pw3,Again,BSc,2001-02-03
+bad@example.com,pw,,BSc,2001-02-03
+late@example.com,pw,Late,BSc,03/04/2001
+"""
+
+
+def test_import_creates_valid_rows_and_reports_the_rest(users):
+    summary = import_users(USERS_CSV, 'csv')
+    assert summary['created'] == 2
+    assert [(error['row'], error['message']) for error in summary['errors']] == [
+        (3, 'Email already registered'),
+        (5, 'Duplicate email in import'),
+        (6, 'Missing fields: full_name'),
+        (7, 'Invalid date format for DOB. Use YYYY-MM-DD.'),
+    ]
+    created = User.query.filter_by(email='new2@example.com').one()
+    assert (created.full_name, created.dob, created.role) == ('New Two', date(2002, 3, 4), 'user')
+    assert verify_password(created.password, 'pw2')
+    assert db.session.get(GlobalStats, GLOBAL_STATS_ID).total_users == 4
+
+
+def test_a_batch_hitting_a_taken_email_keeps_the_other_rows(users):
+    row = {'password': 'x', 'full_name': 'X', 'qualification': 'x', 'dob': date(2000, 1, 1), 'role': 'user'}
+    errors = []
+    # Registered between the upfront check and the insert
+    batch = [(2, dict(row, email='fresh@example.com')), (3, dict(row, email=users[0].email))]
+    assert _insert_user_batch(batch, errors) == 1
+    assert errors == [{'row': 3, 'message': 'Email already registered', 'email': users[0].email}]
+    assert User.query.filter_by(email='fresh@example.com').count() == 1
+
+
+def test_import_endpoint_takes_a_raw_ndjson_body(client, users):
+    body = '{"email": "n@example.com", "password": "pw", "full_name": "N", "qualification": "x", "dob": "2000-01-01"}\nnot json\n'
+    response = client.post('/api/admin/users/import?format=ndjson', data=body, headers=auth(users[0], role='admin'))
+    assert response.status_code == 200
+    assert (response.json['created'], response.json['errors']) == (1, [{'row': 2, 'message': 'Invalid JSON'}])
+
+
+def test_import_endpoint_rejects_unknown_formats(client, users):
+    response = client.post('/api/admin/users/import', data='x', headers=auth(users[0], role='admin'))
+    assert response.status_code == 400
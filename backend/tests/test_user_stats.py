@@ -0,0 +1,53 @@
+# backend/tests/test_user_stats.py
+
+from datetime import datetime, timedelta, timezone
+
+from extensions import db
+from database import _ready_tables
+from model import Score, UserStats
+from stats import rebuild_user_stats, record_user_attempts
+from conftest import auth, add_scores, assert_matches_rebuild
+
+
+def test_user_stats_follow_inserts_and_deletes(quiz, users):
+    add_scores(quiz, users[0], 2, 4)
+    scores = add_scores(quiz, users[1], 1)
+    stats = db.session.get(UserStats, users[0].id)
+    assert (stats.attempts, stats.score_sum, stats.best_score) == (2, 6, 4)
+    assert stats.subject_breakdown == {str(quiz.chapter.subject_id): {'attempts': 2, 'score_sum': 6, 'best_score': 4}}
+    assert_matches_rebuild(UserStats, rebuild_user_stats)
+
+    db.session.delete(scores[0])
+    db.session.commit()
+    assert_matches_rebuild(UserStats, rebuild_user_stats)
+
+
+def test_last_attempt_compares_naive_and_aware_times(quiz, users):
+    later = datetime.utcnow().replace(microsecond=0)
+    add_scores(quiz, users[0], 1, at=later)
+    # An aware attempt from an hour earlier must not move last_attempt_at back
+    earlier = Score(user_id=users[0].id, quiz_id=quiz.id, score=2, attempt_timestamp=(later - timedelta(hours=1)).replace(tzinfo=timezone.utc))
+    with db.engine.begin() as connection:
+        record_user_attempts(connection, [earlier])
+    stats = db.session.get(UserStats, users[0].id)
+    assert stats.attempts == 2
+    assert stats.last_attempt_at.replace(tzinfo=None) == later
+
+
+def test_user_dashboard_reads_the_stats_row(client, quiz, users):
+    add_scores(quiz, users[0], 1, 3)
+    response = client.get('/api/user/dashboard/stats', headers=auth(users[0]))
+    assert response.status_code == 200
+    assert (response.json['total_quizzes_attempted'], response.json['best_score']) == (2, 3)
+
+    response = client.get('/api/user/dashboard/stats', headers=auth(users[1]))
+    assert response.json['total_quizzes_attempted'] == 0
+
+
+def test_hooks_skip_a_user_stats_table_the_upgrade_has_not_created(quiz, users):
+    UserStats.__table__.drop(db.engine)
+    _ready_tables.clear()
+    scores = add_scores(quiz, users[0], 2)
+    db.session.delete(scores[0])
+    db.session.commit()
+    assert Score.query.count() == 0
@@ -0,0 +1,86 @@
+# backend/upgrade.py
+#
+# `flask upgrade-db` brings an existing database up to the current model.py
+# and is the required step of every deploy, before the new code serves
+# traffic. Every step is idempotent, so running it again is harmless.
+
+import logging
+
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.schema import CreateColumn
+
+from extensions import db
+from indexes import upgrade_indexes
+from search import configured_search_backend
+from stats import rebuild_global_stats, rebuild_user_stats
+from quiz_snapshots import compile_all_quiz_snapshots
+from answer_keys import invalidate_answer_keys
+from score_distributions import rebuild_score_distributions
+from activity_rollups import refresh_daily_activity
+from leaderboards import rebuild_leaderboards
+
+logger = logging.getLogger(__name__)
+
+# Fill for NOT NULL columns added to tables that already have rows; the
+# backfills below overwrite it in the derived tables
+_EMPTY_VALUES = {bytes: b'', str: '', int: 0, float: 0.0, bool: False}
+
+
+def upgrade_columns(connection):
+    """
+    Add the model.py columns missing from existing tables (create_all() only
+    creates whole tables). Returns the added columns as 'table.column'.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = str(CreateColumn(column).compile(dialect=connection.dialect))
+            if not column.nullable and column.server_default is None:
+                empty = literal(_EMPTY_VALUES[column.type.python_type], column.type)
+                ddl += ' DEFAULT ' + str(empty.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+            connection.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}'))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def upgrade_database():
+    """
+    Create missing tables, columns and indexes, then backfill every table
+    derived from the source tables: the quiz snapshots, dashboard counters,
+    per-user stats, score distributions, daily activity rollups and the
+    leaderboards.
+    Returns a summary dict.
+    """
+    db.create_all()
+    # Compiled eagerly so no request has to compile a snapshot on first read.
+    # New columns commit together with the snapshots that fill them, so no
+    # reader sees an empty answer key.
+    with db.engine.begin() as connection:
+        columns = upgrade_columns(connection)
+        quiz_ids = compile_all_quiz_snapshots(connection)
+    invalidate_answer_keys(quiz_ids)
+    summary = {'columns': columns, 'quiz_snapshots': len(quiz_ids), 'indexes': upgrade_indexes()}
+
+    with db.engine.begin() as connection:
+        configured_search_backend().install(connection)
+
+    rebuild_global_stats()
+    with db.engine.begin() as connection:
+        summary['user_stats'] = rebuild_user_stats(connection)
+        summary['score_distributions'] = rebuild_score_distributions(connection)
+    summary['daily_activity'] = refresh_daily_activity(full=True)['days']
+
+    try:
+        summary['leaderboards'] = rebuild_leaderboards()
+    except Exception as e:
+        # The database is upgraded either way; the Redis boards seed themselves on first use
+        logger.error(f"ERROR: Could not rebuild leaderboards: {e}")
+        summary['leaderboards'] = None
+    return summary
@@ -0,0 +1,26 @@
+// Helpers for the keyset-paginated list endpoints, which return { items, next_cursor, limit }.
+// Both resolve to the Response as well, so callers keep their usual error handling.
+
+// Fetches a single page. `after` is the previous page's next_cursor (null for the first page).
+export async function fetchPage(url, options, after = null) {
+  const pageUrl = new URL(url.toString())
+  if (after) pageUrl.searchParams.set('after', after)
+  const response = await fetch(pageUrl.toString(), options)
+  const page = response.ok ? await response.json() : null
+  return { response, page }
+}
+
+// Follows next_cursor until the list is exhausted. Meant for small catalog lists feeding dropdowns.
+export async function fetchAllPages(url, options) {
+  const items = []
+  let cursor = null
+  let response
+  do {
+    const result = await fetchPage(url, options, cursor)
+    response = result.response
+    if (!response.ok) break
+    items.push(...result.page.items)
+    cursor = result.page.next_cursor
+  } while (cursor)
+  return { response, items }
+}